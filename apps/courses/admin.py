@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 from .models import (
-    Instructor, Category, Course, Section, Lesson,
+    Instructor, Category, Course, CourseStats, Section, Lesson,
     Enrollment, LessonProgress, CourseReview,
     Question, Answer, Certificate
 )
@@ -32,6 +32,10 @@ class AnswerInline(admin.TabularInline):
     fields = ('user', 'content', 'is_instructor_answer')
     readonly_fields = ('user', 'content', 'is_instructor_answer', 'created_at')
 
+    def get_queryset(self, request):
+        # The read-only user column would otherwise load each answer's user separately.
+        return super().get_queryset(request).select_related('user')
+
 
 # --- Model Admin Classes ---
 
@@ -82,6 +86,14 @@ class CourseAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ('course', 'students_count', 'reviews_count', 'average_rating', 'total_lessons', 'total_duration')
+    search_fields = ('course__title',)
+    readonly_fields = ('course', 'total_lessons', 'total_duration', 'students_count', 'reviews_count', 'rating_sum',
+                       'updated_at')
+
+
 @admin.register(Section)
 class SectionAdmin(admin.ModelAdmin):
     list_display = ('title', 'course', 'order')
@@ -125,8 +137,9 @@ class CourseReviewAdmin(admin.ModelAdmin):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('title', 'lesson', 'student', 'created_at')
-    list_filter = ('lesson__section__course',)
+    list_display = ('title', 'lesson', 'student', 'instructor_answered', 'created_at')
+    list_filter = ('instructor_answered', 'lesson__section__course')
+    list_select_related = ('lesson', 'student')
     search_fields = ('title', 'content', 'student__username', 'lesson__title')
     ordering = ('-created_at',)
     inlines = [AnswerInline]
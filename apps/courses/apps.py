@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+from core.sqlite import configure_connection
 
 
 class CoursesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.courses'
+
+    def ready(self):
+        from apps.courses import signals  # noqa: F401
+        from apps.courses.metrics import install_sql_wrapper
+
+        # Pragmas first, so they run before the SQL wrapper is installed and are never counted.
+        connection_created.connect(configure_connection, dispatch_uid='sqlite-production-profile')
+        connection_created.connect(install_sql_wrapper, dispatch_uid='courses-metrics-sql')
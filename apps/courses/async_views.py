@@ -0,0 +1,66 @@
+"""
+Native async views for high fan-in event traffic.
+
+They validate, queue the events on a write-behind queue and answer ``202 Accepted`` without waiting for the
+write. Under WSGI there is no long-lived event loop to run the flusher in, so the events are written inline
+instead and the view answers ``200``.
+
+Requests are authenticated with REST framework's ``DEFAULT_AUTHENTICATION_CLASSES``, like the API views, and
+CSRF is enforced by ``SessionAuthentication`` for session users only.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from apps.courses.progress import write_heartbeats
+from apps.courses.serializers import HeartbeatBatchSerializer
+from apps.courses.writebehind import QueueFull, WriteBehindQueue, register
+
+heartbeat_queue = register(WriteBehindQueue('heartbeats', write_heartbeats))
+
+
+def authenticate(request):
+    """The user of ``request`` as an ``APIView`` would authenticate it; raises ``APIException`` on bad credentials."""
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    return Request(request, authenticators=authenticators).user
+
+
+@csrf_exempt
+@require_POST
+async def heartbeats(request):
+    try:
+        user = await sync_to_async(authenticate)(request)
+    except APIException as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"detail": "Malformed JSON"}, status=400)
+
+    serializer = HeartbeatBatchSerializer(data=data, context={'user': user})
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+    events = [
+        (event['enrollment'], event['lesson'], event['seconds'], event['completed'])
+        for event in serializer.validated_data['events']
+    ]
+
+    if not isinstance(request, ASGIRequest):
+        await sync_to_async(write_heartbeats)(events)
+        return JsonResponse({'events': len(events), 'queued': False})
+    try:
+        await heartbeat_queue.put(events)
+    except QueueFull:
+        response = JsonResponse({"detail": "Too many pending events, retry shortly."}, status=503)
+        response['Retry-After'] = '1'
+        return response
+    return JsonResponse({'events': len(events), 'queued': True}, status=202)
@@ -0,0 +1,87 @@
+"""
+Benchmarks run with ``manage.py bench <name>``.
+
+Each module exposes ``add_arguments(parser)`` and ``run(options)``; ``run`` returns a JSON-serialisable
+dict of results. Benchmarks run against a scratch SQLite file and a scratch cache directory, never against
+the configured database or cache.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import override_settings
+
+BENCHMARKS = {
+    'slugs': 'apps.courses.benchmarks.slugs',
+    'heartbeats': 'apps.courses.benchmarks.heartbeats',
+    'ingest': 'apps.courses.benchmarks.ingest',
+    'rollups': 'apps.courses.benchmarks.rollups',
+    'endpoints': 'apps.courses.benchmarks.endpoints',
+    'contention': 'apps.courses.benchmarks.contention',
+}
+
+
+@contextmanager
+def benchmark_database(path=None):
+    """
+    Create and migrate a throwaway SQLite database file and point the default connection at it.
+
+    The file is deleted afterwards, so a given ``path`` must not exist yet: it is never an existing database.
+    The default cache is moved to a scratch directory as well, so clearing it leaves other servers' caches
+    alone and no payloads of the scratch rows outlive the run.
+    """
+    directory = None
+    if path is not None and os.path.exists(path):
+        raise FileExistsError(f"{path} already exists; benchmarks only run on a new, throwaway file")
+    if path is None:
+        directory = tempfile.mkdtemp(prefix='courses-bench-')
+        path = os.path.join(directory, 'bench.sqlite3')
+    cache_directory = tempfile.mkdtemp(prefix='courses-bench-cache-')
+    scratch_cache = override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_directory,
+    }})
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    scratch_cache.enable()
+    try:
+        yield path
+    finally:
+        scratch_cache.disable()
+        shutil.rmtree(cache_directory, ignore_errors=True)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if directory is not None:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+
+def percentiles(samples):
+    """Summarise latencies given in seconds as milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': at(0.50),
+        'p95_ms': at(0.95),
+        'p99_ms': at(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+@contextmanager
+def timer(samples):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append(time.perf_counter() - start)
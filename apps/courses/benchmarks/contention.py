@@ -0,0 +1,156 @@
+"""SQLite lock contention: worker processes mixing reads and writes on the course endpoints, per connection profile."""
+import json
+import logging
+import multiprocessing
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from apps.courses.benchmarks import percentiles
+from apps.courses.benchmarks.dataset import SCALES, generate
+from apps.courses.models import Course, Enrollment, Lesson
+
+# Share of each operation in a worker's request mix.
+MIX = {'list': 40, 'detail': 30, 'heartbeat': 20, 'update': 10}
+WRITES = ('heartbeat', 'update')
+
+
+def profiles():
+    """Connection setup to compare: ``(pragmas, OPTIONS)``."""
+    return {
+        # What SQLite and Django do out of the box: rollback journal, deferred transactions, a 5 s busy wait.
+        'default': ({'journal_mode': 'DELETE'}, {}),
+        'production': (settings.SQLITE_PRAGMAS, settings.DATABASES['default'].get('OPTIONS', {})),
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0, help="Run time per profile.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-lock-error-rate', type=float, default=0.0,
+                        help="Fail when the production profile loses more than this share of requests to locks.")
+
+
+def make_plans(processes):
+    """A student with an enrollment and the owner of a course for each worker process."""
+    enrollments = list(Enrollment.objects.order_by('pk').values_list('pk', 'student_id', 'course_id'))
+    lessons = {}
+    for lesson_id, course_id in Lesson.objects.values_list('pk', 'section__course_id'):
+        lessons.setdefault(course_id, []).append(lesson_id)
+    courses = list(Course.objects.filter(status='published').order_by('pk').values_list('pk', 'instructor__user_id'))
+    plans = []
+    for n in range(processes):
+        enrollment_id, student_id, course_id = enrollments[n * len(enrollments) // processes]
+        owned_course_id, owner_id = courses[n % len(courses)]
+        plans.append({
+            'student': student_id, 'enrollment': enrollment_id, 'lessons': lessons[course_id],
+            'owner': owner_id, 'course': owned_course_id, 'detail_courses': [pk for pk, _ in courses],
+        })
+    return plans
+
+
+def worker(profile, plan, seconds, seed, barrier, results):
+    pragmas, options = profile
+    connections['default'].settings_dict['OPTIONS'] = dict(options)
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    rng = random.Random(seed)
+    # Signed-cookie sessions keep logging in from writing to the database being measured.
+    with override_settings(SQLITE_PRAGMAS=pragmas, ALLOWED_HOSTS=['testserver'],
+                           SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'):
+        student, owner = Client(raise_request_exception=False), Client(raise_request_exception=False)
+        student.force_login(User.objects.get(pk=plan['student']))
+        owner.force_login(User.objects.get(pk=plan['owner']))
+        list_url = reverse('courses:create-list')
+        heartbeat_url = reverse('courses:progress-heartbeats')
+        update_url = reverse('courses:course-detail', args=[plan['course']])
+        requests = {
+            'list': lambda: student.get(list_url),
+            'detail': lambda: student.get(
+                reverse('courses:course-detail', args=[rng.choice(plan['detail_courses'])])),
+            'heartbeat': lambda: student.post(heartbeat_url, json.dumps({'events': [
+                {'enrollment': plan['enrollment'], 'lesson': rng.choice(plan['lessons']), 'seconds': 5},
+            ]}), content_type='application/json'),
+            'update': lambda: owner.patch(update_url, {'title': f'Contended course {rng.random():.6f}'},
+                                          content_type='application/json'),
+        }
+        counts = {name: {'ok': 0, 'locked': 0, 'errors': 0} for name in MIX}
+        samples = []
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            name = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+            start = time.perf_counter()
+            response = requests[name]()
+            samples.append(time.perf_counter() - start)
+            error = response.exc_info[1] if getattr(response, 'exc_info', None) else None
+            if response.status_code < 400:
+                counts[name]['ok'] += 1
+            elif isinstance(error, OperationalError) and 'locked' in str(error):
+                counts[name]['locked'] += 1
+            else:
+                counts[name]['errors'] += 1
+    connections.close_all()
+    results.put((counts, samples))
+
+
+def run_profile(profile, plans, options):
+    context = multiprocessing.get_context('fork')
+    barrier, results = context.Barrier(len(plans)), context.Queue()
+    # Children must open their own connections; a forked SQLite handle is not safe to use.
+    connections.close_all()
+    processes = [
+        context.Process(target=worker, args=(profile, plan, options['seconds'], options['seed'] + n, barrier, results))
+        for n, plan in enumerate(plans)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    counts = {name: {'ok': 0, 'locked': 0, 'errors': 0} for name in MIX}
+    samples = []
+    for worker_counts, worker_samples in outcomes:
+        samples += worker_samples
+        for name, outcome in worker_counts.items():
+            for key, value in outcome.items():
+                counts[name][key] += value
+    total = sum(sum(outcome.values()) for outcome in counts.values())
+    locked = sum(outcome['locked'] for outcome in counts.values())
+    writes = sum(sum(counts[name].values()) for name in WRITES)
+    return {
+        'requests': total,
+        'requests_per_second': round(total / options['seconds']),
+        'lock_error_rate': round(locked / total, 4) if total else 0,
+        'write_lock_error_rate': round(locked / writes, 4) if writes else 0,
+        'latency': percentiles(samples),
+        'operations': counts,
+    }
+
+
+def run(options):
+    generate(options['scale'], options['seed'])
+    plans = make_plans(options['processes'])
+    results = {'processes': options['processes'], 'seconds': options['seconds'], 'mix': MIX}
+    for name, profile in profiles().items():
+        # The journal mode is stored in the file; switch it while nothing else is connected.
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA journal_mode = {profile[0].get('journal_mode', 'DELETE')}")
+        results[name] = run_profile(profile, plans, options)
+
+    failures = []
+    production = results['production']
+    if production['lock_error_rate'] > options['max_lock_error_rate']:
+        failures.append(f"production profile lost {production['lock_error_rate']:.2%} of requests to locks")
+    errors = sum(outcome['errors'] for outcome in production['operations'].values())
+    if errors:
+        failures.append(f'production profile had {errors} non-lock errors')
+    results['failures'] = failures
+    return results
@@ -0,0 +1,136 @@
+"""
+Deterministic synthetic catalog for benchmarks.
+
+``generate(scale, seed)`` fills every course table with bulk inserts; the same scale and seed always produce
+the same rows (apart from timestamps). Denormalized data (course stats, category paths, the search index and
+instructor rollups) is then rebuilt the way production maintains it.
+"""
+import random
+
+from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef
+
+from apps.courses.models import (
+    Answer, Category, Course, CourseReview, Enrollment, Instructor, Lesson, LessonProgress, Question, Section,
+)
+from apps.courses.rollups import run_rollup
+from apps.courses.search import rebuild_index
+from apps.courses.stats import rebuild_course_stats
+
+# Roughly 1k, 100k and 1M rows in total.
+SCALES = {
+    '1k': dict(instructors=10, categories=10, courses=20, sections=3, lessons=4, students=100, enrollments=3,
+               questions=2, answers=2),
+    '100k': dict(instructors=500, categories=60, courses=2000, sections=4, lessons=5, students=5000, enrollments=4,
+                 questions=2, answers=2),
+    '1m': dict(instructors=5000, categories=200, courses=20000, sections=4, lessons=5, students=50000,
+               enrollments=4, questions=2, answers=2),
+}
+REVIEW_SHARE = 0.3
+# Questions still waiting for an instructor answer.
+UNANSWERED_SHARE = 0.2
+BATCH_SIZE = 5000
+LEVELS = [value for value, _ in Course.LEVEL_CHOICES]
+LANGUAGES = ['Uzbek', 'English', 'Russian']
+WORDS = ('python django web data design music business marketing photo video cloud security mobile game '
+         'finance health language writing math science').split()
+
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def generate(scale='1k', seed=1):
+    """Create the dataset and return the number of rows written per model."""
+    size = SCALES[scale]
+    rng = random.Random(seed)
+    rows = {}
+
+    def insert(model, objects):
+        created = model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        rows[model.__name__] = rows.get(model.__name__, 0) + len(created)
+        return created
+
+    instructor_users = insert(User, [User(username=f'instructor-{n}', password='!', first_name=words(rng, 1).title())
+                                     for n in range(size['instructors'])])
+    instructors = insert(Instructor, [
+        Instructor(user=user, bio=words(rng, 20), profile_image='https://example.com/p.png',
+                   expertise=words(rng, 2), is_verified=rng.random() < 0.5)
+        for user in instructor_users
+    ])
+    students = insert(User, [User(username=f'student-{n}', password='!') for n in range(size['students'])])
+
+    # Categories are few; saving them one by one lets the model maintain their paths.
+    categories = []
+    for n in range(size['categories']):
+        parent = rng.choice(categories) if categories and n % 5 else None
+        category = Category(name=f'Category {n}', slug=f'category-{n}', description='', icon='code', parent=parent)
+        category.save()
+        categories.append(category)
+    rows['Category'] = len(categories)
+
+    courses = insert(Course, [
+        Course(title=f'{words(rng, 3).title()} course {n}', slug=f'course-{n}', description=words(rng, 40),
+               instructor=rng.choice(instructors), category=rng.choice(categories),
+               thumbnail='https://example.com/t.png', price=f'{rng.choice([0, 10, 49, 99, 150, 250])}.00',
+               discount_percentage=rng.choice([0, 0, 10, 50]), level=rng.choice(LEVELS),
+               status='published' if rng.random() < 0.8 else rng.choice(['draft', 'archived']),
+               duration_hours='10.00', requirements=words(rng, 10), what_you_learn=words(rng, 15),
+               language=rng.choice(LANGUAGES), is_featured=rng.random() < 0.1)
+        for n in range(size['courses'])
+    ])
+    sections = insert(Section, [
+        Section(course=course, title=f'Section {n}', description=words(rng, 5), order=n)
+        for course in courses for n in range(size['sections'])
+    ])
+    lessons = insert(Lesson, [
+        Lesson(section=section, title=f'Lesson {n}', content=words(rng, 30), video_url='https://v.example.com',
+               duration_minutes=rng.randint(3, 30), order=n, is_preview=n == 0)
+        for section in sections for n in range(size['lessons'])
+    ])
+    course_lessons = {}
+    for lesson in lessons:
+        course_lessons.setdefault(lesson.section.course_id, []).append(lesson)
+
+    enrollments = insert(Enrollment, [
+        Enrollment(student=student, course=course,
+                   status=rng.choice(['active', 'active', 'completed', 'dropped']))
+        for student in students for course in rng.sample(courses, min(size['enrollments'], len(courses)))
+    ])
+    insert(LessonProgress, [
+        LessonProgress(enrollment=enrollment, lesson=rng.choice(course_lessons[enrollment.course_id]),
+                       is_completed=True, watch_time_minutes=10, watch_time_seconds=600)
+        for enrollment in enrollments
+    ])
+    insert(CourseReview, [
+        CourseReview(course_id=enrollment.course_id, student_id=enrollment.student_id, rating=rng.randint(1, 5),
+                     title=words(rng, 3), comment=words(rng, 20))
+        for enrollment in enrollments if rng.random() < REVIEW_SHARE
+    ])
+
+    by_course = {}
+    for enrollment in enrollments:
+        by_course.setdefault(enrollment.course_id, []).append(enrollment.student_id)
+    instructor_user = {instructor.pk: instructor.user_id for instructor in instructors}
+    questions = insert(Question, [
+        Question(lesson=rng.choice(course_lessons[course.pk]), student_id=rng.choice(by_course[course.pk]),
+                 title=words(rng, 4), content=words(rng, 25))
+        for course in courses if course.pk in by_course for _ in range(size['questions'])
+    ])
+    course_of_lesson = {lesson.pk: lesson.section.course for lesson in lessons}
+    unanswered = {question.pk for question in questions if rng.random() < UNANSWERED_SHARE}
+    insert(Answer, [
+        Answer(question=question, user_id=instructor_user[course_of_lesson[question.lesson_id].instructor_id]
+               if by_instructor else rng.choice(by_course[course_of_lesson[question.lesson_id].pk]),
+               content=words(rng, 20), is_instructor_answer=by_instructor)
+        for question in questions for n in range(size['answers'])
+        for by_instructor in [n == 0 and question.pk not in unanswered]
+    ])
+    Question.objects.filter(
+        Exists(Answer.objects.filter(question=OuterRef('pk'), is_instructor_answer=True)),
+    ).update(instructor_answered=True)
+
+    rebuild_course_stats()
+    rebuild_index()
+    run_rollup(full=True)
+    return rows
@@ -0,0 +1,142 @@
+"""Course endpoint latency and query counts on a synthetic catalog, with query budgets and run-to-run diffs."""
+import json
+from itertools import count
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.courses.benchmarks import percentiles, timer
+from apps.courses.benchmarks.dataset import SCALES, generate
+from apps.courses.models import Category, Course
+
+# Most queries a single request may run. They must not depend on the scale: growth with the data is the
+# regression they exist to catch.
+QUERY_BUDGETS = {
+    'list': 6,
+    'list_filtered': 8,
+    'detail_cold': 8,
+    'detail_warm': 2,
+    'search': 5,
+    'create': 15,
+    'update': 15,
+    # A populated course: one collect SELECT and one DELETE per related table, whatever its size.
+    'delete': 28,
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--compare', help="Results JSON of an earlier run to diff against.")
+    parser.add_argument('--max-regression', type=float,
+                        help="Fail when an endpoint's p95 grows by more than this fraction against --compare.")
+
+
+class EndpointRunner:
+    def __init__(self, iterations):
+        self.iterations = iterations
+        self.results = {}
+        self.failures = []
+
+    def measure(self, name, request, expected_status, before=None, iterations=None):
+        samples, queries = [], []
+        for iteration in range(self.iterations if iterations is None else min(iterations, self.iterations)):
+            if before is not None:
+                before(iteration)
+            with CaptureQueriesContext(connection) as ctx, timer(samples):
+                response = request(iteration)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+            queries.append(len(ctx.captured_queries))
+            if response.status_code != expected_status:
+                self.failures.append(f'{name}: HTTP {response.status_code}, expected {expected_status}')
+                break
+        self.results[name] = {'latency': percentiles(samples), 'queries': max(queries)}
+        if max(queries) > QUERY_BUDGETS[name]:
+            self.failures.append(f'{name}: {max(queries)} queries, budget {QUERY_BUDGETS[name]}')
+
+
+def course_payload(course, title):
+    return {
+        'title': title, 'description': 'A benchmark course description that is comfortably long enough.',
+        'price': '49.00', 'discount_percentage': 0, 'category_id': course.category_id,
+        'instructor_id': course.instructor_id, 'language': 'English', 'level': 'beginner',
+        'duration_hours': '5.00', 'requirements': 'None', 'what_you_learn': 'Benchmarks',
+        'thumbnail': 'https://example.com/t.png', 'status': 'draft',
+    }
+
+
+def compare(results, previous, max_regression=None):
+    diff, failures = {}, []
+    for name, current in results.items():
+        before = previous.get('endpoints', {}).get(name)
+        if not before or not before['latency'] or not current['latency']:
+            continue
+        ratio = current['latency']['p95_ms'] / before['latency']['p95_ms'] if before['latency']['p95_ms'] else None
+        diff[name] = {
+            'p50_ms': [before['latency']['p50_ms'], current['latency']['p50_ms']],
+            'p95_ms': [before['latency']['p95_ms'], current['latency']['p95_ms']],
+            'p95_ratio': round(ratio, 3) if ratio else None,
+            'queries': [before['queries'], current['queries']],
+        }
+        if max_regression is not None and ratio and ratio > 1 + max_regression:
+            failures.append(f'{name}: p95 grew {ratio:.2f}x')
+    return diff, failures
+
+
+def run(options):
+    rows = generate(options['scale'], options['seed'])
+    published = Course.objects.filter(status='published').order_by('pk')
+    course = published[published.count() // 2]
+    owner = Client()
+    owner.force_login(course.instructor.user)
+    anonymous = Client()
+    runner = EndpointRunner(options['iterations'])
+    list_url = reverse('courses:create-list')
+    detail_url = reverse('courses:course-detail', args=[course.pk])
+    root = Category.objects.filter(parent=None).order_by('pk').first()
+    titles = count()
+    # Deleting a course with its curriculum, enrollments and reviews is what exercises the cascade signals.
+    populated = list(
+        Course.objects.exclude(pk=course.pk).filter(enrollments__isnull=False, sections__lessons__isnull=False)
+        .distinct().order_by('pk').values_list('pk', flat=True)
+    )
+    admin = Client()
+    admin.force_login(User.objects.create_superuser('benchmark-admin', password=None))
+
+    # The test client sends Host: testserver.
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        runner.measure('list', lambda _: anonymous.get(list_url), 200)
+        runner.measure('list_filtered', lambda _: anonymous.get(
+            f'{list_url}?level=beginner&language=English&category_tree={root.pk}'), 200)
+        runner.measure('detail_cold', lambda _: anonymous.get(detail_url), 200, before=lambda _: cache.clear())
+        runner.measure('detail_warm', lambda _: anonymous.get(detail_url), 200)
+        runner.measure('search', lambda _: anonymous.get(reverse('courses:course-search') + '?q=python+web'), 200)
+        runner.measure('create', lambda _: owner.post(
+            list_url, course_payload(course, f'Benchmark course {next(titles)}'), content_type='application/json',
+        ), 201)
+        runner.measure('update', lambda i: owner.patch(
+            detail_url, {'title': f'Renamed benchmark course {i}'}, content_type='application/json'), 200)
+        runner.measure('delete', lambda i: admin.delete(reverse('courses:course-detail', args=[populated[i]])), 204,
+                       iterations=len(populated))
+
+    results = {
+        'scale': options['scale'],
+        'seed': options['seed'],
+        'iterations': options['iterations'],
+        'rows': rows,
+        'endpoints': runner.results,
+        'budgets': QUERY_BUDGETS,
+    }
+    failures = runner.failures
+    if options['compare']:
+        with open(options['compare']) as fh:
+            results['compare'], regressions = compare(runner.results, json.load(fh), options['max_regression'])
+        failures += regressions
+    results['failures'] = failures
+    return results
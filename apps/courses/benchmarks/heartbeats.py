@@ -0,0 +1,106 @@
+"""Watch-progress heartbeat ingestion: batched upserts against per-event read-modify-write."""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from apps.courses.models import Category, Course, CourseStats, Enrollment, Instructor, Lesson, LessonProgress, Section
+from apps.courses.progress import HeartbeatBuffer, update_progress
+
+
+def add_arguments(parser):
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--lessons', type=int, default=50)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=200, help="Events per heartbeat request.")
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def build_dataset(options):
+    user = User.objects.create_user(username='bench-instructor')
+    instructor = Instructor.objects.create(user=user, bio='', profile_image='https://example.com/p.png',
+                                           expertise='Video')
+    category = Category.objects.create(name='Video', slug='video', description='', icon='play')
+    course = Course.objects.create(
+        title='Heartbeats', slug='heartbeats', description='', instructor=instructor, category=category,
+        thumbnail='https://example.com/t.png', price='0.00', level='beginner', duration_hours='1.00',
+        requirements='', what_you_learn='',
+    )
+    section = Section.objects.create(course=course, title='Only section')
+    lessons = Lesson.objects.bulk_create(
+        Lesson(section=section, title=f'Lesson {n}', content='', video_url='https://v.example.com',
+               duration_minutes=10, order=n)
+        for n in range(options['lessons'])
+    )
+    CourseStats.objects.filter(course=course).update(total_lessons=len(lessons), total_duration=10 * len(lessons))
+    students = User.objects.bulk_create(User(username=f'student-{n}') for n in range(options['students']))
+    enrollments = Enrollment.objects.bulk_create(Enrollment(student=student, course=course) for student in students)
+    return [enrollment.pk for enrollment in enrollments], [lesson.pk for lesson in lessons]
+
+
+def make_events(options, enrollment_ids, lesson_ids):
+    rng = random.Random(options['seed'])
+    # Each student watches a handful of lessons, so most heartbeats repeat a key.
+    watching = {pk: rng.sample(lesson_ids, min(3, len(lesson_ids))) for pk in enrollment_ids}
+    return [
+        (enrollment_id, rng.choice(watching[enrollment_id]), 5)
+        for enrollment_id in (rng.choice(enrollment_ids) for _ in range(options['events']))
+    ]
+
+
+def reset():
+    LessonProgress.objects.all().delete()
+    Enrollment.objects.update(progress_percentage=0, status='active', completed_at=None)
+
+
+def batched(events, batch):
+    for start in range(0, len(events), batch):
+        buffer = HeartbeatBuffer()
+        for enrollment_id, lesson_id, seconds in events[start:start + batch]:
+            buffer.add(enrollment_id, lesson_id, seconds)
+        buffer.flush()
+
+
+def per_event(events, batch):
+    # What every heartbeat cost before batching: a read-modify-write and a progress recompute.
+    for enrollment_id, lesson_id, seconds in events:
+        with transaction.atomic():
+            row, _ = LessonProgress.objects.get_or_create(enrollment_id=enrollment_id, lesson_id=lesson_id)
+            row.watch_time_seconds += seconds
+            row.watch_time_minutes = row.watch_time_seconds // 60
+            row.save()
+            update_progress([enrollment_id])
+
+
+def measure(ingest, events, batch):
+    reset()
+    start = time.perf_counter()
+    ingest(events, batch)
+    elapsed = time.perf_counter() - start
+    total = sum(LessonProgress.objects.values_list('watch_time_seconds', flat=True))
+    return {'seconds': round(elapsed, 3), 'events_per_second': round(len(events) / elapsed), 'watched': total}
+
+
+def run(options):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        journal_mode = cursor.fetchone()[0]
+    enrollment_ids, lesson_ids = build_dataset(options)
+    events = make_events(options, enrollment_ids, lesson_ids)
+    expected = sum(seconds for _, _, seconds in events)
+
+    results = {
+        'journal_mode': journal_mode,
+        'events': len(events),
+        'batch': options['batch'],
+        'batched': measure(batched, events, options['batch']),
+        'per_event': measure(per_event, events, options['batch']),
+    }
+    results['speedup'] = round(
+        results['batched']['events_per_second'] / results['per_event']['events_per_second'], 1,
+    )
+    results['failures'] = [
+        f'{name} lost watch time' for name in ('batched', 'per_event') if results[name]['watched'] != expected
+    ]
+    return results
@@ -0,0 +1,130 @@
+"""Heartbeat ingestion under concurrency: async write-behind (ASGI) against the synchronous DRF view (WSGI)."""
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from apps.courses.async_views import heartbeat_queue
+from apps.courses.benchmarks import percentiles
+from apps.courses.benchmarks.heartbeats import build_dataset, reset
+from apps.courses.models import Enrollment, Lesson, LessonProgress
+
+
+def add_arguments(parser):
+    parser.add_argument('--lessons', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=10, help="Heartbeats per request.")
+    parser.add_argument('--concurrency', type=int, default=16)
+
+
+def make_clients(options):
+    """One (student, request bodies) pair per concurrent client; each client posts for its own student."""
+    enrollments = list(Enrollment.objects.values_list('pk', 'student_id'))
+    lessons = list(Lesson.objects.values_list('pk', flat=True))
+    users = User.objects.in_bulk([student_id for _, student_id in enrollments])
+    clients = []
+    for n in range(options['concurrency']):
+        enrollment_id, student_id = enrollments[n % len(enrollments)]
+        bodies = [
+            json.dumps({'events': [
+                {'enrollment': enrollment_id, 'lesson': lessons[(r + i) % len(lessons)], 'seconds': 5}
+                for i in range(options['events'])
+            ]})
+            for r in range(n, options['requests'], options['concurrency'])
+        ]
+        clients.append((users[student_id], bodies))
+    return clients
+
+
+def summarise(samples, statuses, elapsed, durable_after):
+    return {
+        'latency': percentiles(samples),
+        'requests_per_second': round(len(samples) / elapsed),
+        'durable_after_seconds': round(durable_after, 3),
+        'statuses': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+    }
+
+
+def run_wsgi(clients, options):
+    url = reverse('courses:progress-heartbeats')
+    samples, statuses = [], []
+
+    def worker(user, bodies):
+        # Server errors (e.g. SQLITE_BUSY under concurrent writers) are counted, not raised.
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        try:
+            for body in bodies:
+                start = time.perf_counter()
+                response = client.post(url, body, content_type='application/json')
+                samples.append(time.perf_counter() - start)
+                statuses.append(response.status_code)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(options['concurrency']) as pool:
+        list(pool.map(worker, *zip(*clients)))
+    elapsed = time.perf_counter() - start
+    return summarise(samples, statuses, elapsed, elapsed)
+
+
+def run_asgi(clients, options):
+    url = reverse('courses:progress-heartbeats-async')
+    samples, statuses = [], []
+
+    async def worker(user, bodies):
+        client = AsyncClient(raise_request_exception=False)
+        await client.aforce_login(user)
+        for body in bodies:
+            start = time.perf_counter()
+            response = await client.post(url, body, content_type='application/json')
+            samples.append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(user, bodies) for user, bodies in clients))
+        acknowledged = time.perf_counter() - start
+        await heartbeat_queue.drain()
+        return acknowledged, time.perf_counter() - start
+
+    elapsed, durable_after = asyncio.run(main())
+    return summarise(samples, statuses, elapsed, durable_after)
+
+
+def watched():
+    return sum(LessonProgress.objects.values_list('watch_time_seconds', flat=True))
+
+
+def run(options):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+    build_dataset({'students': options['concurrency'], 'lessons': options['lessons']})
+    clients = make_clients(options)
+    expected = 5 * options['events'] * options['requests']
+
+    results = {'requests': options['requests'], 'events_per_request': options['events'],
+               'concurrency': options['concurrency']}
+    failures = []
+    # Failed baseline requests are counted in the results; their tracebacks would only bury them.
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    for name, runner in (('wsgi', run_wsgi), ('asgi_write_behind', run_asgi)):
+        reset()
+        # The test clients send Host: testserver.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            results[name] = runner(clients, options)
+        results[name]['watched_seconds'] = watched()
+    results['expected_watched_seconds'] = expected
+    # Only the write-behind path is checked: the synchronous one is the baseline and its failed requests
+    # (reported under ``statuses``) are part of what is being measured.
+    if results['asgi_write_behind']['watched_seconds'] != expected:
+        failures.append(f"write-behind recorded {results['asgi_write_behind']['watched_seconds']}s of {expected}s")
+    results['failures'] = failures
+    return results
@@ -0,0 +1,69 @@
+"""Instructor rollups: a full recompute and an incremental run after a small share of courses changed."""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.courses.models import Category, Course, CourseStats, Instructor
+from apps.courses.rollups import run_rollup
+
+
+def add_arguments(parser):
+    parser.add_argument('--instructors', type=int, default=50000)
+    parser.add_argument('--courses-per-instructor', type=int, default=2)
+    parser.add_argument('--touched', type=float, default=0.01, help="Share of courses changed before the incremental run.")
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def build_dataset(options):
+    rng = random.Random(options['seed'])
+    category = Category.objects.create(name='Bench', slug='bench', description='', icon='code')
+    users = User.objects.bulk_create(
+        (User(username=f'instructor-{n}') for n in range(options['instructors'])), batch_size=5000,
+    )
+    instructors = Instructor.objects.bulk_create(
+        (Instructor(user=user, bio='', profile_image='https://example.com/p.png', expertise='') for user in users),
+        batch_size=5000,
+    )
+    courses = Course.objects.bulk_create(
+        (
+            Course(title='Course', slug=f'course-{instructor.pk}-{n}', description='', instructor=instructor,
+                   category=category, thumbnail='https://example.com/t.png', price='10.00', level='beginner',
+                   duration_hours='1.00', requirements='', what_you_learn='')
+            for instructor in instructors for n in range(options['courses_per_instructor'])
+        ),
+        batch_size=5000,
+    )
+    stats = []
+    for course in courses:
+        reviews = rng.randint(0, 50)
+        stats.append(CourseStats(course=course, students_count=rng.randint(0, 500), reviews_count=reviews,
+                                 rating_sum=sum(rng.randint(1, 5) for _ in range(reviews))))
+    CourseStats.objects.bulk_create(stats, batch_size=5000)
+    # As if the data had been there for a while, so the incremental run only sees the changes made below.
+    CourseStats.objects.update(updated_at=timezone.now() - timedelta(days=1))
+    return [course.pk for course in courses]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    considered, updated = function(*args, **kwargs)
+    return {'seconds': round(time.perf_counter() - start, 3), 'considered': considered, 'updated': updated}
+
+
+def run(options):
+    course_ids = build_dataset(options)
+    results = {'instructors': options['instructors'], 'courses': len(course_ids)}
+    results['full'] = timed(run_rollup, full=True)
+
+    touched = random.Random(options['seed']).sample(course_ids, max(1, int(len(course_ids) * options['touched'])))
+    CourseStats.objects.filter(course__in=touched).update(students_count=0, updated_at=timezone.now())
+    results['incremental'] = timed(run_rollup)
+
+    expected = CourseStats.objects.aggregate(total=Sum('students_count'))['total']
+    actual = Instructor.objects.aggregate(total=Sum('total_students'))['total']
+    results['failures'] = [] if expected == actual else [f'total_students {actual} != {expected}']
+    return results
@@ -0,0 +1,87 @@
+"""Slug allocation for course titles that already have thousands of collisions."""
+import threading
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from apps.courses.benchmarks import percentiles, timer
+from apps.courses.id_generator import generate_id
+from apps.courses.models import Category, Course, Instructor
+from apps.courses.slugs import save_with_unique_slug, slug_base
+
+TITLE = 'Complete Python Bootcamp From Zero to Hero'
+
+
+def add_arguments(parser):
+    parser.add_argument('--collisions', type=int, default=5000, help="Existing courses sharing the title.")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+
+
+def new_course(instructor, category):
+    return Course(
+        title=TITLE, description='D' * 60, instructor=instructor, category=category,
+        thumbnail='https://example.com/t.png', price='10.00', level='beginner', duration_hours='1.00',
+        requirements='', what_you_learn='',
+    )
+
+
+def probing_create(course):
+    # The allocation loop this replaced, kept for comparison.
+    slug = base = slug_base(TITLE)
+    while Course.objects.filter(slug=slug).exists():
+        slug = f"{base}-{generate_id()}"
+    course.slug = slug
+    course.save()
+
+
+def measure(create, instructor, category, iterations):
+    samples, queries = [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx, timer(samples):
+            create(new_course(instructor, category))
+        queries.append(len(ctx.captured_queries))
+    return {'latency': percentiles(samples), 'queries_per_create': max(queries)}
+
+
+def run(options):
+    user = User.objects.create_user(username='bench-instructor')
+    instructor = Instructor.objects.create(user=user, bio='', profile_image='https://example.com/p.png',
+                                           expertise='Python')
+    category = Category.objects.create(name='Programming', slug='programming', description='', icon='code')
+
+    base = slug_base(TITLE)
+    existing = [new_course(instructor, category) for _ in range(options['collisions'])]
+    for index, course in enumerate(existing):
+        course.slug = base if index == 0 else f"{base}-{generate_id()}"
+    Course.objects.bulk_create(existing, batch_size=1000)
+
+    results = {
+        'collisions': options['collisions'],
+        'allocator': measure(lambda course: save_with_unique_slug(course, TITLE), instructor, category,
+                             options['iterations']),
+        'probing_loop': measure(probing_create, instructor, category, options['iterations']),
+    }
+
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(options['iterations'] // options['threads'] or 1):
+                save_with_unique_slug(new_course(instructor, category), TITLE)
+        except Exception as exc:  # reported, not raised: the point is to count them
+            errors.append(repr(exc))
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    duplicates = Course.objects.count() - Course.objects.values('slug').distinct().count()
+    results['concurrent'] = {'threads': options['threads'], 'errors': errors, 'duplicate_slugs': duplicates}
+    results['failures'] = errors + (['duplicate slugs'] if duplicates else [])
+    return results
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class VersionedCache:
+    """
+    Cache of rendered payloads keyed by ``(key, version)``.
+
+    Writers never delete payloads: they bump the version so readers move on to a new key and the old
+    entries simply expire. Only ``get``/``set``/``add`` are used, so any Django backend works, but bumps
+    only reach processes sharing the backend. Version keys expire with the payloads, so a process on a
+    private (local-memory) cache serves a body at most one timeout after another process changed it.
+    """
+
+    def __init__(self, prefix, timeout_setting, dependents=()):
+        self.prefix = prefix
+        self.timeout_setting = timeout_setting
+        # ``(cache, key)`` pairs built from these payloads; every bump here bumps them too.
+        self.dependents = dependents
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'COURSES_CACHE_ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        return getattr(settings, self.timeout_setting, 60 * 60)
+
+    def version_key(self, key):
+        return f'{self.prefix}:version:{key}'
+
+    def get_version(self, key):
+        version = self.cache.get(self.version_key(key))
+        if version is None:
+            # Seeded from the clock so a version evicted from the cache is never handed out again.
+            self.cache.add(self.version_key(key), time.time_ns(), timeout=self.timeout)
+            version = self.cache.get(self.version_key(key))
+        return version
+
+    def bump(self, *keys):
+        """
+        Invalidate ``keys`` once the current transaction commits.
+
+        Versions are nanosecond timestamps of the last change (or of the first read after an eviction),
+        which also makes them usable as Last-Modified values.
+        """
+        def bump_versions():
+            now = time.time_ns()
+            for key in set(keys):
+                current = self.cache.get(self.version_key(key))
+                if current is not None:
+                    # Nothing cached under a missing key; the next read seeds a fresh version.
+                    self.cache.set(self.version_key(key), max(now, current + 1), timeout=self.timeout)
+        transaction.on_commit(bump_versions)
+        if keys:
+            for cache, key in self.dependents:
+                cache.bump(key)
+
+    def get_or_build(self, key, build, version=None):
+        """Return the cached payload for ``key``, calling ``build()`` on a miss. ``None`` is never cached."""
+        if version is None:
+            version = self.get_version(key)
+        body_key = f'{self.prefix}:{key}:{version}'
+        body = self.cache.get(body_key)
+        if body is not None:
+            self._count(hit=True)
+            return body
+        self._count(hit=False)
+        body = build()
+        if body is not None:
+            self.cache.set(body_key, body, timeout=self.timeout)
+        return body
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+# One version for the whole catalog: list pages and their facets change whenever any course payload does.
+CATALOG = 'catalog'
+course_list_cache = VersionedCache('courses:list', 'COURSE_DETAIL_CACHE_TIMEOUT')
+course_detail_cache = VersionedCache('courses:detail', 'COURSE_DETAIL_CACHE_TIMEOUT',
+                                     dependents=[(course_list_cache, CATALOG)])
+category_tree_cache = VersionedCache('courses:category-tree', 'CATEGORY_TREE_CACHE_TIMEOUT')
@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.courses.id_generator import certificate_number
+from apps.courses.models import Certificate, CertificateSequence, Enrollment
+
+CERTIFICATE_DIR = 'certificates'
+TEMPLATE = """<svg xmlns="http://www.w3.org/2000/svg" width="1123" height="794" viewBox="0 0 1123 794">
+  <rect x="20" y="20" width="1083" height="754" fill="none" stroke="#1f3a5f" stroke-width="6"/>
+  <text x="561" y="200" font-size="48" text-anchor="middle" font-family="serif">Certificate of Completion</text>
+  <text x="561" y="330" font-size="36" text-anchor="middle" font-family="serif">{student}</text>
+  <text x="561" y="400" font-size="22" text-anchor="middle" font-family="sans-serif">has completed</text>
+  <text x="561" y="460" font-size="30" text-anchor="middle" font-family="serif">{course}</text>
+  <text x="561" y="640" font-size="18" text-anchor="middle" font-family="sans-serif">{number} · {date}</text>
+</svg>
+"""
+
+
+def eligible_enrollments(course_ids=None):
+    """Completed enrollments without a certificate, as one anti-join (``LEFT JOIN ... IS NULL``)."""
+    enrollments = Enrollment.objects.filter(status='completed', certificate__isnull=True)
+    if course_ids:
+        enrollments = enrollments.filter(course_id__in=course_ids)
+    return enrollments
+
+
+def reserve_numbers(counts):
+    """
+    Reserve ``counts[course_id]`` consecutive sequence numbers per course.
+
+    Each course costs one ``UPDATE ... SET last_number = last_number + n`` and one read inside a transaction,
+    so concurrent runs get disjoint blocks. Returns ``{course_id: first number of the block}``.
+    """
+    CertificateSequence.objects.bulk_create(
+        [CertificateSequence(course_id=course_id) for course_id in counts], ignore_conflicts=True,
+    )
+    starts = {}
+    for course_id, count in counts.items():
+        with transaction.atomic():
+            CertificateSequence.objects.filter(course_id=course_id).update(last_number=F('last_number') + count)
+            last = CertificateSequence.objects.values_list('last_number', flat=True).get(course_id=course_id)
+        starts[course_id] = last - count + 1
+    return starts
+
+
+def render_certificate(job):
+    """Write one certificate file; runs in worker processes, so it only touches the filesystem."""
+    root, relative_path, context = job
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        fh.write(TEMPLATE.format(**{key: escape(str(value)) for key, value in context.items()}))
+    os.replace(tmp, path)
+    return relative_path
+
+
+class CertificateIssuer:
+    """
+    Issues certificates for every eligible enrollment.
+
+    Batches are taken from the anti-join in primary key order. For each one, sequence numbers are reserved per
+    course, the files are rendered in a process pool and only then are the rows inserted with one
+    ``bulk_create``, so a row never points at a missing file. Running it again, or after a crash, just picks
+    up the enrollments that still have no certificate; numbers reserved by an interrupted batch are skipped,
+    never reused.
+    """
+
+    def __init__(self, batch_size=1000, workers=None, course_ids=None):
+        self.batch_size = batch_size
+        self.workers = os.cpu_count() if workers is None else workers
+        self.course_ids = course_ids
+        self.counts = {'issued': 0, 'batches': 0}
+
+    def run(self):
+        pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            last_pk = 0
+            while True:
+                batch = list(
+                    eligible_enrollments(self.course_ids).filter(pk__gt=last_pk).order_by('pk')
+                    .select_related('student', 'course').only(
+                        'course__title', 'student__username', 'student__first_name', 'student__last_name',
+                    )[:self.batch_size]
+                )
+                if not batch:
+                    return self.counts
+                last_pk = batch[-1].pk
+                self.issue(batch, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def issue(self, enrollments, pool=None):
+        counts = {}
+        for enrollment in enrollments:
+            counts[enrollment.course_id] = counts.get(enrollment.course_id, 0) + 1
+        next_number = reserve_numbers(counts)
+
+        today = timezone.localdate().isoformat()
+        certificates, jobs = [], []
+        for enrollment in enrollments:
+            number = certificate_number(enrollment.course_id, next_number[enrollment.course_id])
+            next_number[enrollment.course_id] += 1
+            relative_path = f'{CERTIFICATE_DIR}/{enrollment.course_id}/{number}.svg'
+            student = enrollment.student.get_full_name() or enrollment.student.username
+            jobs.append((str(settings.MEDIA_ROOT), relative_path,
+                         {'student': student, 'course': enrollment.course.title, 'number': number, 'date': today}))
+            certificates.append(Certificate(enrollment=enrollment, certificate_number=number,
+                                            certificate_url=urljoin(settings.SITE_URL, settings.MEDIA_URL + relative_path)))
+
+        if pool is None:
+            list(map(render_certificate, jobs))
+        else:
+            list(pool.map(render_certificate, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))))
+
+        # A concurrent run may have certified some of these meanwhile; its rows win and ours are dropped.
+        # The numbers were reserved for this batch alone, so the ones found afterwards are the rows inserted.
+        Certificate.objects.bulk_create(certificates, batch_size=self.batch_size, ignore_conflicts=True)
+        inserted = set(Certificate.objects.filter(
+            certificate_number__in=[certificate.certificate_number for certificate in certificates],
+        ).values_list('certificate_number', flat=True))
+        for certificate, (root, relative_path, context) in zip(certificates, jobs):
+            if certificate.certificate_number not in inserted:
+                os.remove(os.path.join(root, relative_path))
+        self.counts['issued'] += len(inserted)
+        self.counts['batches'] += 1
@@ -0,0 +1,72 @@
+"""
+Deep copies of a course for a new edition.
+
+``clone_course`` reads the source curriculum in two queries and writes the copy with one ``bulk_create`` per
+level: the course, its sections, then its lessons, whose ``section`` is remapped to the new sections in
+memory. ``bulk_create`` sends no signals, so the copy's stats row, search entry, list version and the detail
+versions of the instructor's courses are handled here too.
+"""
+from django.db import IntegrityError, transaction
+
+from apps.courses.cache import CATALOG, course_detail_cache, course_list_cache
+from apps.courses.models import Course, CourseStats, Lesson, Section
+from apps.courses.search import index_courses
+from apps.courses.slugs import MAX_ATTEMPTS, allocate_slugs
+
+# Not carried over: the copy gets its own identity, slug and timestamps and starts as an unfeatured draft.
+RESET_FIELDS = ('id', 'slug', 'status', 'is_featured', 'created_at', 'updated_at')
+
+
+def copy_fields(instance, exclude=('id',)):
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in type(instance)._meta.concrete_fields if field.name not in exclude
+    }
+
+
+def clone_course(course, title=None, instructor=None):
+    """
+    Copy ``course`` with its sections and lessons as a new draft and return the copy.
+
+    ``title`` and ``instructor`` default to the source's. Section and lesson order keys are kept as they are.
+    The slug comes from ``allocate_slugs``; if a concurrent writer takes it first, the copy is written again.
+    """
+    sections = list(Section.objects.filter(course=course).order_by('order', 'pk'))
+    lessons = list(Lesson.objects.filter(section__course=course).order_by('section_id', 'order', 'pk'))
+    fields = copy_fields(course, exclude=RESET_FIELDS)
+    fields['title'] = title or course.title
+    if instructor is not None:
+        fields['instructor_id'] = instructor.pk
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return write_copy(fields, sections, lessons)
+        except IntegrityError:
+            # A concurrent writer took the slug; allocate again.
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+
+
+def write_copy(fields, sections, lessons):
+    [slug] = allocate_slugs(Course, [fields['title']])
+    copy = Course(slug=slug, status='draft', **fields)
+    Course.objects.bulk_create([copy])
+
+    new_sections = [Section(**copy_fields(section, exclude=('id', 'course')), course=copy) for section in sections]
+    Section.objects.bulk_create(new_sections)
+    section_map = {old.pk: new for old, new in zip(sections, new_sections)}
+
+    Lesson.objects.bulk_create([
+        Lesson(**copy_fields(lesson, exclude=('id', 'section')), section=section_map[lesson.section_id])
+        for lesson in lessons
+    ], batch_size=2000)
+
+    CourseStats.objects.create(
+        course=copy, total_lessons=len(lessons), total_duration=sum(lesson.duration_minutes for lesson in lessons),
+    )
+    index_courses([copy.pk])
+    # The instructor's other courses embed their courses_count.
+    course_detail_cache.bump(*Course.objects.filter(instructor_id=copy.instructor_id).values_list('pk', flat=True))
+    course_list_cache.bump(CATALOG)
+    return copy
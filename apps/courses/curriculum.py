@@ -0,0 +1,168 @@
+"""
+Reordering a course's sections and lessons.
+
+``Section.order`` and ``Lesson.order`` are gapped: fresh numbering leaves ``ORDER_GAP`` between neighbours,
+so moving one item gives it a key between its new neighbours and leaves every other row alone. Which rows
+keep their key is decided by the longest run of items already in increasing order; only the rest are
+rewritten. When a gap runs out, that one section (or the course's section list) is renumbered.
+"""
+from bisect import bisect_left
+
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from apps.courses.cache import course_detail_cache
+from apps.courses.models import Lesson, Section
+
+ORDER_GAP = 1024
+
+
+def increasing_run(keys):
+    """Indexes of a longest strictly increasing subsequence of ``keys``; ``None`` never belongs to it."""
+    tails, tail_index, previous = [], [], [None] * len(keys)
+    for index, key in enumerate(keys):
+        if key is None:
+            continue
+        position = bisect_left(tails, key)
+        if position == len(tails):
+            tails.append(key)
+            tail_index.append(index)
+        else:
+            tails[position] = key
+            tail_index[position] = index
+        previous[index] = tail_index[position - 1] if position else None
+    run, index = [], tail_index[-1] if tail_index else None
+    while index is not None:
+        run.append(index)
+        index = previous[index]
+    return set(run)
+
+
+def assign_orders(keys):
+    """
+    New order keys for items whose current keys, in their new sequence, are ``keys`` (``None``: new here).
+
+    Items in the longest increasing run keep their keys; the others are spread evenly through the gap
+    between their kept neighbours. If a gap is too small, everything is renumbered ``ORDER_GAP`` apart.
+    """
+    kept = increasing_run(keys)
+    result = [keys[index] if index in kept else None for index in range(len(keys))]
+    index = 0
+    while index < len(result):
+        if result[index] is not None:
+            index += 1
+            continue
+        end = index
+        while end < len(result) and result[end] is None:
+            end += 1
+        low = result[index - 1] if index else 0
+        count = end - index
+        if end == len(result):
+            values = [low + ORDER_GAP * (n + 1) for n in range(count)]
+        else:
+            step = (result[end] - low) // (count + 1)
+            if step < 1:
+                return [ORDER_GAP * (n + 1) for n in range(len(keys))]
+            values = [low + step * (n + 1) for n in range(count)]
+        result[index:end] = values
+        index = end
+    return result
+
+
+def load_curriculum(course):
+    """``([section, ...], {section_id: [lesson, ...]})`` in display order, locked for the transaction."""
+    sections = list(Section.objects.select_for_update().filter(course=course).order_by('order', 'pk'))
+    lessons = {section.pk: [] for section in sections}
+    for lesson in (Lesson.objects.select_for_update().filter(section__course=course)
+                   .order_by('section_id', 'order', 'pk').only('id', 'section_id', 'order')):
+        lessons[lesson.section_id].append(lesson)
+    return sections, lessons
+
+
+def arrange(sections, lessons, layout):
+    """Check that ``layout`` (``[{'id': section, 'lessons': [ids]}]``) lists every item exactly once."""
+    sections_by_id = {section.pk: section for section in sections}
+    lessons_by_id = {lesson.pk: lesson for group in lessons.values() for lesson in group}
+    section_ids = [entry['id'] for entry in layout]
+    lesson_ids = [lesson_id for entry in layout for lesson_id in entry['lessons']]
+    if sorted(section_ids) != sorted(sections_by_id):
+        raise ValidationError({'sections': "List every section of the course exactly once."})
+    if sorted(lesson_ids) != sorted(lessons_by_id):
+        raise ValidationError({'sections': "List every lesson of the course exactly once."})
+    return (
+        [sections_by_id[pk] for pk in section_ids],
+        {entry['id']: [lessons_by_id[pk] for pk in entry['lessons']] for entry in layout},
+    )
+
+
+def apply_moves(sections, lessons, moves):
+    """The arrangement after ``moves``, applied in sequence; ``position`` is clamped to the container size."""
+    sections, lessons = list(sections), {pk: list(group) for pk, group in lessons.items()}
+    for number, move in enumerate(moves):
+        if move['type'] == 'section':
+            section = next((section for section in sections if section.pk == move['id']), None)
+            if section is None:
+                raise ValidationError({'moves': f"Move {number}: section {move['id']} is not part of this course."})
+            sections.remove(section)
+            sections.insert(min(move['position'], len(sections)), section)
+            continue
+        source = next((pk for pk, group in lessons.items() if any(lesson.pk == move['id'] for lesson in group)), None)
+        if source is None:
+            raise ValidationError({'moves': f"Move {number}: lesson {move['id']} is not part of this course."})
+        target = move.get('section') or source
+        if target not in lessons:
+            raise ValidationError({'moves': f"Move {number}: section {target} is not part of this course."})
+        lesson = next(lesson for lesson in lessons[source] if lesson.pk == move['id'])
+        lessons[source].remove(lesson)
+        lessons[target].insert(min(move['position'], len(lessons[target])), lesson)
+    return sections, lessons
+
+
+def reorder(course, layout=None, moves=None):
+    """
+    Apply a full ``layout`` or a list of ``moves`` to ``course``; returns the number of rows written.
+
+    Everything happens in one transaction with one ``bulk_update`` per model, covering only the rows whose
+    key or section changed. Lessons stay within the course, so its stats do not change.
+    """
+    with transaction.atomic():
+        sections, lessons = load_curriculum(course)
+        if layout is not None:
+            new_sections, new_lessons = arrange(sections, lessons, layout)
+        else:
+            new_sections, new_lessons = apply_moves(sections, lessons, moves)
+
+        changed_sections = []
+        for section, order in zip(new_sections, assign_orders([section.order for section in new_sections])):
+            if section.order != order:
+                section.order = order
+                changed_sections.append(section)
+        changed_lessons = []
+        for section_id, group in new_lessons.items():
+            keys = [lesson.order if lesson.section_id == section_id else None for lesson in group]
+            for lesson, order in zip(group, assign_orders(keys)):
+                if (lesson.section_id, lesson.order) != (section_id, order):
+                    lesson.section_id, lesson.order = section_id, order
+                    changed_lessons.append(lesson)
+
+        Section.objects.bulk_update(changed_sections, ['order'])
+        Lesson.objects.bulk_update(changed_lessons, ['section', 'order'])
+        if changed_sections or changed_lessons:
+            course_detail_cache.bump(course.pk)
+    return len(changed_sections) + len(changed_lessons)
+
+
+def curriculum(course):
+    """The course's sections and lessons in display order, as plain data; two queries."""
+    sections = Section.objects.filter(course=course).order_by('order', 'pk').prefetch_related(
+        Prefetch('lessons', queryset=Lesson.objects.order_by('section_id', 'order', 'pk').only(
+            'id', 'section_id', 'title', 'order',
+        )),
+    )
+    return [
+        {'id': section.pk, 'title': section.title, 'order': section.order, 'lessons': [
+            {'id': lesson.pk, 'title': lesson.title, 'order': lesson.order} for lesson in section.lessons.all()
+        ]}
+        for section in sections
+    ]
@@ -0,0 +1,81 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from apps.courses.cache import course_detail_cache
+from apps.courses.models import Course, Enrollment, Instructor
+from apps.courses.stats import apply_delta
+
+USER_ID_COLUMNS = ('user_id', 'id')
+
+
+def read_user_ids(lines):
+    """
+    User ids from CSV ``lines``: the ``user_id`` (or ``id``) column when there is a header, else the first one.
+
+    Raises ``ValueError`` naming the line of the first value that is not a positive integer.
+    """
+    rows = csv.reader(lines)
+    column, user_ids = 0, []
+    for line, row in enumerate(rows, start=1):
+        if not row or not ''.join(row).strip():
+            continue
+        if line == 1 and not row[0].strip().isdigit():
+            header = [name.strip().lower() for name in row]
+            column = next((header.index(name) for name in USER_ID_COLUMNS if name in header), 0)
+            continue
+        value = row[column].strip() if column < len(row) else ''
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"line {line}: {value!r} is not a user id")
+        user_ids.append(int(value))
+    return user_ids
+
+
+def bulk_enroll(course, user_ids, batch_size=2000):
+    """
+    Enroll ``user_ids`` in ``course`` in batches and report what happened to each of them.
+
+    Each batch is one transaction: one read of the existing users and enrollments, one
+    ``bulk_create(ignore_conflicts=True)``, one read back of the rows it inserted and one counter update each
+    for the course stats and the instructor. No per-row signals run, so this is also where the counters and caches are kept current.
+    Returns ``{'enrolled': [...], 'already_enrolled': [...], 'unknown_users': [...]}`` in input order.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    result = {'enrolled': [], 'already_enrolled': [], 'unknown_users': []}
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        with transaction.atomic():
+            known = set(User.objects.filter(pk__in=batch).values_list('pk', flat=True))
+            enrolled = set(
+                Enrollment.objects.filter(course=course, student_id__in=known).values_list('student_id', flat=True)
+            )
+            enrollments = [
+                Enrollment(student_id=user_id, course=course)
+                for user_id in batch if user_id in known and user_id not in enrolled
+            ]
+            Enrollment.objects.bulk_create(enrollments, batch_size=batch_size, ignore_conflicts=True)
+            # A concurrent enrollment of the same user wins the conflict and ours is dropped; the rows read back
+            # with our own ``enrolled_at`` are the ones this batch inserted.
+            stamps = {(enrollment.student_id, enrollment.enrolled_at) for enrollment in enrollments}
+            inserted = {student_id for student_id, enrolled_at in Enrollment.objects.filter(
+                course=course, student_id__in=[enrollment.student_id for enrollment in enrollments],
+            ).values_list('student_id', 'enrolled_at') if (student_id, enrolled_at) in stamps}
+            if inserted:
+                apply_delta(course_id=course.pk, students_count=len(inserted))
+                Instructor.objects.filter(pk=course.instructor_id).update(
+                    total_students=F('total_students') + len(inserted),
+                )
+        result['enrolled'] += [user_id for user_id in batch if user_id in inserted]
+        result['already_enrolled'] += [
+            user_id for user_id in batch if user_id in known and user_id not in inserted
+        ]
+        result['unknown_users'] += [user_id for user_id in batch if user_id not in known]
+
+    if result['enrolled']:
+        # The detail embeds the instructor, whose student count moved on every one of their courses.
+        course_detail_cache.bump(
+            *Course.objects.filter(instructor_id=course.instructor_id).values_list('pk', flat=True)
+        )
+    return result
@@ -0,0 +1,37 @@
+from itertools import islice
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.courses.models import Course
+from apps.courses.serializers import CourseRegisterSerializer
+
+FORMATS = ('ndjson', 'json')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+
+def iter_course_chunks(chunk_size=500, queryset=None):
+    """Yield serialized courses ``chunk_size`` at a time; only one chunk is ever held in memory."""
+    if queryset is None:
+        queryset = Course.objects.with_stats()
+    courses = queryset.order_by('pk').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(courses, chunk_size))
+        if not chunk:
+            return
+        yield CourseRegisterSerializer(chunk, many=True).data
+
+
+def export_courses(fmt='ndjson', chunk_size=500, queryset=None):
+    """Yield the catalog as NDJSON lines or as the pieces of one JSON array."""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    if fmt == 'ndjson':
+        for chunk in iter_course_chunks(chunk_size, queryset):
+            yield ''.join(encoder.encode(course) + '\n' for course in chunk)
+        return
+
+    yield '['
+    separator = ''
+    for chunk in iter_course_chunks(chunk_size, queryset):
+        yield separator + ','.join(encoder.encode(course) for course in chunk)
+        separator = ','
+    yield ']\n'
@@ -0,0 +1,168 @@
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from apps.courses.models import Category, Course, subtree_range
+
+# (name, lower bound inclusive, upper bound exclusive); ``None`` leaves the side open.
+PRICE_BUCKETS = [
+    ('free', None, Decimal('0.01')),
+    ('0-50', Decimal('0.01'), Decimal('50')),
+    ('50-100', Decimal('50'), Decimal('100')),
+    ('100-200', Decimal('100'), Decimal('200')),
+    ('200+', Decimal('200'), None),
+]
+BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def price_range(low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+class CourseFilter:
+    """
+    Parses the course list filters from the query string and computes their facet counts.
+
+    Multi-valued filters (``?level=beginner,advanced`` or a repeated parameter) OR their values together;
+    different filters AND together. Facets are disjunctive: the counts of one filter ignore that filter's
+    own selection, so the client can show how many results picking another value would give. They come
+    with the first page only, unless ``?facets=true`` asks for them on a later one (``false`` drops them).
+    """
+
+    choice_filters = {
+        'level': 'level',
+        'language': 'language',
+        'category': 'category_id',
+        'status': 'status',
+    }
+
+    param_names = ('level', 'language', 'category', 'status', 'category_tree', 'is_featured', 'min_price', 'max_price')
+
+    def __init__(self, query_params):
+        self.conditions = {}
+        self.params = sorted((name, query_params.getlist(name)) for name in self.param_names if name in query_params)
+        errors = {}
+        for name, field in self.choice_filters.items():
+            values = [value for raw in query_params.getlist(name) for value in raw.split(',') if value]
+            if name == 'category':
+                try:
+                    values = [int(value) for value in values]
+                except ValueError:
+                    errors[name] = ['Category ids must be integers.']
+                    continue
+            if values:
+                self.conditions[name] = Q(**{f'{field}__in': values})
+
+        if query_params.get('category_tree'):
+            # A category together with all of its descendants, as one range over the indexed paths.
+            try:
+                path = Category.objects.filter(pk=int(query_params['category_tree'])).values_list('path', flat=True).first()
+            except ValueError:
+                errors['category_tree'] = ['Category ids must be integers.']
+            else:
+                self.conditions['category_tree'] = (
+                    Q(**{f'category__{key}': value for key, value in subtree_range(path).items()})
+                    if path else Q(pk__in=[])
+                )
+
+        if query_params.get('is_featured'):
+            featured = BOOLEANS.get(query_params['is_featured'].lower())
+            if featured is None:
+                errors['is_featured'] = ['Expected true or false.']
+            else:
+                self.conditions['is_featured'] = Q(is_featured=featured)
+
+        self.include_facets = 'cursor' not in query_params
+        if query_params.get('facets'):
+            include = BOOLEANS.get(query_params['facets'].lower())
+            if include is None:
+                errors['facets'] = ['Expected true or false.']
+            else:
+                self.include_facets = include
+
+        bounds = {}
+        for name in ('min_price', 'max_price'):
+            if query_params.get(name):
+                try:
+                    bounds[name] = Decimal(query_params[name])
+                except InvalidOperation:
+                    errors[name] = ['Expected a number.']
+                    continue
+                if not bounds[name].is_finite():
+                    del bounds[name]
+                    errors[name] = ['Expected a number.']
+        if bounds:
+            price = Q()
+            if 'min_price' in bounds:
+                price &= Q(price__gte=bounds['min_price'])
+            if 'max_price' in bounds:
+                price &= Q(price__lte=bounds['max_price'])
+            self.conditions['price'] = price
+
+        if errors:
+            raise ValidationError(errors)
+
+    def condition(self, exclude=None):
+        condition = Q()
+        for name, value in self.conditions.items():
+            if name != exclude:
+                condition &= value
+        return condition
+
+    def facets_key(self):
+        """Cache key for the facets of this filter combination."""
+        return 'facets:' + hashlib.sha1(repr(self.params).encode()).hexdigest()
+
+    def filter_queryset(self, queryset):
+        return queryset.filter(self.condition())
+
+    def facets(self, queryset=None):
+        """
+        Count every facet value in one grouped, conditional aggregate.
+
+        Rows are grouped by (language, category); ``level``, ``status``, ``is_featured`` and the price buckets
+        are fixed sets and become one ``COUNT(...) FILTER`` column each, while the per-group language and
+        category counts come from the grouping itself.
+        """
+        queryset = Course.objects.all() if queryset is None else queryset
+        columns = {
+            'total': Count('pk', filter=self.condition()),
+            'language_count': Count('pk', filter=self.condition(exclude='language')),
+            'category_count': Count('pk', filter=self.condition(exclude='category')),
+        }
+        for facet, choices in (('level', Course.LEVEL_CHOICES), ('status', Course.STATUS_CHOICES)):
+            for value, _ in choices:
+                columns[f'{facet}:{value}'] = Count(
+                    'pk', filter=Q(**{facet: value}) & self.condition(exclude=facet),
+                )
+        for value in (True, False):
+            columns[f'is_featured:{value}'] = Count(
+                'pk', filter=Q(is_featured=value) & self.condition(exclude='is_featured'),
+            )
+        for name, low, high in PRICE_BUCKETS:
+            columns[f'price:{name}'] = Count('pk', filter=price_range(low, high) & self.condition(exclude='price'))
+
+        rows = queryset.order_by().values('language', 'category_id', 'category__name').annotate(**columns)
+
+        facets = {'total': 0, 'language': {}, 'category': {}, 'level': {}, 'status': {},
+                  'is_featured': {}, 'price': {}}
+        categories = {}
+        for row in rows:
+            facets['total'] += row.pop('total')
+            language, category_id, category_name = row.pop('language'), row.pop('category_id'), row.pop('category__name')
+            facets['language'][language] = facets['language'].get(language, 0) + row.pop('language_count')
+            category = categories.setdefault(category_id, {'id': category_id, 'name': category_name, 'count': 0})
+            category['count'] += row.pop('category_count')
+            for column, count in row.items():
+                facet, value = column.split(':', 1)
+                facets[facet][value] = facets[facet].get(value, 0) + count
+        facets['category'] = sorted(categories.values(), key=lambda category: -category['count'])
+        facets['is_featured'] = {value.lower(): count for value, count in facets['is_featured'].items()}
+        return facets
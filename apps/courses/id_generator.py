@@ -4,4 +4,22 @@ import string
 
 def generate_id(length=8):
     alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(length))
\ No newline at end of file
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+def luhn_check_digit(digits):
+    """Luhn check digit for a string of decimal digits; catches any single-digit typo and most swaps."""
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def certificate_number(course_id, sequence):
+    """``UC-<course>-<sequence>-<check>``: unique by construction as long as sequences are never reused per course."""
+    digits = f'{course_id:06d}{sequence:07d}'
+    return f'UC-{course_id:06d}-{sequence:07d}-{luhn_check_digit(digits)}'
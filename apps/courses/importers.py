@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from apps.courses.cache import CATALOG, course_detail_cache, course_list_cache
+from apps.courses.models import Category, Course, CourseStats, Instructor, Lesson, Section
+from apps.courses.search import index_courses
+from apps.courses.serializers import CourseImportSerializer
+from apps.courses.slugs import MAX_ATTEMPTS, allocate_slugs
+
+
+def read_jsonl(fh):
+    for line_number, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as exc:
+            yield line_number, exc
+
+
+def read_csv(fh):
+    """CSV rows carry one course each; the nested curriculum goes in a JSON-encoded ``sections`` column."""
+    for line_number, row in enumerate(csv.DictReader(fh), start=1):
+        row = {key: value for key, value in row.items() if value not in (None, '')}
+        try:
+            if 'sections' in row:
+                row['sections'] = json.loads(row['sections'])
+        except ValueError as exc:
+            yield line_number, exc
+            continue
+        yield line_number, row
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+class Checkpoint:
+    """Remembers the last input row whose batch was committed, so an interrupted import can resume."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as fh:
+            return json.load(fh)['row']
+
+    def save(self, row):
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump({'row': row}, fh)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CourseImporter:
+    """
+    Streams courses with nested sections and lessons into the database.
+
+    Rows are validated in batches against instructor and category ids loaded once, and every valid
+    batch is written in one transaction with a ``bulk_create`` per table. Invalid rows are reported
+    and skipped; they never abort the batch they are in.
+    """
+
+    def __init__(self, batch_size=500, on_error=None, checkpoint=None):
+        self.batch_size = batch_size
+        self.on_error = on_error or (lambda row, errors: None)
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.context = {
+            'instructor_ids': set(Instructor.objects.values_list('pk', flat=True)),
+            'category_ids': set(Category.objects.values_list('pk', flat=True)),
+        }
+        self.counts = {'courses': 0, 'sections': 0, 'lessons': 0, 'errors': 0, 'skipped': 0}
+
+    def run(self, rows):
+        resume_after = self.checkpoint.load()
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return self.counts
+            last_row = batch[-1][0]
+            if last_row <= resume_after:
+                self.counts['skipped'] += len(batch)
+                continue
+            pending = [(row, data) for row, data in batch if row > resume_after]
+            self.counts['skipped'] += len(batch) - len(pending)
+            self.import_batch(self.validate(pending))
+            self.checkpoint.save(last_row)
+
+    def validate(self, batch):
+        valid = []
+        for row, data in batch:
+            if isinstance(data, Exception):
+                errors = {'non_field_errors': [str(data)]}
+            else:
+                serializer = CourseImportSerializer(data=data, context=self.context)
+                if serializer.is_valid():
+                    valid.append(serializer.validated_data)
+                    continue
+                errors = serializer.errors
+            self.counts['errors'] += 1
+            self.on_error(row, errors)
+        return valid
+
+    def import_batch(self, rows):
+        if not rows:
+            return
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    self.write(rows)
+                return
+            except IntegrityError:
+                # A concurrent writer took one of the slugs; allocate again.
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+
+    def write(self, rows):
+        slugs = allocate_slugs(Course, [row['title'] for row in rows])
+        courses = []
+        for row, slug in zip(rows, slugs):
+            fields = {key: value for key, value in row.items() if key != 'sections'}
+            fields.setdefault('status', 'draft')
+            courses.append(Course(slug=slug, **fields))
+        Course.objects.bulk_create(courses, batch_size=self.batch_size)
+
+        sections, section_lessons = [], []
+        for course, row in zip(courses, rows):
+            for section_data in row['sections']:
+                section_data = dict(section_data)
+                section_lessons.append(section_data.pop('lessons'))
+                sections.append(Section(course=course, **section_data))
+        Section.objects.bulk_create(sections, batch_size=self.batch_size)
+
+        lessons = [
+            Lesson(section=section, **lesson_data)
+            for section, lesson_list in zip(sections, section_lessons)
+            for lesson_data in lesson_list
+        ]
+        Lesson.objects.bulk_create(lessons, batch_size=2000)
+
+        stats = {course.pk: CourseStats(course=course) for course in courses}
+        for lesson in lessons:
+            course_stats = stats[lesson.section.course_id]
+            course_stats.total_lessons += 1
+            course_stats.total_duration += lesson.duration_minutes
+        CourseStats.objects.bulk_create(stats.values(), batch_size=self.batch_size)
+        index_courses(stats)
+        # The instructors' existing courses embed their courses_count.
+        course_detail_cache.bump(*Course.objects.filter(
+            instructor_id__in={course.instructor_id for course in courses},
+        ).values_list('pk', flat=True))
+        course_list_cache.bump(CATALOG)
+
+        self.counts['courses'] += len(courses)
+        self.counts['sections'] += len(sections)
+        self.counts['lessons'] += len(lessons)
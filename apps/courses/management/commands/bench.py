@@ -0,0 +1,37 @@
+import importlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.benchmarks import BENCHMARKS, benchmark_database
+
+
+class Command(BaseCommand):
+    help = "Run a benchmark against a scratch SQLite database and print the results as JSON."
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='benchmark', required=True, parser_class=type(parser))
+        for name, module_path in BENCHMARKS.items():
+            module = importlib.import_module(module_path)
+            subparser = subparsers.add_parser(name, help=(module.__doc__ or '').strip().splitlines()[0],
+                                              called_from_command_line=getattr(parser, 'called_from_command_line', None))
+            subparser.add_argument('--output', help="Also write the results to this JSON file.")
+            subparser.add_argument('--database', help="New SQLite file to use instead of a temporary one; it must "
+                                                      "not exist and is deleted afterwards.")
+            module.add_arguments(subparser)
+
+    def handle(self, *args, **options):
+        module = importlib.import_module(BENCHMARKS[options['benchmark']])
+        try:
+            with benchmark_database(options['database']):
+                results = module.run(options)
+        except FileExistsError as exc:
+            raise CommandError(str(exc))
+
+        rendered = json.dumps(results, indent=2, sort_keys=True, default=str)
+        self.stdout.write(rendered)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(rendered + '\n')
+        if results.get('failures'):
+            raise CommandError(f"{len(results['failures'])} benchmark check(s) failed")
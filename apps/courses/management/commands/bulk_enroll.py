@@ -0,0 +1,46 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.enrollments import bulk_enroll, read_user_ids
+from apps.courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Enroll a cohort of users in a course from a list of ids or a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', type=int, help="Course id.")
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--users', help="Comma-separated user ids.")
+        source.add_argument('--csv', help="CSV with a user_id (or id) column or ids in the first column; '-' is stdin.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--report', help="Write the per-user outcome to this JSON file.")
+
+    def handle(self, *args, **options):
+        course = Course.objects.filter(pk=options['course']).first()
+        if course is None:
+            raise CommandError(f"Course {options['course']} does not exist")
+
+        try:
+            if options['users'] is not None:
+                user_ids = read_user_ids(options['users'].replace(',', '\n').splitlines())
+            elif options['csv'] == '-':
+                user_ids = read_user_ids(sys.stdin)
+            else:
+                with open(options['csv'], newline='', encoding='utf-8-sig') as fh:
+                    user_ids = read_user_ids(fh)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        started = time.monotonic()
+        result = bulk_enroll(course, user_ids, batch_size=options['batch_size'])
+        if options['report']:
+            with open(options['report'], 'w') as fh:
+                json.dump({'course': course.pk, **result}, fh)
+        self.stdout.write(self.style.SUCCESS(
+            f"Enrolled {len(result['enrolled'])} users in course {course.pk} in {time.monotonic() - started:.1f}s "
+            f"({len(result['already_enrolled'])} already enrolled, {len(result['unknown_users'])} unknown)."
+        ))
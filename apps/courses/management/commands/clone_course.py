@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.cloning import clone_course
+from apps.courses.models import Course, Instructor
+from apps.courses.serializers import CourseCloneSerializer
+
+
+class Command(BaseCommand):
+    help = "Copy a course with its sections and lessons as a new draft."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', type=int, help="Course id.")
+        parser.add_argument('--title', help="Title of the copy; defaults to the source's.")
+        parser.add_argument('--instructor', type=int, help="Instructor id to own the copy; defaults to the source's.")
+
+    def handle(self, *args, **options):
+        course = Course.objects.filter(pk=options['course']).first()
+        if course is None:
+            raise CommandError(f"Course {options['course']} does not exist")
+        instructor = None
+        if options['instructor'] is not None:
+            instructor = Instructor.objects.filter(pk=options['instructor']).first()
+            if instructor is None:
+                raise CommandError(f"Instructor {options['instructor']} does not exist")
+
+        if options['title'] is not None:
+            serializer = CourseCloneSerializer(data={'title': options['title']})
+            if not serializer.is_valid():
+                raise CommandError(' '.join(serializer.errors['title']))
+
+        started = time.monotonic()
+        copy = clone_course(course, title=options['title'], instructor=instructor)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cloned course {course.pk} as {copy.pk} ({copy.slug}) with {copy.stats.total_lessons} lessons "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
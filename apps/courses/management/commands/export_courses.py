@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.courses.exporters import FORMATS, export_courses
+
+
+class Command(BaseCommand):
+    help = "Stream the course catalog as NDJSON or a JSON array with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--output', help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        pieces = export_courses(options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                fh.writelines(pieces)
+        else:
+            for piece in pieces:
+                self.stdout.write(piece, ending='')
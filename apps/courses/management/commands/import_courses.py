@@ -0,0 +1,57 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.importers import READERS, Checkpoint, CourseImporter
+
+
+class Command(BaseCommand):
+    help = "Stream courses with nested sections and lessons from a JSONL or CSV file into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument('--format', choices=sorted(READERS), help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--checkpoint', help="Checkpoint file (default: <path>.checkpoint).")
+        parser.add_argument('--resume', action='store_true', help="Skip rows committed by a previous run.")
+        parser.add_argument('--errors', help="Write per-row errors to this JSONL file instead of stderr.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if fmt not in READERS:
+            raise CommandError(f"Unknown format {fmt!r}; use --format {'/'.join(sorted(READERS))}")
+
+        checkpoint_path = options['checkpoint'] or (None if path == '-' else f'{path}.checkpoint')
+        checkpoint = Checkpoint(checkpoint_path)
+        if not options['resume'] and checkpoint.load():
+            raise CommandError(f"{checkpoint_path} exists; pass --resume to continue or remove it to start over")
+
+        errors_fh = open(options['errors'], 'a') if options['errors'] else None
+
+        def on_error(row, errors):
+            line = json.dumps({'row': row, 'errors': errors}, default=str)
+            if errors_fh:
+                errors_fh.write(line + '\n')
+            else:
+                self.stderr.write(line)
+
+        started = time.monotonic()
+        importer = CourseImporter(batch_size=options['batch_size'], on_error=on_error, checkpoint=checkpoint)
+        fh = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            counts = importer.run(READERS[fmt](fh))
+            checkpoint.clear()
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+            if errors_fh:
+                errors_fh.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['courses']} courses, {counts['sections']} sections and {counts['lessons']} lessons "
+            f"in {elapsed:.1f}s ({counts['errors']} rows rejected, {counts['skipped']} skipped by the checkpoint)."
+        ))
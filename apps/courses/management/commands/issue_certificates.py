@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.courses.certificates import CertificateIssuer
+
+
+class Command(BaseCommand):
+    help = "Issue certificates for every completed enrollment that does not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids',
+                            help="Only this course; may be repeated.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, help="Rendering processes (default: CPU count; 1 renders inline).")
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        issuer = CertificateIssuer(
+            batch_size=options['batch_size'], workers=options['workers'], course_ids=options['course_ids'],
+        )
+        counts = issuer.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"Issued {counts['issued']} certificates in {counts['batches']} batches "
+            f"({time.monotonic() - start:.1f}s)."
+        ))
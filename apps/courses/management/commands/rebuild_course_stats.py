@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.courses.stats import rebuild_course_stats
+
+
+class Command(BaseCommand):
+    help = "Recount CourseStats from enrollments, reviews, sections and lessons and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help="Only rebuild these courses.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without writing.")
+
+    def handle(self, *args, **options):
+        drift = rebuild_course_stats(
+            course_ids=options['course_ids'] or None,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        for course_id, field, stored, actual in drift:
+            self.stdout.write(f"course {course_id}: {field} stored={stored} actual={actual}")
+
+        courses = len({course_id for course_id, *_ in drift})
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("No drift found."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} drifted values in {courses} courses (not fixed)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} drifted values in {courses} courses."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.courses.rollups import run_rollup
+
+
+class Command(BaseCommand):
+    help = "Refresh Instructor.total_students and rating for instructors touched since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every instructor, ignoring the watermark.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        considered, updated = run_rollup(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Checked {considered} instructors, updated {updated}."))
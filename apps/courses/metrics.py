@@ -0,0 +1,166 @@
+"""
+Per-request instrumentation.
+
+Each request gets a ``RequestMetrics`` in a context variable. The database execute wrapper, serializers and
+the middleware add their time to it. Context variables follow a request into ``sync_to_async`` threads, so
+async views are measured the same way as sync ones. Outside a request every hook is a single lookup.
+
+Finished requests are folded into in-process histograms per URL name and served in the Prometheus text
+format by ``MetricsAPIView``. Each worker process keeps its own histograms, so scrape every worker.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from apps.courses.cache import category_tree_cache, course_detail_cache, course_list_cache
+from apps.courses.writebehind import queues
+
+PHASES = ('total', 'sql', 'serialize', 'render')
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+# Requests that resolved to no URL pattern share one label, so scanners cannot grow the label set.
+UNMATCHED = 'unmatched'
+CACHES = {
+    'course-detail': course_detail_cache,
+    'course-list': course_list_cache,
+    'category-tree': category_tree_cache,
+}
+
+current = ContextVar('courses_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql', 'serialize', 'render', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.serializing = False
+
+    def server_timing(self, total):
+        return (
+            f'sql;dur={self.sql * 1000:.1f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize * 1000:.1f}, render;dur={self.render * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql += time.perf_counter() - start
+        metrics.queries += 1
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    """``connection_created`` receiver: every connection, in every thread, reports to the current request."""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+@contextmanager
+def timed_serialization():
+    """Add the enclosed time to the request's serializer time; nested serializers are not counted twice."""
+    metrics = current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize += time.perf_counter() - start
+        metrics.serializing = False
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; turned cumulative when rendered.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.durations = {}
+            self.queries = {}
+
+    def record(self, view, metrics, total):
+        values = {'total': total, 'sql': metrics.sql, 'serialize': metrics.serialize, 'render': metrics.render}
+        with self._lock:
+            for phase in PHASES:
+                key = (view, phase)
+                if key not in self.durations:
+                    self.durations[key] = Histogram(DURATION_BUCKETS)
+                self.durations[key].observe(values[phase])
+            if view not in self.queries:
+                self.queries[view] = Histogram(QUERY_BUCKETS)
+            self.queries[view].observe(metrics.queries)
+
+    def render(self):
+        lines = [
+            '# HELP courses_request_duration_seconds Time spent per request, split by phase.',
+            '# TYPE courses_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            for (view, phase), histogram in sorted(self.durations.items()):
+                lines.extend(histogram.lines('courses_request_duration_seconds', f'view="{view}",phase="{phase}"'))
+            lines += [
+                '# HELP courses_request_queries SQL queries per request.',
+                '# TYPE courses_request_queries histogram',
+            ]
+            for view, histogram in sorted(self.queries.items()):
+                lines.extend(histogram.lines('courses_request_queries', f'view="{view}"'))
+
+        lines += [
+            '# HELP courses_cache_requests_total Payload cache lookups.',
+            '# TYPE courses_cache_requests_total counter',
+        ]
+        for name, versioned_cache in CACHES.items():
+            stats = versioned_cache.stats()
+            lines.append(f'courses_cache_requests_total{{cache="{name}",result="hit"}} {stats["hits"]}')
+            lines.append(f'courses_cache_requests_total{{cache="{name}",result="miss"}} {stats["misses"]}')
+
+        lines += [
+            '# HELP courses_writebehind_items Write-behind queue items by state.',
+            '# TYPE courses_writebehind_items gauge',
+        ]
+        for name, queue in sorted(queues.items()):
+            for state in ('pending', 'flushed', 'failed'):
+                lines.append(f'courses_writebehind_items{{queue="{name}",state="{state}"}} {getattr(queue, state)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
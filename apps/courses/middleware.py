@@ -0,0 +1,66 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from apps.courses.metrics import UNMATCHED, RequestMetrics, current, registry
+
+
+class MetricsMiddleware:
+    """
+    Records query count, SQL, serializer, render and total time of every request.
+
+    The numbers go into a ``Server-Timing`` header and the per-URL-name histograms of ``metrics.registry``.
+    Put it first in ``MIDDLEWARE`` so the total covers the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    @staticmethod
+    def start():
+        metrics = RequestMetrics()
+        return metrics, current.set(metrics), time.perf_counter()
+
+    @staticmethod
+    def finish(request, response, metrics, start):
+        total = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        registry.record(match.view_name if match else UNMATCHED, metrics, total)
+        response['Server-Timing'] = metrics.server_timing(total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before Django renders a DRF or template response; the callback fires right after.
+        metrics = current.get()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.render += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_course_stats(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    Lesson = apps.get_model('courses', 'Lesson')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    CourseReview = apps.get_model('courses', 'CourseReview')
+
+    stats = {pk: CourseStats(course_id=pk) for pk in Course.objects.values_list('pk', flat=True)}
+    lessons = Lesson.objects.values('section__course').annotate(count=Count('id'), duration=Sum('duration_minutes'))
+    for row in lessons.order_by():
+        stats[row['section__course']].total_lessons = row['count']
+        stats[row['section__course']].total_duration = row['duration'] or 0
+    for row in Enrollment.objects.values('course').annotate(count=Count('id')).order_by():
+        stats[row['course']].students_count = row['count']
+    for row in CourseReview.objects.values('course').annotate(count=Count('id'), total=Sum('rating')).order_by():
+        stats[row['course']].reviews_count = row['count']
+        stats[row['course']].rating_sum = row['total'] or 0
+    CourseStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_course_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('total_lessons', models.IntegerField(default=0)),
+                ('total_duration', models.IntegerField(default=0)),
+                ('students_count', models.IntegerField(default=0)),
+                ('reviews_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_course_stats, migrations.RunPython.noop),
+    ]
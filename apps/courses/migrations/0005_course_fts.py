@@ -0,0 +1,43 @@
+from django.db import migrations
+
+FTS_TABLE = 'courses_course_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Course = apps.get_model('courses', 'Course')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"title, description, what_you_learn, instructor, tokenize='unicode61 remove_diacritics 2')"
+    )
+    # bm25 weights, in column order: title, description, what_you_learn, instructor.
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0, 5.0)')")
+
+    rows = Course.objects.select_related('instructor__user').order_by('pk').iterator(chunk_size=1000)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description, what_you_learn, instructor) VALUES (%s, %s, %s, %s, %s)",
+            (
+                (course.pk, course.title, course.description, course.what_you_learn,
+                 f'{course.instructor.user.first_name} {course.instructor.user.last_name}'.strip()
+                 or course.instructor.user.username)
+                for course in rows
+            ),
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_review_course_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:43
+
+from django.db import migrations, models
+
+
+def backfill_category_paths(apps, schema_editor):
+    Category = apps.get_model('courses', 'Category')
+    categories = {category.pk: category for category in Category.objects.only('pk', 'parent_id')}
+
+    def path_of(category):
+        if not category.path:
+            parent = categories.get(category.parent_id)
+            category.path = (path_of(parent) if parent else '') + f'{category.pk:07d}/'
+            category.depth = category.path.count('/') - 1
+        return category.path
+
+    for category in categories.values():
+        path_of(category)
+    Category.objects.bulk_update(categories.values(), ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_category_paths, migrations.RunPython.noop),
+    ]
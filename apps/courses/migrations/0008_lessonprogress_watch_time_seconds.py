@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:44
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_watch_time_seconds(apps, schema_editor):
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    LessonProgress.objects.update(watch_time_seconds=F('watch_time_minutes') * 60)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='watch_time_seconds',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_watch_time_seconds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_instructor_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateSequence',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='courses.course')),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def backfill_instructor_answered(apps, schema_editor):
+    Question = apps.get_model('courses', 'Question')
+    Answer = apps.get_model('courses', 'Answer')
+    Question.objects.filter(
+        Exists(Answer.objects.filter(question=OuterRef('pk'), is_instructor_answer=True)),
+    ).update(instructor_answered=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_hot_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='instructor_answered',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(backfill_instructor_answered, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', '-created_at', '-id'], name='answer_question_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(condition=models.Q(('instructor_answered', False)), fields=['lesson'], name='question_unanswered_idx'),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 from django.contrib.auth.models import User
 
 
@@ -11,6 +14,32 @@ class Instructor(models.Model):
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set when a course is added, moved or removed, so the next rollup run picks this instructor up.
+    rollup_touched_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+
+
+PATH_SEGMENT = '{:07d}/'
+CYCLE_ERROR = "A category cannot be moved under itself or one of its descendants."
+
+
+def subtree_range(path):
+    """Bounds of the paths under ``path`` (itself included), so subtree lookups are index range scans."""
+    # Segments are digits separated by '/', and '0' is the first character after '/'.
+    return {'path__gte': path, 'path__lt': path[:-1] + '0'}
+
+
+class CategoryQuerySet(models.QuerySet):
+    def descendants_of(self, category, include_self=True):
+        descendants = self.filter(**subtree_range(category.path))
+        if not include_self:
+            descendants = descendants.exclude(pk=category.pk)
+        return descendants
+
+    def ancestors_of(self, category, include_self=True):
+        ids = category.ancestor_ids()
+        if include_self:
+            ids.append(category.pk)
+        return self.filter(pk__in=ids).order_by('depth')
 
 
 class Category(models.Model):
@@ -20,6 +49,158 @@ class Category(models.Model):
     icon = models.CharField(max_length=50)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subcategories')
     is_active = models.BooleanField(default=True)
+    # Materialized path: the zero-padded ids from the root down to this category, e.g. "0000001/0000004/".
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
+
+    def ancestor_ids(self):
+        return [int(segment) for segment in self.path.split('/')[:-2]]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            stored = None
+            if self.pk is not None:
+                stored = Category.objects.filter(pk=self.pk).values_list('path', 'depth').first()
+            if stored:
+                # The in-memory path may predate a move of an ancestor; never write it back.
+                self.path, self.depth = stored
+            parent_path = self._parent_path()
+            super().save(*args, **kwargs)
+            self._move_to(parent_path + PATH_SEGMENT.format(self.pk))
+
+    def clean(self):
+        super().clean()
+        if self.pk is None or self.parent_id is None:
+            return
+        path = Category.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+        parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first()
+        if path and parent_path and parent_path.startswith(path):
+            raise ValidationError({'parent': CYCLE_ERROR})
+
+    def _parent_path(self):
+        if self.parent_id is None:
+            return ''
+        parent_path = Category.objects.values_list('path', flat=True).get(pk=self.parent_id)
+        # Backstop for writes that skip ``clean()``; forms and the admin report the cycle from there.
+        if self.path and parent_path.startswith(self.path):
+            raise ValidationError(CYCLE_ERROR)
+        return parent_path
+
+    def _move_to(self, path):
+        depth = path.count('/') - 1
+        if path == self.path:
+            return
+        if self.path:
+            # One UPDATE rewrites the prefix of the whole subtree, this category included.
+            Category.objects.filter(**subtree_range(self.path)).update(
+                path=Concat(Value(path), Substr('path', len(self.path) + 1)),
+                depth=F('depth') + (depth - self.depth),
+            )
+        else:
+            Category.objects.filter(pk=self.pk).update(path=path, depth=depth)
+        self.path, self.depth = path, depth
+
+    def breadcrumbs(self):
+        return list(Category.objects.ancestors_of(self).values('id', 'name', 'slug'))
+
+    def subtree_course_count(self):
+        return Course.objects.filter(**{f'category__{key}': value for key, value in subtree_range(self.path).items()}).count()
+
+
+def _course_aggregate(queryset, course_field, aggregate, outer_field='pk'):
+    return Subquery(
+        queryset.filter(**{course_field: OuterRef(outer_field)})
+        .order_by()
+        .values(course_field)
+        .annotate(value=aggregate)
+        .values('value')[:1]
+    )
+
+
+COURSE_STAT_FIELDS = ('total_lessons', 'total_duration', 'students_count', 'reviews_count', 'rating_sum')
+# Serializer fields read from ``CourseStats``.
+STATS_OUTPUT_FIELDS = ('total_lessons', 'total_duration', 'students_count', 'average_rating', 'reviews_count')
+# Long text columns left unread when a sparse fieldset does not ask for them.
+LARGE_TEXT_FIELDS = ('description', 'requirements', 'what_you_learn')
+
+
+class CourseQuerySet(models.QuerySet):
+    def annotate_stats(self):
+        # Each stat is its own correlated subquery so the joins never multiply rows.
+        return self.annotate(
+            total_lessons=Coalesce(
+                _course_aggregate(Lesson.objects, 'section__course', Count('id')), 0,
+                output_field=IntegerField(),
+            ),
+            total_duration=Coalesce(
+                _course_aggregate(Lesson.objects, 'section__course', Sum('duration_minutes')), 0,
+                output_field=IntegerField(),
+            ),
+            students_count=Coalesce(
+                _course_aggregate(Enrollment.objects, 'course', Count('id')), 0,
+                output_field=IntegerField(),
+            ),
+            reviews_count=Coalesce(
+                _course_aggregate(CourseReview.objects, 'course', Count('id')), 0,
+                output_field=IntegerField(),
+            ),
+            rating_sum=Coalesce(
+                _course_aggregate(CourseReview.objects, 'course', Sum('rating')), 0,
+                output_field=IntegerField(),
+            ),
+        )
+
+    def with_stats(self, fields=None, expand=()):
+        """
+        The joins and prefetches the course serializers need.
+
+        ``fields=None`` means everything they render. Otherwise only what the sparse fieldset ``fields`` (with
+        the relations in ``expand`` nested) reads is joined, and long text columns it leaves out are deferred.
+        """
+        category = models.Prefetch('category', queryset=Category.objects.annotate(sub_count=Count('subcategories')))
+        if fields is None:
+            return self.select_related('instructor', 'stats').prefetch_related(category)
+
+        courses = self.defer(*(name for name in LARGE_TEXT_FIELDS if name not in fields))
+        related = []
+        if 'instructor' in fields and 'instructor' in expand:
+            related.append('instructor')
+        if any(name in fields for name in STATS_OUTPUT_FIELDS):
+            related.append('stats')
+        if related:
+            courses = courses.select_related(*related)
+        if 'category' in fields and 'category' in expand:
+            courses = courses.prefetch_related(category)
+        return courses
+
+    def with_detail(self, reviews_limit, fields=None, expand=()):
+        """Everything ``CourseDetailSerializer`` renders, or just its sparse fieldset, in a fixed number of queries."""
+        courses = self.with_stats(fields, expand)
+        if fields is None or ('instructor' in fields and 'instructor' in expand):
+            courses = courses.annotate(
+                instructor_courses_count=_course_aggregate(Course.objects, 'instructor', Count('id'), 'instructor'),
+            )
+        prefetches = []
+        if fields is None or 'sections' in fields:
+            prefetches += [
+                models.Prefetch('sections', queryset=Section.objects.order_by('order', 'pk')),
+                models.Prefetch(
+                    'sections__lessons',
+                    # Leading with the section keeps the index order; each section's lessons come out the same.
+                    queryset=Lesson.objects.order_by('section_id', 'order', 'pk').only(
+                        'id', 'section_id', 'title', 'duration_minutes', 'is_preview', 'order',
+                    ),
+                ),
+            ]
+        if fields is None or 'reviews' in fields:
+            prefetches.append(models.Prefetch(
+                'reviews',
+                queryset=CourseReview.objects.select_related('student').order_by('-created_at', '-pk')[:reviews_limit],
+                to_attr='latest_reviews',
+            ))
+        return courses.prefetch_related(*prefetches)
 
 
 class Course(models.Model):
@@ -54,6 +235,43 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='course_created_id_idx'),
+            # Filtered list pages walk these in keyset order instead of sorting the matches.
+            models.Index(fields=['status', '-created_at', '-id'], name='course_status_created_idx'),
+            models.Index(fields=['level', '-created_at', '-id'], name='course_level_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='course_category_created_idx'),
+            # Covers every column the facet aggregate reads, so it never touches the table.
+            models.Index(fields=['language', 'category', 'level', 'status', 'is_featured', 'price'],
+                         name='course_facets_idx'),
+        ]
+
+
+class CourseStats(models.Model):
+    """Denormalized per-course counters, kept current by ``apps.courses.signals``."""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_lessons = models.IntegerField(default=0)
+    total_duration = models.IntegerField(default=0)  # daqiqalarda
+    students_count = models.IntegerField(default=0)
+    reviews_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Instructor rollups look for stats changed since their last run.
+            models.Index(fields=['updated_at'], name='coursestats_updated_idx'),
+        ]
+
+    @property
+    def average_rating(self):
+        if not self.reviews_count:
+            return 0
+        return round(self.rating_sum / self.reviews_count, 1)
+
 
 class Section(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='sections')
@@ -61,6 +279,12 @@ class Section(models.Model):
     description = models.TextField(blank=True)
     order = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # The course detail reads a course's sections in order straight from the index.
+            models.Index(fields=['course', 'order', 'id'], name='section_course_order_idx'),
+        ]
+
 
 class Lesson(models.Model):
     section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='lessons')
@@ -72,6 +296,11 @@ class Lesson(models.Model):
     is_preview = models.BooleanField(default=False)  # bepul ko'rish mumkinmi
     resources = models.TextField(blank=True)  # JSON format
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['section', 'order', 'id'], name='lesson_section_order_idx'),
+        ]
+
 
 class Enrollment(models.Model):
     STATUS_CHOICES = [
@@ -89,6 +318,10 @@ class Enrollment(models.Model):
 
     class Meta:
         unique_together = ['student', 'course']
+        indexes = [
+            # Per-course enrollments by status: certificate issuing, completion counts.
+            models.Index(fields=['course', 'status'], name='enrollment_course_status_idx'),
+        ]
 
 
 class LessonProgress(models.Model):
@@ -97,9 +330,15 @@ class LessonProgress(models.Model):
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
     watch_time_minutes = models.IntegerField(default=0)
+    # Heartbeats report seconds; the minutes above are derived from this on every write.
+    watch_time_seconds = models.IntegerField(default=0)
 
     class Meta:
         unique_together = ['enrollment', 'lesson']
+        indexes = [
+            # Completed lessons per enrollment are counted from the index alone.
+            models.Index(fields=['enrollment', 'is_completed'], name='progress_enrollment_done_idx'),
+        ]
 
 
 class CourseReview(models.Model):
@@ -113,6 +352,33 @@ class CourseReview(models.Model):
 
     class Meta:
         unique_together = ['course', 'student']
+        indexes = [
+            models.Index(fields=['course', '-created_at', '-id'], name='review_course_created_idx'),
+        ]
+
+
+class QuestionQuerySet(models.QuerySet):
+    def with_answers(self, answers_limit):
+        """Asker, answer count and the first ``answers_limit`` answers (instructor's first) in three queries."""
+        return self.select_related('student').annotate(
+            answers_count=Coalesce(_course_aggregate(Answer.objects, 'question', Count('id')), 0,
+                                   output_field=IntegerField()),
+        ).prefetch_related(models.Prefetch(
+            'answers',
+            queryset=Answer.objects.select_related('user').order_by(
+                '-is_instructor_answer', 'created_at', 'pk',
+            )[:answers_limit],
+            to_attr='first_answers',
+        ))
+
+    def unanswered_for(self, instructor):
+        """Questions on ``instructor``'s courses that no instructor answer has been given to yet."""
+        return self.filter(instructor_answered=False, lesson__section__course__instructor=instructor).select_related(
+            'student', 'lesson__section__course',
+        ).annotate(
+            answers_count=Coalesce(_course_aggregate(Answer.objects, 'question', Count('id')), 0,
+                                   output_field=IntegerField()),
+        )
 
 
 class Question(models.Model):
@@ -121,6 +387,20 @@ class Question(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Whether an instructor answer exists; kept current by ``apps.courses.signals`` for the unanswered queue.
+    instructor_answered = models.BooleanField(default=False, editable=False)
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A lesson's questions, newest first, in keyset order.
+            models.Index(fields=['lesson', '-created_at', '-id'], name='question_lesson_created_idx'),
+            # The unanswered queue reads only open questions, so answered ones stay out of this index. A single
+            # column keeps SQLite choosing it over the full lesson indexes without ANALYZE statistics.
+            models.Index(fields=['lesson'], condition=models.Q(instructor_answered=False),
+                         name='question_unanswered_idx'),
+        ]
 
 
 class Answer(models.Model):
@@ -130,9 +410,27 @@ class Answer(models.Model):
     is_instructor_answer = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A question's thread in keyset order.
+            models.Index(fields=['question', '-created_at', '-id'], name='answer_question_created_idx'),
+        ]
+
 
 class Certificate(models.Model):
     enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='certificate')
     certificate_number = models.CharField(max_length=50, unique=True)
     issued_at = models.DateTimeField(auto_now_add=True)
     certificate_url = models.URLField()
+
+
+class CertificateSequence(models.Model):
+    """Last certificate sequence number handed out for a course; numbers are reserved from it in blocks."""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    last_number = models.PositiveIntegerField(default=0)
+
+
+class RollupWatermark(models.Model):
+    """High-water mark of an incremental job: everything changed before ``value`` has been processed."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
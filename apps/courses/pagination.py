@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on ``(<timestamp>, id)``, newest first.
+
+    Each page is a single ``WHERE (ts, id) < (cursor_ts, cursor_id) ORDER BY ts DESC, id DESC LIMIT n+1``
+    served by a composite index, so no COUNT(*) is run and deep pages cost the same as the first one.
+    """
+    ordering_field = 'created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.request = None
+        self.page_size_used = self.page_size
+        self.next_position = None
+        self.previous_position = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps([position[0].isoformat(), position[1], int(reverse)], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            timestamp, pk, reverse = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            value = parse_datetime(timestamp)
+            if value is None:
+                raise ValueError
+            return value, int(pk), bool(reverse)
+        except (TypeError, ValueError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_used = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        field = self.ordering_field
+
+        reverse = False
+        if cursor is not None:
+            value, pk, reverse = cursor
+            # The redundant leading bound keeps the predicate sargable: the index is range-scanned from the cursor.
+            op = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{op}e': value}),
+                Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': pk}),
+            )
+
+        if reverse:
+            queryset = queryset.order_by(field, 'pk')
+        else:
+            queryset = queryset.order_by(f'-{field}', '-pk')
+
+        results = list(queryset[:self.page_size_used + 1])
+        has_more = len(results) > self.page_size_used
+        results = results[:self.page_size_used]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            first, last = results[0], results[-1]
+            if has_more or reverse:
+                self.next_position = (getattr(last, field), last.pk)
+            if cursor is not None and (has_more or not reverse):
+                self.previous_position = (getattr(first, field), first.pk)
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position, False))
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.previous_position, True))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class CourseCursorPagination(KeysetPagination):
+    page_size = 20
+
+
+class ReviewCursorPagination(KeysetPagination):
+    page_size = 50
+
+
+class QuestionCursorPagination(KeysetPagination):
+    page_size = 20
+
+
+class AnswerCursorPagination(KeysetPagination):
+    page_size = 50
+
@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.courses.models import Enrollment, Lesson, LessonProgress
+
+# Share of a lesson's duration that has to be watched before it counts as completed.
+COMPLETION_RATIO = 0.9
+UPSERT_FIELDS = ['watch_time_seconds', 'watch_time_minutes', 'is_completed', 'completed_at']
+
+
+class HeartbeatBuffer:
+    """
+    Coalesces watch-time heartbeats per (enrollment, lesson) in memory.
+
+    A player reporting every few seconds produces many events for the same lesson; they are summed here so
+    that a flush writes each row once, however many heartbeats it covered.
+    """
+
+    def __init__(self):
+        self.events = {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, enrollment_id, lesson_id, seconds, completed=False):
+        pending = self.events.setdefault((enrollment_id, lesson_id), [0, False])
+        pending[0] += seconds
+        pending[1] = pending[1] or completed
+
+    def flush(self, batch_size=500):
+        events, self.events = self.events, {}
+        return record_heartbeats(events, batch_size=batch_size)
+
+
+def write_heartbeats(events, batch_size=500):
+    """Flush a list of ``(enrollment_id, lesson_id, seconds, completed)`` events, e.g. from a write-behind queue."""
+    buffer = HeartbeatBuffer()
+    for event in events:
+        buffer.add(*event)
+    return buffer.flush(batch_size=batch_size)
+
+
+def record_heartbeats(events, batch_size=500):
+    """
+    Apply coalesced ``{(enrollment_id, lesson_id): (seconds, completed)}`` events.
+
+    Current rows are read once, new totals are written back with ``bulk_create(update_conflicts=True)``
+    upserts, and only the enrollments that were touched get their progress recomputed. Returns
+    ``{enrollment_id: progress_percentage}`` for those enrollments.
+    """
+    if not events:
+        return {}
+    enrollment_ids = {enrollment_id for enrollment_id, _ in events}
+    lesson_ids = {lesson_id for _, lesson_id in events}
+    durations = dict(Lesson.objects.filter(pk__in=lesson_ids).values_list('pk', 'duration_minutes'))
+    now = timezone.now()
+
+    with transaction.atomic():
+        current = {
+            (row['enrollment_id'], row['lesson_id']): row
+            for row in LessonProgress.objects.select_for_update()
+            .filter(enrollment_id__in=enrollment_ids, lesson_id__in=lesson_ids)
+            .values('enrollment_id', 'lesson_id', 'watch_time_seconds', 'is_completed', 'completed_at')
+        }
+        rows = []
+        for (enrollment_id, lesson_id), (seconds, completed) in events.items():
+            previous = current.get((enrollment_id, lesson_id), {})
+            # Rows are built without a pk so new and existing ones go out in the same INSERT ... ON CONFLICT.
+            row = LessonProgress(
+                enrollment_id=enrollment_id, lesson_id=lesson_id,
+                watch_time_seconds=previous.get('watch_time_seconds', 0) + seconds,
+                is_completed=previous.get('is_completed', False), completed_at=previous.get('completed_at'),
+            )
+            row.watch_time_minutes = row.watch_time_seconds // 60
+            watched_enough = row.watch_time_seconds >= durations.get(lesson_id, 0) * 60 * COMPLETION_RATIO
+            if not row.is_completed and (completed or watched_enough):
+                row.is_completed, row.completed_at = True, now
+            rows.append(row)
+        LessonProgress.objects.bulk_create(
+            rows, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['enrollment', 'lesson'], update_fields=UPSERT_FIELDS,
+        )
+        return update_progress(enrollment_ids, now)
+
+
+def update_progress(enrollment_ids, now=None):
+    """Recompute ``progress_percentage`` for ``enrollment_ids`` from one grouped aggregate."""
+    now = now or timezone.now()
+    enrollments = (
+        Enrollment.objects.filter(pk__in=enrollment_ids)
+        .annotate(done=Count('lesson_progress', filter=Q(lesson_progress__is_completed=True)))
+        .select_related('course__stats')
+        .only('progress_percentage', 'status', 'completed_at', 'course__stats__total_lessons')
+    )
+    changed, progress = [], {}
+    for enrollment in enrollments:
+        total = enrollment.course.stats.total_lessons
+        percentage = min(100, enrollment.done * 100 // total) if total else 0
+        progress[enrollment.pk] = percentage
+        if percentage == enrollment.progress_percentage:
+            continue
+        enrollment.progress_percentage = percentage
+        if percentage == 100 and enrollment.status == 'active':
+            enrollment.status, enrollment.completed_at = 'completed', now
+        changed.append(enrollment)
+    Enrollment.objects.bulk_update(changed, ['progress_percentage', 'status', 'completed_at'])
+    return progress
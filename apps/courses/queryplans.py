@@ -0,0 +1,80 @@
+"""
+Query-plan checks for the hot query shapes.
+
+``capture_plans(request)`` runs ``request()``, collects the SELECTs it sent and asks SQLite for their
+``EXPLAIN QUERY PLAN``. ``plan_problems`` reports the steps that scan a whole table or sort through a temporary
+B-tree, unless an ``ALLOWED`` entry matches them. Every entry has to say why the step is acceptable, so a new
+full scan cannot hide behind an old exception.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# A table scan. ``SCAN t USING [COVERING] INDEX i`` walks a whole index, which is just as linear, so it counts
+# too. Scans of derived tables (``CO-ROUTINE``/``MATERIALIZE`` steps of the same plan) are left out; their
+# cost shows up in the steps that fill them.
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(\S+)')
+DERIVED = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\S+)')
+TEMP_SORT = re.compile(r'^USE TEMP B-TREE FOR ')
+
+# (pattern matched against the SQL, pattern matched against the plan step, reason)
+ALLOWED = [
+    (r'FILTER \(WHERE', r'^SCAN courses_course USING COVERING INDEX course_facets_idx',
+     "Facet counts read every matching course; the covering index keeps it off the table."),
+    (r'FILTER \(WHERE', r'^USE TEMP B-TREE FOR GROUP BY',
+     "Facets group by (language, category) after the filter, which no single index can order."),
+    (r'ORDER BY "courses_course"\."created_at" DESC, "courses_course"\."id" DESC LIMIT \d+$',
+     r'^SCAN courses_course USING INDEX course_created_id_idx',
+     "The unfiltered list walks the recency index and stops after one page."),
+    (r'"courses_category"\."path" >= ', r'^USE TEMP B-TREE FOR ORDER BY',
+     "A category subtree spans several categories, so their index runs are merged by sorting the matches."),
+    (r'FROM "courses_category"', r'^(SCAN courses_category|USE TEMP B-TREE FOR ORDER BY)',
+     "Categories are a small table that the tree reads whole and the detail lists children of by name."),
+    (r'FROM courses_course_fts', r'^SCAN courses_course_fts VIRTUAL TABLE',
+     "FTS5 answers MATCH through its own index; SQLite reports virtual tables as scans."),
+    (r'FROM \( SELECT \* FROM \( SELECT "courses_coursereview"', r'^USE TEMP B-TREE FOR ORDER BY',
+     "The windowed prefetch of the latest reviews re-sorts at most reviews_limit rows per course."),
+    (r'FROM \( SELECT \* FROM \( SELECT "courses_answer"', r'^USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY',
+     "The windowed prefetch of a page's first answers sorts only the answers of that page's questions."),
+    (r'WHERE \(NOT "courses_question"\."instructor_answered" AND "courses_course"\."instructor_id" = ',
+     r'^USE TEMP B-TREE FOR ORDER BY',
+     "The unanswered queue merges the open questions of all the instructor's lessons; the partial index keeps "
+     "answered ones out of the sort."),
+]
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def capture_plans(request):
+    """Call ``request()`` and return ``(response, [(sql, plan steps), ...])`` for the SELECTs it ran."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = request()
+    plans = [
+        (query['sql'], explain(query['sql']))
+        for query in ctx.captured_queries
+        if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+    ]
+    return response, plans
+
+
+def is_allowed(sql, step):
+    return any(re.search(query, sql) and re.search(plan, step) for query, plan, _ in ALLOWED)
+
+
+def plan_problems(plans):
+    """``[(sql, step), ...]`` for every full scan or temporary sort that no ``ALLOWED`` entry covers."""
+    problems = []
+    for sql, steps in plans:
+        derived = {match.group(1) for match in map(DERIVED.match, steps) if match}
+        for step in steps:
+            scan = FULL_SCAN.match(step)
+            if scan and scan.group(1) in derived:
+                continue
+            if (scan or TEMP_SORT.match(step)) and not is_allowed(sql, step):
+                problems.append((sql, step))
+    return problems
@@ -0,0 +1,108 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from apps.courses.models import Course
+
+# Created by migration 0005; its ``rank`` is configured there as bm25 weighted towards titles.
+FTS_TABLE = 'courses_course_fts'
+FILTER_COLUMNS = {'level': 'level', 'language': 'language', 'category': 'category_id'}
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def instructor_name(user):
+    return user.get_full_name() or user.username
+
+
+def index_courses(course_ids):
+    """(Re)index ``course_ids`` in the FTS table; courses that no longer exist are dropped from it."""
+    course_ids = list(course_ids)
+    if not course_ids or not fts_enabled():
+        return
+    courses = (
+        Course.objects.filter(pk__in=course_ids)
+        .select_related('instructor__user')
+        .only('title', 'description', 'what_you_learn', 'instructor__user__username',
+              'instructor__user__first_name', 'instructor__user__last_name')
+    )
+    rows = [
+        (course.pk, course.title, course.description, course.what_you_learn, instructor_name(course.instructor.user))
+        for course in courses
+    ]
+    placeholders = ', '.join(['%s'] * len(course_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', course_ids)
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, what_you_learn, instructor) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def remove_courses(course_ids):
+    course_ids = list(course_ids)
+    if not course_ids or not fts_enabled():
+        return
+    placeholders = ', '.join(['%s'] * len(course_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', course_ids)
+
+
+def rebuild_index(batch_size=1000):
+    if not fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    total, last_pk = 0, 0
+    while True:
+        ids = list(Course.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        index_courses(ids)
+        total += len(ids)
+        last_pk = ids[-1]
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_course_ids(query, filters=None, limit=20, offset=0):
+    """Return the ids of matching, non-archived courses, best match first."""
+    filters = {key: value for key, value in (filters or {}).items() if value not in (None, '')}
+    if not fts_enabled():
+        return fallback_search_ids(query, filters, limit, offset)
+
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    where, params = [f'{FTS_TABLE} MATCH %s', "c.status <> 'archived'"], [expression]
+    for key, value in filters.items():
+        where.append(f'c.{FILTER_COLUMNS[key]} = %s')
+        params.append(value)
+    sql = (
+        f'SELECT c.id FROM {FTS_TABLE} JOIN courses_course c ON c.id = {FTS_TABLE}.rowid '
+        f'WHERE {" AND ".join(where)} ORDER BY {FTS_TABLE}.rank LIMIT %s OFFSET %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def fallback_search_ids(query, filters, limit, offset):
+    courses = Course.objects.exclude(status='archived').filter(
+        **{FILTER_COLUMNS[key]: value for key, value in filters.items()}
+    )
+    for term in re.findall(r'\w+', query):
+        courses = courses.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return list(courses.order_by('-created_at', '-pk').values_list('pk', flat=True)[offset:offset + limit])
@@ -1,8 +1,79 @@
+import codecs
 from decimal import Decimal
-from django.utils.text import slugify
+from functools import cache
+
 from rest_framework import serializers
-from apps.courses.id_generator import generate_id
-from apps.courses.models import Course, Instructor, Category, Enrollment, CourseReview, Lesson, Section
+from apps.courses.enrollments import read_user_ids
+from apps.courses.metrics import timed_serialization
+from apps.courses.models import (
+    Answer, Course, CourseStats, Instructor, Category, Enrollment, CourseReview, Lesson, Question, Section,
+)
+from apps.courses.slugs import save_with_unique_slug
+
+
+class TimedSerializerMixin:
+    """Counts ``to_representation`` towards the current request's serializer time."""
+
+    def to_representation(self, instance):
+        with timed_serialization():
+            return super().to_representation(instance)
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets: ``fields`` keeps only the named output fields and ``expand`` nests only the named
+    relations of ``expandable``, rendering the other requested ones as primary keys. Fields that are dropped
+    are removed before serialization, so their method fields and nested serializers never run.
+    """
+    expandable = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                del self.fields[name]
+        if expand is not None:
+            for name in self.expandable:
+                if name in self.fields and name not in expand:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    @classmethod
+    @cache
+    def readable_fields(cls):
+        return [name for name, field in cls().fields.items() if not field.write_only]
+
+    @classmethod
+    def selection(cls, query_params):
+        """
+        ``(fields, expand)`` asked for with ``?fields=a,b&expand=c``, or ``(None, None)`` for the full output.
+
+        Without ``fields`` every field is rendered; without ``expand`` every relation is nested. Unknown names
+        raise ``ValidationError``.
+        """
+        if 'fields' not in query_params and 'expand' not in query_params:
+            return None, None
+        readable = cls.readable_fields()
+        selection = {}
+        for param, allowed in (('fields', readable), ('expand', cls.expandable)):
+            if param not in query_params:
+                selection[param] = tuple(allowed)
+                continue
+            names = {name.strip() for name in query_params[param].split(',') if name.strip()}
+            unknown = names - set(allowed)
+            if unknown:
+                raise serializers.ValidationError({param: f"Unknown field(s): {', '.join(sorted(unknown))}"})
+            # Kept in declaration order so equal selections compare (and cache) equal.
+            selection[param] = tuple(name for name in allowed if name in names)
+        return selection['fields'], selection['expand']
+
+
+def course_stats(obj):
+    # Rows are created with the course and backfilled by the migration; a missing one reads as zeros until
+    # ``rebuild_course_stats`` repairs it, so reads never write.
+    try:
+        return obj.stats
+    except CourseStats.DoesNotExist:
+        return CourseStats(course_id=obj.pk)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,17 +84,45 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
     @staticmethod
-    def get_sub_count( obj):
+    def get_sub_count(obj):
+        if hasattr(obj, 'sub_count'):
+            return obj.sub_count
         return obj.subcategories.count()
 
 
+class CategoryDetailSerializer(TimedSerializerMixin, CategorySerializer):
+    breadcrumbs = serializers.SerializerMethodField()
+    children = serializers.SerializerMethodField()
+    course_count = serializers.SerializerMethodField()
+
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ['depth', 'breadcrumbs', 'children', 'course_count']
+
+    @staticmethod
+    def get_breadcrumbs(obj):
+        return obj.breadcrumbs()
+
+    @staticmethod
+    def get_children(obj):
+        return list(obj.subcategories.filter(is_active=True).order_by('name').values('id', 'name', 'slug'))
+
+    @staticmethod
+    def get_course_count(obj):
+        # Courses anywhere in the subtree, not just directly in this category.
+        return obj.subtree_course_count()
+
+
 class InstructorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Instructor
-        fields = '__all__'
+        # Public profile only; bookkeeping columns such as ``rollup_touched_at`` stay internal.
+        fields = ['id', 'bio', 'profile_image', 'expertise', 'total_students', 'rating', 'is_verified', 'created_at',
+                  'user']
+
 
+class CourseRegisterSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    expandable = ('category', 'instructor')
 
-class CourseRegisterSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     instructor = InstructorSerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
@@ -48,6 +147,7 @@ class CourseRegisterSerializer(serializers.ModelSerializer):
             'status', 'created_at',
         ]
         extra_kwargs = {
+            'slug': {'read_only': True},
             'created_at': {'read_only': True},
             'updated_at': {'read_only': True},
         }
@@ -58,34 +158,23 @@ class CourseRegisterSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def get_total_lessons(obj):
-        count = 0
-        for section in obj.sections.all():
-            count += section.lessons.count()
-        return count
+        return course_stats(obj).total_lessons
 
     @staticmethod
     def get_total_duration(obj):
-        total = 0
-        for section in obj.sections.all():
-            for lesson in section.lessons.all():
-                total += lesson.duration_minutes
-        return total
+        return course_stats(obj).total_duration
 
     @staticmethod
     def get_students_count(obj):
-        return obj.enrollments.count()
+        return course_stats(obj).students_count
 
     @staticmethod
     def get_average_rating(obj):
-        reviews = obj.reviews.all()
-        if not reviews.exists():
-            return 0
-        total = sum(r.rating for r in reviews)
-        return round(total / reviews.count(), 1)
+        return course_stats(obj).average_rating
 
     @staticmethod
     def get_reviews_count(obj):
-        return obj.reviews.count()
+        return course_stats(obj).reviews_count
 
 
     @staticmethod
@@ -137,19 +226,11 @@ class CourseRegisterSerializer(serializers.ModelSerializer):
         instructor = Instructor.objects.get(id=instructor_id)
         category = Category.objects.get(id=category_id)
 
-        title = validated_data.get('title')
-        slug_base = slugify(title)
-        slug = slug_base
-
-        while Course.objects.filter(slug=slug).exists():
-            slug = f"{slug_base}-{generate_id()}"
-
-        validated_data['slug'] = slug
         validated_data['status'] = 'draft'
         validated_data['instructor'] = instructor
         validated_data['category'] = category
 
-        return Course.objects.create(**validated_data)
+        return save_with_unique_slug(Course(**validated_data), validated_data.get('title'))
 
 
 class LessonSerializer(serializers.ModelSerializer):
@@ -166,27 +247,30 @@ class SectionSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'order', 'lessons']
 
 
-class ReviewSerializer(serializers.ModelSerializer):
-    user = serializers.StringRelatedField()
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = serializers.StringRelatedField(source='student')
 
     class Meta:
         model = CourseReview
         fields = ['id', 'user', 'rating', 'comment', 'created_at']
 
 
-class CourseDetailSerializer(serializers.ModelSerializer):
+class CourseDetailSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    expandable = ('category', 'instructor')
+
     instructor = InstructorSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
     instructor_id = serializers.IntegerField(write_only=True)
     sections = SectionSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    reviews = ReviewSerializer(source='latest_reviews', many=True, read_only=True)
 
     final_price = serializers.SerializerMethodField()
     total_lessons = serializers.SerializerMethodField()
     total_duration = serializers.SerializerMethodField()
     students_count = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
+    reviews_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
@@ -194,7 +278,7 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'description', 'price', 'discount_percentage',
             'final_price', 'category', 'category_id', 'instructor', 'instructor_id',
             'language', 'level', 'requirements', 'what_you_learn', 'duration_hours',
-            'sections', 'reviews', 'students_count', 'total_lessons', 'total_duration',
+            'sections', 'reviews', 'reviews_count', 'students_count', 'total_lessons', 'total_duration',
             'average_rating', 'is_featured', 'status', 'created_at'
         ]
 
@@ -210,37 +294,26 @@ class CourseDetailSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def get_total_lessons(obj):
-        count = 0
-        for section in obj.sections.all():
-            count += section.lessons.count()
-        return count
+        return course_stats(obj).total_lessons
 
     @staticmethod
     def get_total_duration(obj):
-        total = 0
-        for section in obj.sections.all():
-            for lesson in section.lessons.all():
-                total += lesson.duration_minutes
-        return total
+        return course_stats(obj).total_duration
 
     @staticmethod
     def get_students_count(obj):
-        return obj.enrollments.count()
+        return course_stats(obj).students_count
 
     @staticmethod
     def get_average_rating(obj):
-        reviews = obj.reviews.all()
-        if not reviews.exists():
-            return 0
-        total = sum(r.rating for r in reviews)
-        return round(total / reviews.count(), 1)
+        return course_stats(obj).average_rating
 
     @staticmethod
     def get_reviews_count(obj):
-        return obj.reviews.count()
+        return course_stats(obj).reviews_count
 
 
-class CourseUpdateSerializer(serializers.ModelSerializer):
+class CourseUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category_id = serializers.IntegerField(write_only=True, required=False)
     instructor_id = serializers.IntegerField(write_only=True, required=False)
 
@@ -306,12 +379,7 @@ class CourseUpdateSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         title = validated_data.get('title')
-        if title and title != instance.title:
-            slug_base = slugify(title)
-            slug = slug_base
-            while Course.objects.filter(slug=slug).exclude(id=instance.id).exists():
-                slug = f"{slug_base}-{generate_id()}"
-            instance.slug = slug
+        rename = bool(title and title != instance.title)
 
         instructor_id = validated_data.pop('instructor_id', None)
         if instructor_id:
@@ -330,5 +398,183 @@ class CourseUpdateSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
+        if rename:
+            return save_with_unique_slug(instance, title)
         instance.save()
-        return instance
\ No newline at end of file
+        return instance
+
+class LessonImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = ['title', 'content', 'video_url', 'duration_minutes', 'order', 'is_preview', 'resources']
+        extra_kwargs = {
+            'content': {'allow_blank': True, 'default': ''},
+        }
+
+
+class SectionImportSerializer(serializers.ModelSerializer):
+    lessons = LessonImportSerializer(many=True, default=list)
+
+    class Meta:
+        model = Section
+        fields = ['title', 'description', 'order', 'lessons']
+
+
+class CourseImportSerializer(CourseRegisterSerializer):
+    """
+    Validates one row of a bulk import without touching the database.
+
+    Instructor and category ids are checked against the id sets passed in the context
+    (``instructor_ids`` / ``category_ids``), which the importer loads once for the whole run.
+    """
+    sections = SectionImportSerializer(many=True, default=list)
+
+    class Meta(CourseRegisterSerializer.Meta):
+        fields = [
+            'title', 'description', 'price', 'discount_percentage', 'category_id', 'instructor_id',
+            'language', 'level', 'is_featured', 'duration_hours', 'requirements', 'what_you_learn',
+            'thumbnail', 'trailer_url', 'status', 'sections',
+        ]
+
+    def validate_instructor_id(self, value):
+        if value not in self.context['instructor_ids']:
+            raise serializers.ValidationError("Instructor does not exist")
+        return value
+
+    def validate_category_id(self, value):
+        if value not in self.context['category_ids']:
+            raise serializers.ValidationError("Category does not exist")
+        return value
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    enrollment = serializers.IntegerField()
+    lesson = serializers.IntegerField()
+    seconds = serializers.IntegerField(min_value=1, max_value=600)
+    completed = serializers.BooleanField(default=False)
+
+
+class HeartbeatBatchSerializer(serializers.Serializer):
+    """
+    A batch of watch-time heartbeats from one student.
+
+    Every event must name one of the student's own enrollments (from ``context['user']``) and a lesson of
+    that enrollment's course; both are checked with one query each for the whole batch.
+    """
+    max_events = 500
+    events = HeartbeatSerializer(many=True, allow_empty=False)
+
+    def validate_events(self, events):
+        if len(events) > self.max_events:
+            raise serializers.ValidationError(f"At most {self.max_events} events per batch.")
+        courses = dict(
+            Enrollment.objects.filter(pk__in={event['enrollment'] for event in events}, student=self.context['user'])
+            .values_list('pk', 'course_id')
+        )
+        lessons = dict(
+            Lesson.objects.filter(pk__in={event['lesson'] for event in events}).values_list('pk', 'section__course_id')
+        )
+        for event in events:
+            if event['enrollment'] not in courses:
+                raise serializers.ValidationError(f"Enrollment {event['enrollment']} does not exist.")
+            if lessons.get(event['lesson']) != courses[event['enrollment']]:
+                raise serializers.ValidationError(f"Lesson {event['lesson']} is not part of this course.")
+        return events
+
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    """A cohort to enroll: ``user_ids`` as a JSON list, or an uploaded CSV ``file`` (see ``read_user_ids``)."""
+    max_users = 50000
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False,
+                                     max_length=max_users)
+    file = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        if ('user_ids' in attrs) == ('file' in attrs):
+            raise serializers.ValidationError("Send either user_ids or a CSV file.")
+        if 'file' in attrs:
+            try:
+                attrs['user_ids'] = read_user_ids(codecs.iterdecode(attrs.pop('file'), 'utf-8-sig'))
+            except (ValueError, UnicodeDecodeError) as exc:
+                raise serializers.ValidationError({'file': str(exc)})
+            if not attrs['user_ids']:
+                raise serializers.ValidationError({'file': "The file has no user ids."})
+            if len(attrs['user_ids']) > self.max_users:
+                raise serializers.ValidationError({'file': f"At most {self.max_users} users per request."})
+        return attrs
+
+
+class CurriculumSectionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    lessons = serializers.ListField(child=serializers.IntegerField())
+
+
+class CurriculumMoveSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=['section', 'lesson'])
+    id = serializers.IntegerField()
+    # Lessons only: the section to move into; defaults to the lesson's own.
+    section = serializers.IntegerField(required=False)
+    position = serializers.IntegerField(min_value=0)
+
+
+class CurriculumSerializer(serializers.Serializer):
+    """A new curriculum order: the full ``sections`` layout, or a list of ``moves`` applied in sequence."""
+    max_moves = 500
+    sections = CurriculumSectionSerializer(many=True, required=False)
+    moves = CurriculumMoveSerializer(many=True, required=False, allow_empty=False)
+
+    def validate_moves(self, moves):
+        if len(moves) > self.max_moves:
+            raise serializers.ValidationError(f"At most {self.max_moves} moves per request.")
+        return moves
+
+    def validate(self, attrs):
+        if ('sections' in attrs) == ('moves' in attrs):
+            raise serializers.ValidationError("Send either sections or moves.")
+        return attrs
+
+
+class CourseCloneSerializer(serializers.Serializer):
+    """Options for a copy of a course; the title defaults to the source's."""
+    title = serializers.CharField(max_length=200, required=False)
+
+    validate_title = staticmethod(CourseUpdateSerializer.validate_title)
+
+
+class AnswerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = serializers.StringRelatedField()
+
+    class Meta:
+        model = Answer
+        fields = ['id', 'user', 'content', 'is_instructor_answer', 'created_at']
+        read_only_fields = ['is_instructor_answer']
+
+
+class QuestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A question with its answer count and first answers, as loaded by ``Question.objects.with_answers``."""
+    user = serializers.StringRelatedField(source='student')
+    answers_count = serializers.IntegerField(read_only=True)
+    answers = AnswerSerializer(source='first_answers', many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ['id', 'user', 'title', 'content', 'instructor_answered', 'answers_count', 'answers', 'created_at']
+
+
+class UnansweredQuestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = serializers.StringRelatedField(source='student')
+    answers_count = serializers.IntegerField(read_only=True)
+    lesson = serializers.SerializerMethodField()
+    course = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Question
+        fields = ['id', 'user', 'title', 'content', 'answers_count', 'lesson', 'course', 'created_at']
+
+    def get_lesson(self, obj):
+        return {'id': obj.lesson_id, 'title': obj.lesson.title}
+
+    def get_course(self, obj):
+        course = obj.lesson.section.course
+        return {'id': course.pk, 'title': course.title}
+
@@ -0,0 +1,346 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, QuerySet, Sum
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.courses.cache import CATALOG, category_tree_cache, course_detail_cache, course_list_cache
+from apps.courses.models import (
+    Answer, Category, Course, CourseReview, CourseStats, Enrollment, Instructor, Lesson, Question, Section,
+)
+from apps.courses.rollups import refresh_instructors
+from apps.courses.search import index_courses, remove_courses
+from apps.courses.stats import apply_delta
+
+# Loaded values of the fields the stats and caches depend on, remembered so that updates can be turned into deltas.
+TRACKED_FIELDS = {
+    Category: ('parent_id',),
+    Instructor: ('user_id',),
+    Course: ('instructor_id',),
+    Enrollment: ('course_id',),
+    CourseReview: ('course_id', 'rating'),
+    Section: ('course_id',),
+    Lesson: ('section_id', 'duration_minutes'),
+}
+
+
+def remember_loaded_values(sender, instance, **kwargs):
+    # Deferred fields are left out instead of being fetched.
+    instance._stats_loaded = {field: instance.__dict__.get(field) for field in TRACKED_FIELDS[sender]}
+
+
+for tracked_model in TRACKED_FIELDS:
+    post_init.connect(remember_loaded_values, sender=tracked_model, dispatch_uid=f'stats-{tracked_model.__name__}')
+
+
+def deleted_with(origin, *models):
+    """Whether a delete cascade started at one of ``models``, given as an instance or a queryset."""
+    if isinstance(origin, QuerySet):
+        return origin.model in models
+    return isinstance(origin, models)
+
+
+# Cascades from these reach sections and lessons only through the courses they delete.
+COURSE_OWNERS = (Course, Instructor, Category, User)
+
+
+def course_deleted_with(origin, course_id):
+    """Whether the cascade started at ``origin`` deletes course ``course_id`` too; its stats row goes with it."""
+    if deleted_with(origin, Course, Instructor, Category):
+        return True
+    # A user's cascade also reaches their enrollments and reviews in courses they do not own.
+    return deleted_with(origin, User) and course_id in owned_courses(origin)
+
+
+def owned_courses(origin):
+    # Looked up once per cascade; children are deleted first, so the courses still exist.
+    if '_owned_courses' not in origin.__dict__:
+        users = origin.values('pk') if isinstance(origin, QuerySet) else [origin.pk]
+        origin.__dict__['_owned_courses'] = set(
+            Course.objects.filter(instructor__user__in=users).values_list('pk', flat=True)
+        )
+    return origin.__dict__['_owned_courses']
+
+
+def once_per_cascade(origin, name, keys):
+    """The ``keys`` not handled yet under ``name`` in the cascade started at ``origin``."""
+    if origin is None:
+        return set(keys)
+    done = origin.__dict__.setdefault(name, set())
+    keys = set(keys) - done
+    done |= keys
+    return keys
+
+
+def loaded_values(instance, created):
+    if created:
+        return None
+    loaded = getattr(instance, '_stats_loaded', {})
+    if any(value is None for value in loaded.values()):
+        return None
+    return loaded
+
+
+# Cache invalidation runs before the stats receivers below, while the loaded values still describe the old row.
+
+def bump_instructor_courses(instructor_ids):
+    course_detail_cache.bump(*Course.objects.filter(instructor_id__in=instructor_ids).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course(sender, instance, signal, created=False, origin=None, **kwargs):
+    course_detail_cache.bump(instance.pk)
+    # Detail pages embed the instructor's courses_count, which moves for all of their courses.
+    old = getattr(instance, '_stats_loaded', {}).get('instructor_id')
+    if signal is post_delete:
+        # An instructor's cascade deletes all of their courses.
+        if not deleted_with(origin, Instructor, User):
+            bump_instructor_courses(once_per_cascade(origin, '_bumped_instructors', [instance.instructor_id]))
+    elif created or (old is not None and old != instance.instructor_id):
+        bump_instructor_courses({instance.instructor_id, old} - {None})
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+@receiver(post_save, sender=CourseReview)
+@receiver(post_delete, sender=CourseReview)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_course_of_child(sender, instance, origin=None, **kwargs):
+    # A deleted course bumps its own version once.
+    if course_deleted_with(origin, instance.course_id):
+        return
+    old = getattr(instance, '_stats_loaded', {})
+    course_detail_cache.bump(*{instance.course_id, old.get('course_id')} - {None})
+
+
+def courses_of_sections(section_ids, origin=None):
+    """Course ids of ``section_ids``; a queryset delete looks each section up once for all of its lessons."""
+    known = origin.__dict__.setdefault('_section_courses', {}) if isinstance(origin, QuerySet) else {}
+    missing = set(section_ids) - set(known)
+    if missing:
+        known.update(Section.objects.filter(pk__in=missing).values_list('pk', 'course_id'))
+    return {known[section_id] for section_id in section_ids if section_id in known}
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_course_of_lesson(sender, instance, origin=None, **kwargs):
+    # Lessons deleted with their section or course are covered by that row's own bump.
+    if deleted_with(origin, Section, *COURSE_OWNERS):
+        return
+    old = getattr(instance, '_stats_loaded', {})
+    sections = {instance.section_id, old.get('section_id')} - {None}
+    course_detail_cache.bump(*courses_of_sections(sections, origin))
+
+
+@receiver(post_save, sender=Instructor)
+@receiver(post_delete, sender=Instructor)
+def invalidate_instructor_courses(sender, instance, **kwargs):
+    bump_instructor_courses([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance, **kwargs):
+    category_tree_cache.bump('tree')
+    # Course pages embed their category, and its sub_count changes when a child is added, moved or removed.
+    old = getattr(instance, '_stats_loaded', {})
+    categories = {instance.pk, instance.parent_id, old.get('parent_id')} - {None}
+    course_detail_cache.bump(*Course.objects.filter(category_id__in=categories).values_list('pk', flat=True))
+    # List pages embed the category of every course.
+    course_list_cache.bump(CATALOG)
+    remember_loaded_values(sender, instance)
+
+
+SEARCH_FIELDS = {
+    Course: {'title', 'description', 'what_you_learn', 'instructor', 'instructor_id'},
+    User: {'username', 'first_name', 'last_name'},
+}
+
+
+def touches_search_fields(sender, update_fields):
+    return update_fields is None or bool(SEARCH_FIELDS[sender] & set(update_fields))
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and touches_search_fields(sender, update_fields):
+        index_courses([instance.pk])
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    remove_courses([instance.pk])
+
+
+@receiver(post_save, sender=Instructor)
+def index_instructor_courses(sender, instance, created, raw=False, **kwargs):
+    # The indexed name comes from the user, whose own saves are handled below; only a new user changes it here.
+    old = getattr(instance, '_stats_loaded', {}).get('user_id')
+    if not raw and not created and old is not None and old != instance.user_id:
+        index_courses(Course.objects.filter(instructor_id=instance.pk).values_list('pk', flat=True))
+    remember_loaded_values(sender, instance)
+
+
+@receiver(post_save, sender=User)
+def index_user_courses(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins save ``last_login`` alone; only name changes reach the index.
+    if not raw and not created and touches_search_fields(sender, update_fields):
+        index_courses(Course.objects.filter(instructor__user_id=instance.pk).values_list('pk', flat=True))
+
+
+# Instructor rollups: courses moving between instructors mark both for the next ``rollup_instructors`` run.
+# With ``INSTRUCTOR_ROLLUPS_EAGER`` the affected instructors are also refreshed right after each commit.
+
+def refresh_rollups_eagerly(instructor_ids=(), course_ids=()):
+    if not getattr(settings, 'INSTRUCTOR_ROLLUPS_EAGER', False):
+        return
+
+    def refresh():
+        ids = set(instructor_ids) | set(Course.objects.filter(pk__in=course_ids).values_list('instructor_id', flat=True))
+        refresh_instructors(ids - {None})
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Course)
+def touch_instructors_of_course(sender, instance, created, raw=False, **kwargs):
+    old = getattr(instance, '_stats_loaded', {}).get('instructor_id')
+    # New courses need no mark: their stats row is created with a fresh ``updated_at``.
+    if not raw and not created and old is not None and old != instance.instructor_id:
+        instructor_ids = {instance.instructor_id, old} - {None}
+        Instructor.objects.filter(pk__in=instructor_ids).update(rollup_touched_at=timezone.now())
+        refresh_rollups_eagerly(instructor_ids)
+    remember_loaded_values(sender, instance)
+
+
+@receiver(post_delete, sender=Course)
+def touch_instructor_of_deleted_course(sender, instance, origin=None, **kwargs):
+    # The instructor goes with the cascade, or was marked for an earlier course of it.
+    if deleted_with(origin, Instructor, User):
+        return
+    instructor_ids = once_per_cascade(origin, '_touched_instructors', [instance.instructor_id])
+    if instructor_ids:
+        Instructor.objects.filter(pk__in=instructor_ids).update(rollup_touched_at=timezone.now())
+        refresh_rollups_eagerly(instructor_ids)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=CourseReview)
+@receiver(post_delete, sender=CourseReview)
+def refresh_instructor_of_course(sender, instance, **kwargs):
+    old = getattr(instance, '_stats_loaded', {})
+    refresh_rollups_eagerly(course_ids={instance.course_id, old.get('course_id')} - {None})
+
+
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        CourseStats.objects.create(course=instance)
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = loaded_values(instance, created)
+    if created:
+        apply_delta(course_id=instance.course_id, students_count=1)
+    elif old is not None and old['course_id'] != instance.course_id:
+        apply_delta(course_id=old['course_id'], students_count=-1)
+        apply_delta(course_id=instance.course_id, students_count=1)
+    remember_loaded_values(sender, instance)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, origin=None, **kwargs):
+    # A deleted course takes its stats row with it.
+    if course_deleted_with(origin, instance.course_id):
+        return
+    apply_delta(course_id=instance.course_id, students_count=-1)
+
+
+@receiver(post_save, sender=CourseReview)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = loaded_values(instance, created)
+    if created:
+        apply_delta(course_id=instance.course_id, reviews_count=1, rating_sum=instance.rating)
+    elif old is not None and old['course_id'] != instance.course_id:
+        apply_delta(course_id=old['course_id'], reviews_count=-1, rating_sum=-old['rating'])
+        apply_delta(course_id=instance.course_id, reviews_count=1, rating_sum=instance.rating)
+    elif old is not None:
+        apply_delta(course_id=instance.course_id, rating_sum=instance.rating - old['rating'])
+    remember_loaded_values(sender, instance)
+
+
+@receiver(post_delete, sender=CourseReview)
+def review_deleted(sender, instance, origin=None, **kwargs):
+    if course_deleted_with(origin, instance.course_id):
+        return
+    apply_delta(course_id=instance.course_id, reviews_count=-1, rating_sum=-instance.rating)
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = loaded_values(instance, created)
+    if created:
+        apply_delta(section_id=instance.section_id, total_lessons=1, total_duration=instance.duration_minutes)
+    elif old is not None and old['section_id'] != instance.section_id:
+        apply_delta(section_id=old['section_id'], total_lessons=-1, total_duration=-old['duration_minutes'])
+        apply_delta(section_id=instance.section_id, total_lessons=1, total_duration=instance.duration_minutes)
+    elif old is not None:
+        apply_delta(section_id=instance.section_id, total_duration=instance.duration_minutes - old['duration_minutes'])
+    remember_loaded_values(sender, instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, origin=None, **kwargs):
+    # Whole sections are accounted for in section_deleting; a whole course takes its stats row with it.
+    if deleted_with(origin, Section, *COURSE_OWNERS):
+        return
+    # Lessons are deleted before their section, so it can still be used to find the course.
+    apply_delta(section_id=instance.section_id, total_lessons=-1, total_duration=-instance.duration_minutes)
+
+
+@receiver(pre_delete, sender=Section)
+def section_deleting(sender, instance, origin=None, **kwargs):
+    # Runs before the cascade removes the lessons: one delta for the section instead of one per lesson.
+    if deleted_with(origin, *COURSE_OWNERS):
+        return
+    totals = instance.lessons.aggregate(count=Count('pk'), duration=Sum('duration_minutes'))
+    apply_delta(course_id=instance.course_id, total_lessons=-totals['count'], total_duration=-(totals['duration'] or 0))
+
+
+@receiver(post_save, sender=Section)
+def section_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = loaded_values(instance, created)
+    if old is not None and old['course_id'] != instance.course_id:
+        lessons = list(instance.lessons.values_list('duration_minutes', flat=True))
+        apply_delta(course_id=old['course_id'], total_lessons=-len(lessons), total_duration=-sum(lessons))
+        apply_delta(course_id=instance.course_id, total_lessons=len(lessons), total_duration=sum(lessons))
+    remember_loaded_values(sender, instance)
+
+
+# ``Question.instructor_answered`` is recomputed from the answers in the same UPDATE, so edits, deletions and
+# concurrent answers cannot leave it stale.
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def update_instructor_answered(sender, instance, raw=False, origin=None, **kwargs):
+    # Answers deleted along with their question leave no flag to maintain.
+    if raw or deleted_with(origin, Course, Instructor, Category, Section, Lesson, Question):
+        return
+    Question.objects.filter(pk=instance.question_id).update(instructor_answered=Exists(
+        Answer.objects.filter(question=OuterRef('pk'), is_instructor_answer=True),
+    ))
+
@@ -0,0 +1,55 @@
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+from apps.courses.id_generator import generate_id
+
+MAX_ATTEMPTS = 5
+
+
+def slug_base(title):
+    return slugify(title)[:40].strip('-') or generate_id().lower()
+
+
+def save_with_unique_slug(instance, title):
+    """
+    Save ``instance`` under a slug derived from ``title``.
+
+    One lookup decides between the bare slug and one with a random suffix, however many collisions the
+    title already has. The write is then optimistic and the unique constraint has the final say: when a
+    concurrent writer took the slug first, the loser retries with a fresh suffix.
+    """
+    model = type(instance)
+    base = slug_base(title)
+    slug = base
+    if model.objects.filter(slug=base).exclude(pk=instance.pk).exists():
+        slug = f"{base}-{generate_id()}"
+    for _ in range(MAX_ATTEMPTS):
+        instance.slug = slug
+        try:
+            with transaction.atomic():
+                instance.save()
+            return instance
+        except IntegrityError:
+            if not model.objects.filter(slug=slug).exclude(pk=instance.pk).exists():
+                raise
+            slug = f"{base}-{generate_id()}"
+    raise IntegrityError(f"Could not allocate a unique slug for {title!r}")
+
+
+def allocate_slugs(model, titles):
+    """
+    Pick a slug for each of ``titles`` with one lookup for the whole batch.
+
+    The result is free at the time of the lookup and unique within the batch; callers still rely on
+    the unique constraint (and retry) to stay safe against concurrent writers.
+    """
+    bases = [slug_base(title) for title in titles]
+    taken = set(model.objects.filter(slug__in=set(bases)).values_list('slug', flat=True))
+    slugs = []
+    for base in bases:
+        slug = base
+        while slug in taken:
+            slug = f"{base}-{generate_id()}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.courses.cache import course_detail_cache
+from apps.courses.models import COURSE_STAT_FIELDS, Course, CourseStats
+
+
+def apply_delta(course_id=None, section_id=None, **deltas):
+    """
+    Shift the counters of one course by ``deltas`` in a single ``UPDATE ... SET x = x + n``.
+
+    The course can be given directly or through one of its sections, in which case it is resolved
+    inside the same statement.
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    if course_id is not None:
+        stats = CourseStats.objects.filter(course_id=course_id)
+    else:
+        stats = CourseStats.objects.filter(course__sections=section_id)
+    stats.update(updated_at=timezone.now(), **{field: F(field) + value for field, value in deltas.items()})
+
+
+def compute_stats(course_ids=None):
+    """Recount the stats of ``course_ids`` (or every course) from the child tables."""
+    courses = Course.objects.order_by('pk')
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    return courses.annotate_stats().values('pk', *COURSE_STAT_FIELDS)
+
+
+def rebuild_course_stats(course_ids=None, batch_size=1000, dry_run=False):
+    """
+    Recount stats from scratch and repair every row that drifted.
+
+    Returns a list of ``(course_id, field, stored, actual)`` tuples describing the drift found;
+    ``stored`` is ``None`` when the stats row was missing altogether.
+    """
+    drift = []
+    last_pk = 0
+    while True:
+        batch = list(compute_stats(course_ids).filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return drift
+        last_pk = batch[-1]['pk']
+        stored = CourseStats.objects.in_bulk([row['pk'] for row in batch])
+        missing, changed = [], []
+        for row in batch:
+            stats = stored.get(row['pk'])
+            if stats is None:
+                missing.append(CourseStats(course_id=row['pk'], **{field: row[field] for field in COURSE_STAT_FIELDS}))
+                drift.extend((row['pk'], field, None, row[field]) for field in COURSE_STAT_FIELDS)
+                continue
+            dirty = False
+            for field in COURSE_STAT_FIELDS:
+                if getattr(stats, field) != row[field]:
+                    drift.append((row['pk'], field, getattr(stats, field), row[field]))
+                    setattr(stats, field, row[field])
+                    dirty = True
+            if dirty:
+                stats.updated_at = timezone.now()
+                changed.append(stats)
+        if dry_run:
+            continue
+        with transaction.atomic():
+            CourseStats.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+            CourseStats.objects.bulk_update(changed, [*COURSE_STAT_FIELDS, 'updated_at'], batch_size=batch_size)
+            course_detail_cache.bump(*[stats.course_id for stats in missing + changed])
@@ -1,3 +1,1506 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.courses.async_views import heartbeat_queue
+from apps.courses.certificates import CertificateIssuer, eligible_enrollments
+from apps.courses.cloning import clone_course
+from apps.courses.curriculum import ORDER_GAP, assign_orders
+from apps.courses.benchmarks.dataset import generate
+from apps.courses.cache import course_detail_cache
+from apps.courses.id_generator import certificate_number, luhn_check_digit
+from apps.courses.metrics import registry
+from apps.courses.queryplans import capture_plans, plan_problems
+from apps.courses.models import (
+    Answer, Category, Certificate, Course, CourseReview, CourseStats, Enrollment, Instructor, Lesson, LessonProgress,
+    Question, RollupWatermark, Section,
+)
+from apps.courses.rollups import run_rollup
+from apps.courses.slugs import save_with_unique_slug
+from apps.courses.stats import compute_stats
+from apps.courses.views import CourseDetailAPIView, CourseExportAPIView
+from apps.courses.writebehind import QueueFull, WriteBehindQueue
+
+
+# The configured file cache may be shared with servers on the same host; tests never touch it.
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'courses-tests',
+}})
+class CourseTestCase(TestCase):
+    def setUp(self):
+        # Primary keys are reused between tests, so cached payloads must not leak from one test to the next.
+        cache.clear()
+
+
+def make_instructor(username='teacher'):
+    user = User.objects.create_user(username=username, password='secret-pass')
+    return Instructor.objects.create(
+        user=user, bio='Bio', profile_image='https://example.com/p.png', expertise='Python', is_verified=True,
+    )
+
+
+def make_category(name='Programming', parent=None):
+    return Category.objects.create(name=name, slug=name.lower().replace(' ', '-'), description='', icon='code',
+                                   parent=parent)
+
+
+def make_course(instructor, category, title='Python for beginners', **kwargs):
+    fields = dict(
+        title=title, slug=kwargs.pop('slug', None) or f"course-{Course.objects.count() + 1}",
+        description='D' * 60, instructor=instructor, category=category,
+        thumbnail='https://example.com/t.png', price='100.00', level='beginner', status='published',
+        duration_hours='10.00', requirements='None', what_you_learn='Everything',
+    )
+    fields.update(kwargs)
+    return Course.objects.create(**fields)
+
+
+def fill_course(course, sections=2, lessons=3, students=(), ratings=()):
+    for s in range(sections):
+        section = Section.objects.create(course=course, title=f'Section {s}', order=s)
+        for n in range(lessons):
+            Lesson.objects.create(section=section, title=f'Lesson {n}', content='', video_url='https://v.example.com',
+                                  duration_minutes=10, order=n)
+    for student in students:
+        Enrollment.objects.create(student=student, course=course)
+    for student, rating in zip(students, ratings):
+        CourseReview.objects.create(course=course, student=student, rating=rating, title='Review', comment='Ok')
+    return course
+
+
+class CourseListQueryTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+        make_category('Python', parent=cls.category)
+        cls.students = [User.objects.create_user(username=f'student{i}') for i in range(3)]
+
+    def add_courses(self, count):
+        # Committed, so the catalog version moves and the list is built (facets included) afresh.
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                fill_course(make_course(self.instructor, self.category), students=self.students, ratings=[5, 4, 4])
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('courses:create-list'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_does_not_grow_with_courses(self):
+        self.add_courses(2)
+        few, _ = self.count_list_queries()
+        self.add_courses(8)
+        many, _ = self.count_list_queries()
+        self.assertEqual(few, many)
+
+    def test_stats_are_computed_by_the_database(self):
+        self.add_courses(1)
+        _, response = self.count_list_queries()
+        course = response.json()['results'][0]
+        self.assertEqual(course['total_lessons'], 6)
+        self.assertEqual(course['total_duration'], 60)
+        self.assertEqual(course['students_count'], 3)
+        self.assertEqual(course['reviews_count'], 3)
+        self.assertEqual(course['average_rating'], 4.3)
+        self.assertEqual(course['category']['sub_count'], 1)
+
+
+class CourseListPaginationTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = make_instructor()
+        category = make_category()
+        cls.courses = [make_course(instructor, category) for _ in range(7)]
+
+    def get_page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_walks_forward_and_back_without_counting(self):
+        url = reverse('courses:create-list')
+        seen = []
+        with CaptureQueriesContext(connection) as ctx:
+            page = self.get_page(url, page_size=3)
+            while True:
+                seen.extend(course['id'] for course in page['results'])
+                if not page['next']:
+                    break
+                page = self.get_page(page['next'])
+        self.assertEqual(seen, [course.id for course in reversed(self.courses)])
+        self.assertFalse(any('COUNT(*)' in query['sql'] for query in ctx.captured_queries))
+
+        previous = self.get_page(page['previous'])
+        self.assertEqual([course['id'] for course in previous['results']], seen[3:6])
+        first = self.get_page(previous['previous'])
+        self.assertEqual([course['id'] for course in first['results']], seen[:3])
+        self.assertIsNone(first['previous'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('courses:create-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CourseStatsTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+        cls.students = [User.objects.create_user(username=f'student{i}') for i in range(3)]
+
+    def assertStatsMatchChildTables(self, *courses):
+        for actual in compute_stats([course.pk for course in courses]):
+            stats = CourseStats.objects.get(pk=actual.pop('pk'))
+            self.assertEqual({field: getattr(stats, field) for field in actual}, actual)
+
+    def test_counters_follow_creates_updates_and_deletes(self):
+        course = fill_course(make_course(self.instructor, self.category), students=self.students, ratings=[5, 3, 1])
+        other = fill_course(make_course(self.instructor, self.category), sections=1, lessons=1)
+        self.assertStatsMatchChildTables(course, other)
+
+        review = CourseReview.objects.get(course=course, rating=1)
+        review.rating = 4
+        review.save()
+        lesson = Lesson.objects.filter(section__course=course).first()
+        lesson.duration_minutes = 25
+        lesson.section = other.sections.get()
+        lesson.save()
+        course.sections.first().delete()
+        Enrollment.objects.filter(course=course).first().delete()
+        self.assertStatsMatchChildTables(course, other)
+
+        stats = CourseStats.objects.get(pk=course.pk)
+        self.assertEqual(stats.average_rating, 4.0)
+        self.assertEqual(stats.students_count, 2)
+
+    def test_cascade_deletes_do_not_update_stats_per_child(self):
+        small = fill_course(make_course(self.instructor, self.category), sections=1, lessons=1,
+                            students=self.students[:1], ratings=[5])
+        large = fill_course(make_course(self.instructor, self.category), sections=3, lessons=4,
+                            students=self.students, ratings=[5, 4, 3])
+        with CaptureQueriesContext(connection) as ctx:
+            small.delete()
+        self.assertFalse([query for query in ctx.captured_queries if 'courses_coursestats" SET' in query['sql']])
+        # Neither stats nor cache invalidation touch the database once per child row.
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            large.delete()
+        self.assertFalse(CourseStats.objects.exists())
+
+        course = fill_course(make_course(self.instructor, self.category), sections=2, lessons=4)
+        with CaptureQueriesContext(connection) as ctx:
+            course.sections.first().delete()
+        self.assertEqual(sum('courses_coursestats" SET' in query['sql'] for query in ctx.captured_queries), 1)
+        self.assertStatsMatchChildTables(course)
+
+        with CaptureQueriesContext(connection) as ctx:
+            Lesson.objects.filter(section__course=course).delete()
+        self.assertEqual(sum(query['sql'].startswith('SELECT "courses_section"') for query in ctx.captured_queries), 1)
+
+    def test_owner_cascades_do_not_update_stats_per_child(self):
+        for kind in ('instructor', 'category', 'user'):
+            counts = []
+            for size, students in ((1, self.students[:1]), (4, self.students)):
+                instructor, category = make_instructor(f'{kind}{size}'), make_category(f'{kind} {size}')
+                fill_course(make_course(instructor, category), sections=size, lessons=size, students=students,
+                            ratings=[5] * len(students))
+                owner = {'instructor': instructor, 'category': category, 'user': instructor.user}[kind]
+                with CaptureQueriesContext(connection) as ctx:
+                    owner.delete()
+                self.assertFalse([query for query in ctx.captured_queries
+                                  if 'courses_coursestats" SET' in query['sql']], kind)
+                counts.append(len(ctx.captured_queries))
+            self.assertEqual(counts[0], counts[1], kind)
+
+        # A student's cascade still updates the courses they were enrolled in.
+        course = fill_course(make_course(self.instructor, self.category), sections=1, students=self.students,
+                             ratings=[5, 4, 3])
+        self.students[0].delete()
+        self.assertStatsMatchChildTables(course)
+        self.assertEqual(CourseStats.objects.get(pk=course.pk).students_count, 2)
+
+    def test_rebuild_command_reports_and_fixes_drift(self):
+        course = fill_course(make_course(self.instructor, self.category), students=self.students[:1])
+        CourseStats.objects.filter(pk=course.pk).update(students_count=40)
+
+        out = StringIO()
+        call_command('rebuild_course_stats', stdout=out)
+        self.assertIn(f'course {course.pk}: students_count stored=40 actual=1', out.getvalue())
+        self.assertEqual(CourseStats.objects.get(pk=course.pk).students_count, 1)
+
+        out = StringIO()
+        call_command('rebuild_course_stats', stdout=out)
+        self.assertIn('No drift found.', out.getvalue())
+
+    def test_missing_stats_row_reads_as_zeros_without_writing(self):
+        course = fill_course(make_course(self.instructor, self.category), students=self.students[:1])
+        CourseStats.objects.filter(pk=course.pk).delete()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse('courses:course-detail', args=[course.pk])).json()
+        self.assertEqual((data['total_lessons'], data['students_count']), (0, 0))
+        self.assertFalse([query for query in ctx.captured_queries if not query['sql'].startswith('SELECT')])
+        self.assertFalse(CourseStats.objects.filter(pk=course.pk).exists())
+
+
+class CourseDetailQueryTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+        cls.students = [User.objects.create_user(username=f'student{i}') for i in range(15)]
+
+    def get_detail(self, course):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('courses:course-detail', args=[course.pk]))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_budget_is_fixed(self):
+        small = fill_course(make_course(self.instructor, self.category), sections=1, lessons=1,
+                            students=self.students[:1], ratings=[5])
+        large = fill_course(make_course(self.instructor, self.category), sections=5, lessons=4,
+                            students=self.students, ratings=[4] * 15)
+        small_queries, _ = self.get_detail(small)
+        large_queries, data = self.get_detail(large)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(len(data['sections']), 5)
+        self.assertEqual(len(data['reviews']), CourseDetailAPIView.reviews_limit)
+        self.assertEqual(data['reviews'][0]['user'], 'student14')
+        self.assertEqual(data['reviews_count'], 15)
+        self.assertEqual(data['instructor']['courses_count'], 2)
+        self.assertNotIn('rollup_touched_at', data['instructor'])
+
+    def test_reviews_endpoint_pages_through_every_review(self):
+        course = fill_course(make_course(self.instructor, self.category), sections=0,
+                             students=self.students, ratings=[3] * 15)
+        url = reverse('courses:course-reviews', args=[course.pk]) + '?page_size=4'
+        users = []
+        while url:
+            page = self.client.get(url).json()
+            users.extend(review['user'] for review in page['results'])
+            url = page['next']
+        self.assertEqual(users, [f'student{i}' for i in reversed(range(15))])
+
+
+class SparseFieldsetTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+        cls.course = fill_course(make_course(cls.instructor, cls.category, discount_percentage=50))
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in ctx.captured_queries]
+
+    def test_list_only_reads_what_the_fieldset_needs(self):
+        full, full_queries = self.get(reverse('courses:create-list'))
+        response, queries = self.get(reverse('courses:create-list') + '?fields=id,title,thumbnail,final_price')
+
+        self.assertEqual(response.json()['results'], [{
+            'id': self.course.pk, 'title': self.course.title, 'thumbnail': self.course.thumbnail,
+            'final_price': 50.0,
+        }])
+        self.assertLess(len(queries), len(full_queries))
+        page_query = next(sql for sql in queries if 'LIMIT' in sql and '"courses_course"."title"' in sql)
+        self.assertNotIn('"courses_course"."description"', page_query)
+        self.assertNotIn('courses_instructor', page_query)
+        self.assertNotIn('courses_coursestats', page_query)
+
+    def test_relations_outside_expand_are_primary_keys(self):
+        response, _ = self.get(reverse('courses:create-list') + '?fields=id,instructor,category&expand=category')
+        course = response.json()['results'][0]
+        self.assertEqual(course['instructor'], self.instructor.pk)
+        self.assertEqual(course['category']['name'], 'Programming')
+
+    def test_detail_fieldset(self):
+        url = reverse('courses:course-detail', args=[self.course.pk])
+        response, _ = self.get(url + '?fields=id,title,instructor,students_count')
+        self.assertEqual(response.json(), {
+            'id': self.course.pk, 'title': self.course.title, 'students_count': 0, 'is_enrolled': False,
+            'instructor': {**response.json()['instructor'], 'courses_count': 1},
+        })
+        self.assertNotEqual(response['ETag'], self.client.get(url)['ETag'])
+
+        Course.objects.filter(pk=self.course.pk).update(status='archived')
+        course_detail_cache.bump(self.course.pk)
+        self.assertEqual(self.client.get(url + '?fields=id').status_code, 404)
+
+    def test_unknown_fields_are_rejected(self):
+        response, _ = self.get(reverse('courses:create-list') + '?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['fields'])
+        response, _ = self.get(reverse('courses:course-detail', args=[self.course.pk]) + '?expand=sections')
+        self.assertEqual(response.status_code, 400)
+
+
+class CourseDetailCacheTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+        cls.student = User.objects.create_user(username='student', password='secret-pass')
+
+    def get_detail(self, course):
+        return self.client.get(reverse('courses:course-detail', args=[course.pk])).json()
+
+    def test_writes_invalidate_the_cached_body(self):
+        course = fill_course(make_course(self.instructor, self.category), sections=1, lessons=1)
+        course_detail_cache.reset_stats()
+        self.get_detail(course)
+        with self.assertNumQueries(0):
+            self.get_detail(course)
+        self.assertEqual(course_detail_cache.stats(), {'hits': 1, 'misses': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.create(section=course.sections.get(), title='New', content='',
+                                  video_url='https://v.example.com', duration_minutes=5)
+        self.assertEqual(self.get_detail(course)['total_lessons'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.expertise = 'Django'
+            self.instructor.save()
+        self.assertEqual(self.get_detail(course)['instructor']['expertise'], 'Django')
+        self.assertEqual(course_detail_cache.stats(), {'hits': 1, 'misses': 3})
+
+    def test_instructor_course_count_follows_their_other_courses(self):
+        course = make_course(self.instructor, self.category)
+        self.assertEqual(self.get_detail(course)['instructor']['courses_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = make_course(self.instructor, self.category)
+        self.assertEqual(self.get_detail(course)['instructor']['courses_count'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            clone_course(course)
+        self.assertEqual(self.get_detail(course)['instructor']['courses_count'], 3)
+
+        other = make_instructor('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            second.instructor = other
+            second.save()
+        self.assertEqual(self.get_detail(course)['instructor']['courses_count'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.exclude(pk__in=[course.pk, second.pk]).delete()
+        self.assertEqual(self.get_detail(course)['instructor']['courses_count'], 1)
+
+    def test_version_keys_expire_with_the_bodies(self):
+        # A process whose cache missed another process's bump must not keep its version forever.
+        version = course_detail_cache.get_version(1)
+        later = time.time() + course_detail_cache.timeout + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertGreater(course_detail_cache.get_version(1), version)
+
+    def test_is_enrolled_is_merged_per_user(self):
+        course = make_course(self.instructor, self.category)
+        Enrollment.objects.create(student=self.student, course=course)
+        self.assertFalse(self.get_detail(course)['is_enrolled'])
+        self.client.force_login(self.student)
+        self.assertTrue(self.get_detail(course)['is_enrolled'])
+
+
+class ConditionalGetTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+        cls.course = make_course(cls.instructor, cls.category)
+
+    def test_list_returns_304_until_the_catalog_changes(self):
+        url = reverse('courses:create-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_course(self.instructor, self.category)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def rename_category(self):
+        category = Category.objects.get(pk=self.category.pk)
+        category.name = 'Renamed'
+        category.save()
+
+    def test_list_etag_follows_nested_instructor_and_category(self):
+        url = reverse('courses:create-list')
+        student = User.objects.create_user(username='student')
+        for change in (
+            lambda: Enrollment.objects.create(student=student, course=self.course),
+            lambda: run_rollup(full=True),
+            self.rename_category,
+        ):
+            etag = self.client.get(url)['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_honours_if_modified_since(self):
+        url = reverse('courses:create-list')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_returns_304_until_the_course_changes(self):
+        url = reverse('courses:course-detail', args=[self.course.pk])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Section.objects.create(course=self.course, title='Intro')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SlugAllocationTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+
+    def test_create_and_rename_share_the_allocator(self):
+        payload = {
+            'title': 'Python for beginners', 'description': 'D' * 60, 'price': '10.00', 'level': 'beginner',
+            'duration_hours': '2.00', 'requirements': '-', 'what_you_learn': '-', 'thumbnail': 'https://e.com/t.png',
+            'instructor_id': self.instructor.pk, 'category_id': self.category.pk,
+        }
+        first = self.client.post(reverse('courses:create-list'), payload).json()
+        second = self.client.post(reverse('courses:create-list'), payload).json()
+        self.assertEqual(first['slug'], 'python-for-beginners')
+        self.assertTrue(second['slug'].startswith('python-for-beginners-'))
+
+        self.client.force_login(self.instructor.user)
+        response = self.client.patch(reverse('courses:course-detail', args=[second['id']]),
+                                     {'title': 'Advanced Django patterns'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Course.objects.get(pk=second['id']).slug, 'advanced-django-patterns')
+
+    def test_retries_when_a_concurrent_writer_takes_the_slug(self):
+        make_course(self.instructor, self.category, slug='python-for-beginners')
+        make_course(self.instructor, self.category, slug='python-for-beginners-taken')
+        course = Course(title='Python for beginners', description='D' * 60, instructor=self.instructor,
+                        category=self.category, thumbnail='https://e.com/t.png', price='10.00', level='beginner',
+                        duration_hours='2.00', requirements='-', what_you_learn='-')
+        with mock.patch('apps.courses.slugs.generate_id', side_effect=['taken', 'free']):
+            save_with_unique_slug(course, course.title)
+        self.assertEqual(course.slug, 'python-for-beginners-free')
+
+
+class ImportCoursesTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.category = make_category()
+        make_course(cls.instructor, cls.category, slug='python-for-beginners')
+
+    def row(self, title='Python for beginners', **overrides):
+        row = {
+            'title': title, 'description': 'D' * 60, 'price': '10.00', 'level': 'beginner', 'duration_hours': '2.00',
+            'requirements': '-', 'what_you_learn': '-', 'thumbnail': 'https://e.com/t.png',
+            'instructor_id': self.instructor.pk, 'category_id': self.category.pk,
+            'sections': [{'title': 'Intro', 'order': 1, 'lessons': [
+                {'title': 'Hello', 'video_url': 'https://v.example.com/1', 'duration_minutes': 7},
+                {'title': 'World', 'video_url': 'https://v.example.com/2', 'duration_minutes': 8},
+            ]}],
+        }
+        row.update(overrides)
+        return row
+
+    def write_input(self, rows):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w') as fh:
+            fh.writelines(json.dumps(row) + '\n' for row in rows)
+        self.addCleanup(lambda: [os.remove(p) for p in (path, f'{path}.checkpoint') if os.path.exists(p)])
+        return path
+
+    def test_imports_valid_rows_and_reports_the_rest(self):
+        path = self.write_input([self.row(), self.row(price='-1'), self.row(), self.row(category_id=999)])
+        out, err = StringIO(), StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('import_courses', path, batch_size=10, stdout=out, stderr=err)
+
+        self.assertIn('Imported 2 courses, 2 sections and 4 lessons', out.getvalue())
+        rejected = [json.loads(line) for line in err.getvalue().splitlines()]
+        self.assertEqual([error['row'] for error in rejected], [2, 4])
+        self.assertIn('category_id', rejected[1]['errors'])
+        self.assertLess(len(ctx.captured_queries), 15)
+
+        imported = Course.objects.exclude(slug='python-for-beginners')
+        self.assertEqual(imported.values('slug').distinct().count(), 2)
+        stats = CourseStats.objects.get(course=imported.first())
+        self.assertEqual((stats.total_lessons, stats.total_duration), (2, 15))
+
+    def test_resumes_after_the_checkpoint(self):
+        path = self.write_input([self.row(title=f'Course number {n}') for n in range(5)])
+        with open(f'{path}.checkpoint', 'w') as fh:
+            json.dump({'row': 3}, fh)
+
+        out = StringIO()
+        call_command('import_courses', path, batch_size=2, resume=True, stdout=out)
+        self.assertIn('Imported 2 courses', out.getvalue())
+        self.assertEqual(sorted(Course.objects.filter(title__startswith='Course number').values_list('title', flat=True)),
+                         ['Course number 3', 'Course number 4'])
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+
+class CourseExportTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = make_instructor()
+        category = make_category()
+        cls.courses = [fill_course(make_course(instructor, category), sections=1, lessons=2) for _ in range(7)]
+
+    def export(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('courses:course-export'), params)
+            body = b''.join(response.streaming_content).decode()
+        return response, body, len(ctx.captured_queries)
+
+    def test_ndjson_streams_every_course_in_chunks(self):
+        with mock.patch.object(CourseExportAPIView, 'chunk_size', 3):
+            response, body, queries = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [course.pk for course in self.courses])
+        self.assertEqual(rows[0]['total_lessons'], 2)
+        # One course query plus one category prefetch per chunk, never per row.
+        self.assertLessEqual(queries, 1 + 3)
+
+    def test_json_array_output(self):
+        response, body, _ = self.export(output='json')
+        self.assertEqual(len(json.loads(body)), 7)
+
+    def test_command_writes_to_stdout(self):
+        out = StringIO()
+        call_command('export_courses', chunk_size=2, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 7)
+
+
+class CourseSearchTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor('guido')
+        cls.category = make_category()
+        cls.other_category = make_category('Design')
+        cls.django = make_course(cls.instructor, cls.category, 'Django REST APIs', description='Build web services ' * 5)
+        cls.mention = make_course(cls.instructor, cls.category, 'Web services',
+                                  description='Covers django briefly ' * 5, level='advanced')
+        cls.figma = make_course(cls.instructor, cls.other_category, 'Figma basics', what_you_learn='Prototyping')
+
+    def search(self, **params):
+        response = self.client.get(reverse('courses:course-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [course['id'] for course in response.json()['results']]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search(q='django'), [self.django.pk, self.mention.pk])
+
+    def test_prefix_and_filters(self):
+        self.assertEqual(self.search(q='djan', level='advanced'), [self.mention.pk])
+        self.assertEqual(self.search(q='proto', category=self.other_category.pk), [self.figma.pk])
+        self.assertEqual(self.search(q='proto', category=self.category.pk), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.figma.title = 'Sketch basics'
+        self.figma.save()
+        self.assertEqual(self.search(q='figma'), [])
+        self.assertEqual(self.search(q='sketch'), [self.figma.pk])
+
+        user = self.instructor.user
+        user.first_name = 'Rossum'
+        user.save()
+        self.assertEqual(len(self.search(q='rossum')), 3)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.instructor.bio = 'Language designer'
+            self.instructor.save()
+        self.assertFalse([query for query in ctx.captured_queries if 'courses_course_fts' in query['sql']])
+        self.instructor.user = User.objects.create_user(username='barry', first_name='Warsaw')
+        self.instructor.save()
+        self.assertEqual(len(self.search(q='warsaw')), 3)
+        self.assertEqual(self.search(q='rossum'), [])
+
+        self.django.delete()
+        self.assertEqual(self.search(q='django'), [self.mention.pk])
+
+    def test_query_is_required(self):
+        response = self.client.get(reverse('courses:course-search'), {'q': ' '})
+        self.assertEqual(response.status_code, 400)
+
+
+class CourseFilterTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = make_instructor()
+        cls.programming = make_category()
+        cls.design = make_category('Design')
+        cls.cheap = make_course(instructor, cls.programming, price='0.00')
+        cls.advanced = make_course(instructor, cls.programming, level='advanced', price='150.00', language='English')
+        cls.featured = make_course(instructor, cls.design, price='40.00', is_featured=True)
+        cls.draft = make_course(instructor, cls.design, status='draft', price='250.00')
+
+    def get_list(self, query=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('courses:create-list') + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), ctx.captured_queries
+
+    def test_filters_combine(self):
+        data, _ = self.get_list('?category=%d&min_price=100' % self.programming.pk)
+        self.assertEqual([course['id'] for course in data['results']], [self.advanced.pk])
+        data, _ = self.get_list('?level=beginner,advanced&language=English')
+        self.assertEqual([course['id'] for course in data['results']], [self.advanced.pk])
+        data, _ = self.get_list('?is_featured=true&status=published')
+        self.assertEqual([course['id'] for course in data['results']], [self.featured.pk])
+
+    def test_facets_are_disjunctive_and_come_from_one_query(self):
+        data, queries = self.get_list('?level=beginner')
+        facets = data['facets']
+        self.assertEqual(facets['total'], 3)
+        # The level facet ignores the level filter; the others respect it.
+        self.assertEqual(facets['level'], {'beginner': 3, 'intermediate': 0, 'advanced': 1})
+        self.assertEqual(facets['language'], {'Uzbek': 3, 'English': 0})
+        self.assertEqual(facets['price'], {'free': 1, '0-50': 1, '50-100': 0, '100-200': 0, '200+': 1})
+        self.assertEqual(facets['is_featured'], {'true': 1, 'false': 2})
+        self.assertEqual({category['id']: category['count'] for category in facets['category']},
+                         {self.programming.pk: 1, self.design.pk: 2})
+        self.assertEqual(sum('FILTER (WHERE' in query['sql'] for query in queries), 1)
+
+    def test_facets_are_cached_and_skipped_on_later_pages(self):
+        self.get_list('?level=beginner&page_size=1')
+        data, queries = self.get_list('?level=beginner&page_size=1')
+        self.assertIn('facets', data)
+        self.assertFalse(any('FILTER (WHERE' in query['sql'] for query in queries))
+
+        cursor = data['next'].split('?', 1)[1]
+        self.assertNotIn('facets', self.get_list('?' + cursor)[0])
+        self.assertIn('facets', self.get_list('?facets=true&' + cursor)[0])
+        self.assertNotIn('facets', self.get_list('?facets=false')[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_course(self.cheap.instructor, self.design)
+        self.assertEqual(self.get_list('?level=beginner')[0]['facets']['total'], 4)
+
+    def test_invalid_filter_is_rejected(self):
+        for name, value in (('min_price', 'cheap'), ('min_price', 'NaN'), ('max_price', 'Infinity'),
+                            ('max_price', 'sNaN')):
+            with self.subTest(value=value):
+                response = self.client.get(reverse('courses:create-list'), {name: value})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {name: ['Expected a number.']})
+
+
+class CategoryTreeTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.programming = make_category()
+        cls.web = make_category('Web', parent=cls.programming)
+        cls.django = make_category('Django', parent=cls.web)
+        cls.design = make_category('Design')
+        for category in (cls.programming, cls.web, cls.django, cls.design):
+            make_course(cls.instructor, category)
+
+    def refresh(self, *categories):
+        for category in categories:
+            category.refresh_from_db()
+
+    def test_paths_answer_subtree_and_ancestor_queries(self):
+        self.assertEqual(self.django.depth, 2)
+        self.assertEqual(set(Category.objects.descendants_of(self.programming)),
+                         {self.programming, self.web, self.django})
+        self.assertEqual([crumb['name'] for crumb in self.django.breadcrumbs()], ['Programming', 'Web', 'Django'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.programming.subtree_course_count(), 3)
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.web.parent = self.design
+        self.web.save()
+        self.refresh(self.django)
+        self.assertTrue(self.django.path.startswith(self.design.path))
+        self.assertEqual(self.django.depth, 2)
+        self.assertEqual(self.programming.subtree_course_count(), 1)
+        self.assertEqual(self.design.subtree_course_count(), 3)
+
+    def test_cycles_are_rejected(self):
+        self.programming.parent = self.django
+        with self.assertRaises(ValidationError) as ctx:
+            self.programming.full_clean()
+        self.assertIn('parent', ctx.exception.message_dict)
+        with self.assertRaises(ValidationError):
+            self.programming.save()
+
+        self.client.force_login(User.objects.create_superuser('admin'))
+        response = self.client.post(reverse('admin:courses_category_change', args=[self.programming.pk]), {
+            'name': 'Programming', 'slug': self.programming.slug, 'description': 'x', 'icon': 'x',
+            'parent': self.django.pk, 'is_active': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'cannot be moved under itself')
+
+    def test_renames_and_moves_invalidate_the_embedding_courses(self):
+        courses = {category: Course.objects.get(category=category)
+                   for category in (self.programming, self.web, self.django, self.design)}
+
+        def bumped(change):
+            versions = {category: course_detail_cache.get_version(course.pk) for category, course in courses.items()}
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            return {category for category, course in courses.items()
+                    if course_detail_cache.get_version(course.pk) != versions[category]}
+
+        self.web.name = 'Web development'
+        self.assertEqual(bumped(self.web.save), {self.web, self.programming})
+        # The old and the new parent's sub_count change along with the moved category itself.
+        self.django.parent = self.design
+        self.assertEqual(bumped(self.django.save), {self.django, self.web, self.design})
+
+    def test_course_list_filters_by_subtree(self):
+        response = self.client.get(reverse('courses:create-list') + f'?category_tree={self.web.pk}')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_tree_is_cached_until_a_category_changes(self):
+        url = reverse('courses:category-tree')
+        tree = self.client.get(url).json()
+        self.assertEqual([node['name'] for node in tree], ['Programming', 'Design'])
+        self.assertEqual(tree[0]['children'][0]['children'][0]['name'], 'Django')
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_category('Music')
+        self.assertEqual(len(self.client.get(url).json()), 3)
+
+    def test_category_detail(self):
+        data = self.client.get(reverse('courses:category-detail', args=[self.web.pk])).json()
+        self.assertEqual([crumb['id'] for crumb in data['breadcrumbs']], [self.programming.pk, self.web.pk])
+        self.assertEqual(data['children'], [{'id': self.django.pk, 'name': 'Django', 'slug': 'django'}])
+        self.assertEqual(data['course_count'], 2)
+
+
+class HeartbeatTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username='viewer')
+        cls.course = fill_course(make_course(make_instructor(), make_category()), sections=1, lessons=4,
+                                 students=[cls.student])
+        cls.enrollment = Enrollment.objects.get(student=cls.student)
+        cls.lessons = list(Lesson.objects.filter(section__course=cls.course).order_by('order'))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student)
+
+    def send(self, events):
+        return self.client.post(reverse('courses:progress-heartbeats'), {'events': events}, content_type='application/json')
+
+    def event(self, lesson, seconds, **extra):
+        return {'enrollment': self.enrollment.pk, 'lesson': lesson.pk, 'seconds': seconds, **extra}
+
+    def test_events_are_coalesced_and_progress_recomputed(self):
+        events = [self.event(self.lessons[0], 300)] * 2 + [self.event(self.lessons[1], 30, completed=True)]
+        response = self.send(events)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['progress'], [{'enrollment': self.enrollment.pk, 'progress_percentage': 50}])
+
+        first = LessonProgress.objects.get(lesson=self.lessons[0])
+        self.assertEqual((first.watch_time_seconds, first.watch_time_minutes, first.is_completed), (600, 10, True))
+        self.send([self.event(self.lessons[0], 60)])
+        first.refresh_from_db()
+        self.assertEqual(first.watch_time_seconds, 660)
+
+    def test_query_count_does_not_grow_with_events(self):
+        with CaptureQueriesContext(connection) as few:
+            self.send([self.event(self.lessons[0], 5)])
+        with CaptureQueriesContext(connection) as many:
+            self.send([self.event(lesson, 5) for lesson in self.lessons] * 10)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_completing_every_lesson_completes_the_enrollment(self):
+        self.send([self.event(lesson, 600) for lesson in self.lessons])
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.progress_percentage, self.enrollment.status), (100, 'completed'))
+
+    def test_other_students_enrollments_are_rejected(self):
+        self.client.force_login(User.objects.create_user(username='intruder'))
+        self.assertEqual(self.send([self.event(self.lessons[0], 5)]).status_code, 400)
+        self.assertFalse(LessonProgress.objects.exists())
+
+
+class WriteBehindQueueTests(SimpleTestCase):
+    def test_items_are_flushed_in_bounded_batches_and_drained(self):
+        batches = []
+        queue = WriteBehindQueue('test', batches.append, max_batch=3, max_delay=0.01)
+
+        async def main():
+            await queue.put(range(7))
+            await queue.drain()
+
+        asyncio.run(main())
+        self.assertEqual(batches, [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(queue.flushed, 7)
+
+    def test_full_queue_pushes_back(self):
+        queue = WriteBehindQueue('test', lambda items: None, max_pending=2, max_delay=60, put_timeout=0.01)
+
+        async def main():
+            await queue.put([1, 2])
+            with self.assertRaises(QueueFull):
+                await queue.put([3])
+            await queue.drain()
+
+        asyncio.run(main())
+
+
+class AsyncHeartbeatTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username='viewer')
+        cls.course = fill_course(make_course(make_instructor(), make_category()), sections=1, lessons=2,
+                                 students=[cls.student])
+        cls.enrollment = Enrollment.objects.get(student=cls.student)
+        cls.lesson = Lesson.objects.filter(section__course=cls.course).first()
+
+    async def test_events_are_acknowledged_then_written_behind(self):
+        written = []
+        await self.async_client.aforce_login(self.student)
+        with mock.patch.object(heartbeat_queue, 'flush', written.extend):
+            response = await self.async_client.post(
+                reverse('courses:progress-heartbeats-async'),
+                {'events': [{'enrollment': self.enrollment.pk, 'lesson': self.lesson.pk, 'seconds': 5}]},
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 202)
+            await heartbeat_queue.drain()
+        self.assertEqual(written, [(self.enrollment.pk, self.lesson.pk, 5, False)])
+
+    def test_wsgi_requests_write_inline(self):
+        self.client.force_login(self.student)
+        response = self.client.post(
+            reverse('courses:progress-heartbeats-async'),
+            {'events': [{'enrollment': self.enrollment.pk, 'lesson': self.lesson.pk, 'seconds': 5}]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'events': 1, 'queued': False})
+        self.assertEqual(LessonProgress.objects.get().watch_time_seconds, 5)
+
+    def test_configured_authentication_classes_are_used(self):
+        url = reverse('courses:progress-heartbeats-async')
+        body = {'events': [{'enrollment': self.enrollment.pk, 'lesson': self.lesson.pk, 'seconds': 5}]}
+        self.assertEqual(self.client.post(url, body, content_type='application/json').status_code, 403)
+
+        self.student.set_password('secret')
+        self.student.save()
+        credentials = 'Basic ' + base64.b64encode(b'viewer:secret').decode()
+        response = self.client.post(url, body, content_type='application/json', HTTP_AUTHORIZATION=credentials)
+        self.assertEqual(response.json(), {'events': 1, 'queued': False})
+        response = self.client.post(url, body, content_type='application/json', HTTP_AUTHORIZATION='Basic Zm9vOmJhcg==')
+        self.assertEqual(response.status_code, 401)
+
+        # Session users still need a CSRF token.
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.student)
+        response = client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF', response.json()['detail'])
+
+
+class InstructorRollupTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [User.objects.create_user(username=f'student{i}') for i in range(3)]
+        cls.category = make_category()
+        cls.busy = make_instructor('busy')
+        cls.idle = make_instructor('idle')
+        fill_course(make_course(cls.busy, cls.category), students=cls.students, ratings=[5, 4])
+        fill_course(make_course(cls.busy, cls.category), students=cls.students[:1], ratings=[3])
+        cls.idle_course = make_course(cls.idle, cls.category)
+
+    def refresh(self):
+        self.busy.refresh_from_db()
+        self.idle.refresh_from_db()
+
+    def test_rollup_aggregates_course_stats(self):
+        self.assertEqual(run_rollup(), (2, 1))
+        self.refresh()
+        self.assertEqual((self.busy.total_students, str(self.busy.rating)), (4, '4.00'))
+        self.assertEqual((self.idle.total_students, str(self.idle.rating)), (0, '0.00'))
+
+    def test_incremental_run_only_reprocesses_touched_instructors(self):
+        run_rollup()
+        CourseStats.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        Instructor.objects.update(rollup_touched_at=None)
+        RollupWatermark.objects.update(value=timezone.now() - timedelta(minutes=30))
+        self.assertEqual(run_rollup(), (0, 0))
+
+        Enrollment.objects.create(student=self.students[0], course=self.idle_course)
+        self.assertEqual(run_rollup(), (1, 1))
+        self.refresh()
+        self.assertEqual(self.idle.total_students, 1)
+
+        # Moving a course marks both instructors even though no stats row changed.
+        CourseStats.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        RollupWatermark.objects.update(value=timezone.now() - timedelta(minutes=30))
+        self.idle_course.instructor = self.busy
+        self.idle_course.save()
+        self.assertEqual(run_rollup(), (2, 2))
+        self.refresh()
+        self.assertEqual((self.busy.total_students, self.idle.total_students), (5, 0))
+
+    @override_settings(INSTRUCTOR_ROLLUPS_EAGER=True)
+    def test_eager_mode_refreshes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CourseReview.objects.create(course=self.idle_course, student=self.students[0], rating=2, title='Meh',
+                                        comment='')
+        self.refresh()
+        self.assertEqual(str(self.idle.rating), '2.00')
+
+
+class CertificateIssueTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor, category = make_instructor(), make_category()
+        cls.students = [User.objects.create_user(username=f'graduate{i}') for i in range(5)]
+        cls.courses = [make_course(instructor, category) for _ in range(2)]
+        for course in cls.courses:
+            fill_course(course, sections=0, students=cls.students)
+        Enrollment.objects.exclude(student=cls.students[-1]).update(status='completed')
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        override = override_settings(MEDIA_ROOT=self.media_root, SITE_URL='https://learn.example.com')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def issue(self):
+        out = StringIO()
+        call_command('issue_certificates', workers=1, batch_size=3, stdout=out)
+        return out.getvalue()
+
+    def test_numbers_are_sequential_per_course_and_checksummed(self):
+        self.assertEqual(certificate_number(12, 7), 'UC-000012-0000007-' + luhn_check_digit('0000120000007'))
+        self.assertIn('Issued 8 certificates', self.issue())
+        for course in self.courses:
+            numbers = sorted(Certificate.objects.filter(enrollment__course=course)
+                             .values_list('certificate_number', flat=True))
+            self.assertEqual(numbers, [certificate_number(course.pk, n) for n in range(1, 5)])
+
+    def test_files_are_rendered_and_reruns_are_idempotent(self):
+        self.issue()
+        certificate = Certificate.objects.select_related('enrollment__student').first()
+        self.assertTrue(certificate.certificate_url.startswith('https://learn.example.com/media/certificates/'))
+        path = os.path.join(self.media_root, certificate.certificate_url.removeprefix('https://learn.example.com/media/'))
+        with open(path) as fh:
+            self.assertIn(certificate.enrollment.student.username, fh.read())
+
+        self.assertIn('Issued 0 certificates', self.issue())
+        Enrollment.objects.filter(student=self.students[-1]).update(status='completed')
+        self.issue()
+        self.assertEqual(Certificate.objects.count(), 10)
+        # The next block continues after the numbers already handed out.
+        self.assertTrue(Certificate.objects.filter(certificate_number=certificate_number(self.courses[0].pk, 5)).exists())
+
+    def test_rows_dropped_as_conflicts_are_not_counted(self):
+        enrollments = list(eligible_enrollments().select_related('student', 'course').order_by('pk'))
+        # A concurrent run certifies the first enrollment after this batch was read.
+        Certificate.objects.create(enrollment=enrollments[0], certificate_number='UC-concurrent',
+                                   certificate_url='https://learn.example.com/media/concurrent.svg')
+        issuer = CertificateIssuer(workers=1)
+        issuer.issue(enrollments)
+        self.assertEqual(issuer.counts['issued'], len(enrollments) - 1)
+        self.assertEqual(Certificate.objects.get(enrollment=enrollments[0]).certificate_number, 'UC-concurrent')
+        rendered = sum(len(files) for _, _, files in os.walk(self.media_root))
+        self.assertEqual(rendered, len(enrollments) - 1)
+
+
+class BenchmarkDatasetTests(CourseTestCase):
+    def test_small_scale_is_deterministic_and_consistent(self):
+        rows = generate('1k', seed=3)
+        self.assertEqual(rows['Course'], 20)
+        self.assertEqual(rows['Lesson'], 20 * 3 * 4)
+        titles = list(Course.objects.order_by('pk').values_list('title', flat=True))
+        # Denormalized counters are rebuilt after the bulk inserts.
+        self.assertEqual(list(compute_stats()), list(CourseStats.objects.order_by('pk').values(
+            'pk', 'total_lessons', 'total_duration', 'students_count', 'reviews_count', 'rating_sum')))
+
+        Course.objects.all().delete()
+        User.objects.all().delete()
+        Category.objects.all().delete()
+        generate('1k', seed=3)
+        self.assertEqual(list(Course.objects.order_by('pk').values_list('title', flat=True)), titles)
+
+
+class BenchCommandTests(SimpleTestCase):
+    def test_existing_database_file_is_refused(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'keep.sqlite3')
+            with open(path, 'wb') as file:
+                file.write(b'not a benchmark')
+            with self.assertRaisesMessage(CommandError, 'already exists'):
+                call_command('bench', 'slugs', '--database', path, stdout=StringIO())
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), b'not a benchmark')
+
+
+class RequestMetricsTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = fill_course(make_course(make_instructor(), make_category()))
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_server_timing_reports_the_queries_of_the_request(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('courses:course-detail', args=[self.course.pk]))
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'sql', 'serialize', 'render', 'total'})
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing['sql'])
+
+    def test_metrics_endpoint_serves_histograms_per_url_name(self):
+        self.client.get(reverse('courses:create-list'))
+        self.client.get(reverse('courses:create-list'))
+        self.client.get(reverse('courses:course-detail', args=[self.course.pk]))
+
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            response = self.client.get(reverse('courses:metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('courses_request_duration_seconds_count{view="courses:create-list",phase="serialize"} 2', body)
+        self.assertIn('courses_request_queries_bucket{view="courses:course-detail",le="+Inf"} 1', body)
+        self.assertIn('courses_cache_requests_total{cache="course-detail",result="miss"}', body)
+
+    def test_metrics_endpoint_is_private(self):
+        url = reverse('courses:metrics')
+        # Loopback is what every request looks like behind a local reverse proxy.
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.client.force_login(User.objects.create_user(username='visitor'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user(username='operator', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def test_file_databases_get_the_production_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')}
+            wrapper = DatabaseWrapper(settings_dict, alias='sqlite-profile')
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], 10000)
+                self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+            finally:
+                wrapper.close()
+
+
+class QueryPlanTests(CourseTestCase):
+    """Hot query shapes must be answered from indexes; see ``apps.courses.queryplans`` for the allowlist."""
+
+    @classmethod
+    def setUpTestData(cls):
+        generate('1k')
+        cls.course = Course.objects.filter(status='published').order_by('pk').first()
+        cls.enrollment = Enrollment.objects.select_related('student').filter(course=cls.course).first()
+        cls.lesson = Lesson.objects.filter(section__course=cls.course).first()
+        cls.root = Category.objects.filter(parent=None).order_by('pk').first()
+
+    def assertIndexed(self, request):
+        result, plans = capture_plans(request)
+        self.assertTrue(plans)
+        self.assertEqual(plan_problems(plans), [])
+        return result
+
+    def test_course_endpoints(self):
+        list_url = reverse('courses:create-list')
+        for url in (
+            list_url,
+            f'{list_url}?status=published',
+            f'{list_url}?level=beginner&language=English',
+            f'{list_url}?category_tree={self.root.pk}',
+            reverse('courses:course-detail', args=[self.course.pk]),
+            reverse('courses:course-reviews', args=[self.course.pk]),
+            reverse('courses:course-search') + '?q=python',
+            reverse('courses:category-tree'),
+            reverse('courses:category-detail', args=[self.root.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.assertIndexed(lambda: self.client.get(url)).status_code, 200)
+
+    def test_progress_and_lookups(self):
+        self.client.force_login(self.enrollment.student)
+        response = self.assertIndexed(lambda: self.client.post(reverse('courses:progress-heartbeats'), {'events': [
+            {'enrollment': self.enrollment.pk, 'lesson': self.lesson.pk, 'seconds': 30},
+        ]}, content_type='application/json'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexed(lambda: list(eligible_enrollments([self.course.pk])[:100]))
+        self.assertIndexed(lambda: list(Enrollment.objects.filter(course=self.course, status='active')))
+        self.assertIndexed(lambda: LessonProgress.objects.filter(
+            enrollment=self.enrollment, is_completed=True).count())
+        self.assertIndexed(lambda: list(Question.objects.filter(lesson=self.lesson).order_by('-created_at', '-pk')[:20]))
+
+    def test_question_endpoints(self):
+        question = Question.objects.filter(lesson=self.lesson).first() or Question.objects.first()
+        for url in (
+            reverse('courses:lesson-questions', args=[question.lesson_id]),
+            reverse('courses:question-answers', args=[question.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.assertIndexed(lambda: self.client.get(url)).status_code, 200)
+        self.client.force_login(self.course.instructor.user)
+        response, plans = capture_plans(lambda: self.client.get(reverse('courses:unanswered-questions')))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(plan_problems(plans), [])
+        self.assertIn('SEARCH courses_question USING INDEX question_unanswered_idx (lesson_id=?)',
+                      [step for _, steps in plans for step in steps])
+
+    def test_full_scans_and_sorts_are_reported(self):
+        _, plans = capture_plans(lambda: list(Course.objects.filter(title='Python').order_by('price')))
+        self.assertEqual([step for _, step in plan_problems(plans)],
+                         ['SCAN courses_course', 'USE TEMP B-TREE FOR ORDER BY'])
+
+
+class BulkEnrollmentTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.course = make_course(cls.instructor, make_category())
+        cls.students = [User.objects.create_user(username=f'student{i}') for i in range(60)]
+        Enrollment.objects.create(student=cls.students[0], course=cls.course)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.instructor.user)
+        self.url = reverse('courses:course-bulk-enroll', args=[self.course.pk])
+
+    def enroll(self, user_ids):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'user_ids': user_ids}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_reports_new_existing_and_unknown_users(self):
+        self.client.get(reverse('courses:course-detail', args=[self.course.pk]))
+        ids = [self.students[1].pk, self.students[0].pk, 999999, self.students[2].pk, self.students[1].pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            data, _ = self.enroll(ids)
+
+        self.assertEqual(data['enrolled'], [self.students[1].pk, self.students[2].pk])
+        self.assertEqual(data['already_enrolled'], [self.students[0].pk])
+        self.assertEqual(data['unknown_users'], [999999])
+        self.assertEqual(data['counts'], {'enrolled': 2, 'already_enrolled': 1, 'unknown_users': 1})
+        self.assertEqual(CourseStats.objects.get(pk=self.course.pk).students_count, 3)
+        self.instructor.refresh_from_db()
+        self.assertEqual(self.instructor.total_students, 2)
+        detail = self.client.get(reverse('courses:course-detail', args=[self.course.pk])).json()
+        self.assertEqual(detail['students_count'], 3)
+
+    def test_rows_dropped_as_conflicts_are_not_counted(self):
+        late, concurrent = self.students[1], self.students[2]
+        bulk_create = Enrollment.objects.bulk_create
+
+        def enroll_concurrently(*args, **kwargs):
+            # Another request enrolls the same user between the read and the insert.
+            Enrollment.objects.create(student=concurrent, course=self.course)
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Enrollment.objects, 'bulk_create', enroll_concurrently):
+            data, _ = self.enroll([late.pk, concurrent.pk])
+        self.assertEqual(data['enrolled'], [late.pk])
+        self.assertEqual(data['already_enrolled'], [concurrent.pk])
+        self.assertEqual(CourseStats.objects.get(pk=self.course.pk).students_count, 3)
+        self.instructor.refresh_from_db()
+        self.assertEqual(self.instructor.total_students, 1)
+
+    def test_queries_do_not_grow_with_the_cohort(self):
+        _, few = self.enroll([student.pk for student in self.students[1:6]])
+        _, many = self.enroll([student.pk for student in self.students[6:]])
+        self.assertEqual(few, many)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 60)
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile('cohort.csv', (
+            '\ufeffemail,user_id\n'
+            f'a@example.com,{self.students[3].pk}\n'
+            f'b@example.com,{self.students[4].pk}\n'
+        ).encode())
+        response = self.client.post(self.url, {'file': upload})
+        self.assertEqual(response.json()['enrolled'], [self.students[3].pk, self.students[4].pk])
+
+        bad = SimpleUploadedFile('cohort.csv', b'user_id\n12\nabc\n')
+        response = self.client.post(self.url, {'file': bad})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 3', response.json()['file'][0])
+
+    def test_only_the_owner_may_enroll(self):
+        self.client.force_login(make_instructor('other').user)
+        response = self.client.post(self.url, {'user_ids': [self.students[1].pk]}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Enrollment.objects.filter(student=self.students[1]).exists())
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as fh:
+            fh.write('\n'.join(str(student.pk) for student in self.students[:10]))
+        self.addCleanup(os.remove, fh.name)
+        out = StringIO()
+        call_command('bulk_enroll', self.course.pk, '--csv', fh.name, '--batch-size', '4', stdout=out)
+        self.assertIn('Enrolled 9 users', out.getvalue())
+        self.assertIn('1 already enrolled', out.getvalue())
+        self.assertEqual(CourseStats.objects.get(pk=self.course.pk).students_count, 10)
+
+
+class CurriculumReorderTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.course = fill_course(make_course(cls.instructor, make_category()), sections=2, lessons=4)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.instructor.user)
+        self.url = reverse('courses:course-curriculum', args=[self.course.pk])
+        self.sections = list(Section.objects.filter(course=self.course).order_by('order', 'pk'))
+        self.lessons = {
+            section.pk: list(section.lessons.order_by('order', 'pk').values_list('pk', flat=True))
+            for section in self.sections
+        }
+
+    def layout(self):
+        sections = self.client.get(self.url).json()['sections']
+        return [[lesson['id'] for lesson in section['lessons']] for section in sections]
+
+    def test_single_move_writes_one_row(self):
+        self.assertEqual(assign_orders([3 * ORDER_GAP, ORDER_GAP, 2 * ORDER_GAP]),
+                         [ORDER_GAP // 2, ORDER_GAP, 2 * ORDER_GAP])
+        # The fixture numbers 0, 1, 2, ...; the first reorder of a section spreads it out.
+        first, second = self.sections
+        l0, l1, l2, l3 = self.lessons[first.pk]
+        response = self.client.patch(self.url, {'moves': [{'type': 'lesson', 'id': l3, 'position': 0}]},
+                                     content_type='application/json')
+        self.assertEqual(response.json()['updated'], 4)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(self.url, {'moves': [{'type': 'lesson', 'id': l2, 'position': 1}]},
+                                         content_type='application/json')
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in ctx.captured_queries), 1)
+        self.assertEqual(self.layout(), [[l3, l2, l0, l1], self.lessons[second.pk]])
+
+    def test_full_layout_moves_lessons_between_sections(self):
+        first, second = self.sections
+        moved = self.lessons[first.pk][0]
+        layout = [
+            {'id': second.pk, 'lessons': self.lessons[second.pk] + [moved]},
+            {'id': first.pk, 'lessons': self.lessons[first.pk][1:]},
+        ]
+        self.client.get(reverse('courses:course-detail', args=[self.course.pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(self.url, {'sections': layout}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.layout(), [entry['lessons'] for entry in layout])
+        self.assertEqual(Lesson.objects.get(pk=moved).section_id, second.pk)
+        self.assertEqual(CourseStats.objects.get(pk=self.course.pk).total_lessons, 8)
+        detail = self.client.get(reverse('courses:course-detail', args=[self.course.pk])).json()
+        self.assertEqual([section['id'] for section in detail['sections']], [second.pk, first.pk])
+
+    def test_incomplete_layout_and_strangers_are_rejected(self):
+        first, second = self.sections
+        response = self.client.put(self.url, {'sections': [
+            {'id': first.pk, 'lessons': self.lessons[first.pk]}, {'id': second.pk, 'lessons': []},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_login(make_instructor('other').user)
+        response = self.client.patch(self.url, {'moves': [{'type': 'section', 'id': second.pk, 'position': 0}]},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(list(Section.objects.filter(course=self.course).order_by('order', 'pk')), self.sections)
+
+
+class CourseCloneTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.course = fill_course(make_course(cls.instructor, make_category(), is_featured=True), sections=2, lessons=3,
+                                 students=[User.objects.create_user(username='student')], ratings=[5])
+
+    def curriculum(self, course):
+        return [
+            (section.title, section.order, list(section.lessons.order_by('order', 'pk').values_list(
+                'title', 'order', 'duration_minutes', 'video_url')))
+            for section in Section.objects.filter(course=course).order_by('order', 'pk')
+        ]
+
+    def test_clone_copies_curriculum_as_draft(self):
+        self.client.force_login(self.instructor.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('courses:course-clone', args=[self.course.pk]),
+                                        {'title': 'Python for beginners, 2nd edition'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        copy = Course.objects.get(pk=response.json()['id'])
+        self.assertEqual((copy.status, copy.is_featured), ('draft', False))
+        self.assertEqual(copy.slug, 'python-for-beginners-2nd-edition')
+        self.assertEqual((copy.instructor_id, copy.category_id, str(copy.price)),
+                         (self.instructor.pk, self.course.category_id, '100.00'))
+        self.assertEqual(self.curriculum(copy), self.curriculum(self.course))
+        stats = CourseStats.objects.get(pk=copy.pk)
+        self.assertEqual((stats.total_lessons, stats.total_duration, stats.students_count, stats.reviews_count),
+                         (6, 60, 0, 0))
+        self.assertEqual(Section.objects.filter(course=self.course).count(), 2)
+
+    def test_query_count_does_not_grow_with_the_curriculum(self):
+        big = make_course(self.instructor, self.course.category, title='Big course')
+        sections = Section.objects.bulk_create([Section(course=big, title=f'S{n}', order=n) for n in range(10)])
+        Lesson.objects.bulk_create([
+            Lesson(section=section, title=f'L{n}', content='', video_url='https://v.example.com', duration_minutes=5,
+                   order=n)
+            for section in sections for n in range(50)
+        ])
+        with CaptureQueriesContext(connection) as small:
+            clone_course(self.course)
+        with CaptureQueriesContext(connection) as large:
+            copy = clone_course(big)
+        # Only the lesson INSERT is split, by SQLite's bound-parameter limit; everything else is one statement.
+        def other(ctx):
+            return [query for query in ctx.captured_queries
+                    if not query['sql'].startswith('INSERT INTO "courses_lesson"')]
+        self.assertEqual(len(other(large)), len(other(small)))
+        self.assertLessEqual(len(large.captured_queries), 17)
+        self.assertEqual(Lesson.objects.filter(section__course=copy).count(), 500)
+        self.assertEqual(CourseStats.objects.get(pk=copy.pk).total_duration, 2500)
+        # Same title, so the slug lookup had to pick a fresh one.
+        self.assertNotEqual(copy.slug, clone_course(big).slug)
+
+    def test_strangers_cannot_clone_and_command_reports_copy(self):
+        self.client.force_login(make_instructor('other').user)
+        response = self.client.post(reverse('courses:course-clone', args=[self.course.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Course.objects.count(), 1)
+
+        out = StringIO()
+        call_command('clone_course', self.course.pk, '--title', 'Python, spring edition', stdout=out)
+        self.assertIn('with 6 lessons', out.getvalue())
+        self.assertEqual(Course.objects.filter(title='Python, spring edition', status='draft').count(), 1)
+
+    def test_short_titles_are_rejected(self):
+        self.client.force_login(self.instructor.user)
+        response = self.client.post(reverse('courses:course-clone', args=[self.course.pk]), {'title': 'Copy'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'title': ['Title must contain at least 10 characters']})
+        with self.assertRaisesMessage(CommandError, 'at least 10 characters'):
+            call_command('clone_course', self.course.pk, '--title', 'Copy', stdout=StringIO())
+        self.assertEqual(Course.objects.count(), 1)
+
+
+class QuestionThreadTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_instructor()
+        cls.student = User.objects.create_user(username='student')
+        cls.course = fill_course(make_course(cls.instructor, make_category()), sections=1, lessons=2,
+                                 students=[cls.student])
+        cls.lesson = Lesson.objects.filter(section__course=cls.course).first()
+
+    def ask(self, title, lesson=None):
+        return Question.objects.create(lesson=lesson or self.lesson, student=self.student, title=title, content='?')
+
+    def test_threads_are_keyset_paginated_with_first_answers(self):
+        questions = [self.ask(f'Question {n}') for n in range(5)]
+        for n in range(4):
+            Answer.objects.create(question=questions[-1], user=self.student, content=f'Student answer {n}')
+        Answer.objects.create(question=questions[-1], user=self.instructor.user, content='Teacher answer',
+                              is_instructor_answer=True)
+        url = reverse('courses:lesson-questions', args=[self.lesson.pk])
+
+        with CaptureQueriesContext(connection) as ctx:
+            page = self.client.get(url, {'page_size': 2}).json()
+        # The lesson check, the page with askers and answer counts, and the windowed answer prefetch.
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual([question['title'] for question in page['results']], ['Question 4', 'Question 3'])
+        newest = page['results'][0]
+        self.assertEqual((newest['answers_count'], newest['instructor_answered']), (5, True))
+        self.assertEqual([answer['content'] for answer in newest['answers']],
+                         ['Teacher answer', 'Student answer 0', 'Student answer 1'])
+
+        rest = self.client.get(page['next']).json()
+        self.assertEqual([question['title'] for question in rest['results']], ['Question 2', 'Question 1'])
+        thread = self.client.get(reverse('courses:question-answers', args=[questions[-1].pk]), {'page_size': 3}).json()
+        self.assertEqual(len(thread['results']), 3)
+        self.assertIsNotNone(thread['next'])
+
+    def test_instructor_answers_maintain_the_unanswered_queue(self):
+        other_course = fill_course(make_course(self.instructor, self.course.category, title='Other'), sections=1,
+                                   lessons=1, students=[self.student])
+        self.ask('Elsewhere', Lesson.objects.get(section__course=other_course))
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('courses:lesson-questions', args=[self.lesson.pk]),
+                                    {'title': 'Stuck', 'content': 'Help'}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        question = Question.objects.get(pk=response.json()['id'])
+        self.client.post(reverse('courses:question-answers', args=[question.pk]), {'content': 'Me too'},
+                         content_type='application/json')
+
+        queue_url = reverse('courses:unanswered-questions')
+        self.assertEqual(self.client.get(queue_url).status_code, 403)
+        self.client.force_login(self.instructor.user)
+        queue = self.client.get(queue_url).json()['results']
+        self.assertEqual([(item['title'], item['answers_count']) for item in queue], [('Stuck', 1), ('Elsewhere', 0)])
+        self.assertEqual(queue[0]['course'], {'id': self.course.pk, 'title': self.course.title})
+
+        response = self.client.post(reverse('courses:question-answers', args=[question.pk]), {'content': 'Like this'},
+                                    content_type='application/json')
+        self.assertTrue(response.json()['is_instructor_answer'])
+        self.assertEqual([item['title'] for item in self.client.get(queue_url).json()['results']], ['Elsewhere'])
+        # Removing the instructor's answer reopens the question.
+        Answer.objects.get(pk=response.json()['id']).delete()
+        self.assertFalse(Question.objects.get(pk=question.pk).instructor_answered)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.course.delete()
+        self.assertFalse([query for query in ctx.captured_queries if 'instructor_answered" =' in query['sql']])
+
+    def test_only_course_members_can_post(self):
+        self.client.force_login(User.objects.create_user(username='stranger'))
+        response = self.client.post(reverse('courses:lesson-questions', args=[self.lesson.pk]),
+                                    {'title': 'Hi', 'content': '?'}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        question = self.ask('Open')
+        response = self.client.post(reverse('courses:question-answers', args=[question.pk]), {'content': 'Hi'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Answer.objects.exists())
 
-# Create your tests here.
@@ -1,10 +1,30 @@
 from django.urls import path
 
-from apps.courses.views import CourseListAPIView, CourseDetailAPIView
+from apps.courses import async_views
+from apps.courses.views import (
+    CategoryDetailAPIView, CategoryTreeAPIView, CourseBulkEnrollAPIView, CourseCloneAPIView, CourseListAPIView,
+    CourseDetailAPIView, CourseExportAPIView, CourseReviewListAPIView, CourseSearchAPIView, CurriculumAPIView,
+    HeartbeatAPIView, LessonQuestionListAPIView, MetricsAPIView, QuestionAnswerListAPIView,
+    UnansweredQuestionListAPIView,
+)
 
 app_name = 'courses'
 
 urlpatterns = [
     path('courses/', CourseListAPIView.as_view(), name='create-list'),
+    path('courses/search/', CourseSearchAPIView.as_view(), name='course-search'),
+    path('courses/export/', CourseExportAPIView.as_view(), name='course-export'),
     path('courses/<int:pk>/', CourseDetailAPIView.as_view(), name='course-detail'),
+    path('courses/<int:pk>/reviews/', CourseReviewListAPIView.as_view(), name='course-reviews'),
+    path('courses/<int:pk>/curriculum/', CurriculumAPIView.as_view(), name='course-curriculum'),
+    path('courses/<int:pk>/clone/', CourseCloneAPIView.as_view(), name='course-clone'),
+    path('courses/<int:pk>/enrollments/bulk/', CourseBulkEnrollAPIView.as_view(), name='course-bulk-enroll'),
+    path('lessons/<int:pk>/questions/', LessonQuestionListAPIView.as_view(), name='lesson-questions'),
+    path('questions/<int:pk>/answers/', QuestionAnswerListAPIView.as_view(), name='question-answers'),
+    path('instructor/questions/unanswered/', UnansweredQuestionListAPIView.as_view(), name='unanswered-questions'),
+    path('categories/tree/', CategoryTreeAPIView.as_view(), name='category-tree'),
+    path('categories/<int:pk>/', CategoryDetailAPIView.as_view(), name='category-detail'),
+    path('progress/heartbeats/', HeartbeatAPIView.as_view(), name='progress-heartbeats'),
+    path('progress/heartbeats/async/', async_views.heartbeats, name='progress-heartbeats-async'),
+    path('metrics/', MetricsAPIView.as_view(), name='metrics'),
 ]
\ No newline at end of file
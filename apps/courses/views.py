@@ -1,19 +1,60 @@
-from django.utils.text import slugify
+import hmac
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from apps.courses.id_generator import generate_id
-from apps.courses.models import Course
-from apps.courses.serializers import CourseRegisterSerializer, CourseDetailSerializer, CourseUpdateSerializer
+from apps.courses.cache import CATALOG, category_tree_cache, course_detail_cache, course_list_cache
+from apps.courses.cloning import clone_course
+from apps.courses.conditional import make_etag, not_modified, set_validators
+from apps.courses.curriculum import curriculum, reorder
+from apps.courses.enrollments import bulk_enroll
+from apps.courses.exporters import CONTENT_TYPES, export_courses
+from apps.courses.filters import CourseFilter
+from apps.courses.metrics import registry
+from apps.courses.models import Answer, Category, Course, CourseReview, Enrollment, Lesson, Question
+from apps.courses.pagination import (
+    AnswerCursorPagination, CourseCursorPagination, QuestionCursorPagination, ReviewCursorPagination,
+)
+from apps.courses.progress import HeartbeatBuffer
+from apps.courses.search import search_course_ids
+from apps.courses.serializers import (
+    AnswerSerializer, BulkEnrollmentSerializer, CategoryDetailSerializer, CourseCloneSerializer,
+    CourseRegisterSerializer, CourseDetailSerializer, CourseUpdateSerializer, CurriculumSerializer,
+    HeartbeatBatchSerializer, QuestionSerializer, ReviewSerializer, UnansweredQuestionSerializer,
+)
+
+
+def ownership_error(user, course):
+    """A 403 response unless ``user`` is the course's instructor or a superuser."""
+    if not hasattr(user, 'instructor_profile') and not user.is_superuser:
+        return Response({"detail": "You are not an instructor"}, status=status.HTTP_403_FORBIDDEN)
+    if not user.is_superuser and course.instructor != user.instructor_profile:
+        return Response({"detail": "You are not the owner of this course"}, status=status.HTTP_403_FORBIDDEN)
+    return None
+
+
+def discussion_error(user, course):
+    """A 403 response unless ``user`` is enrolled in the course, teaches it or is a superuser."""
+    if user.is_superuser or course.instructor.user_id == user.pk:
+        return None
+    if not Enrollment.objects.filter(student=user, course=course).exists():
+        return Response({"detail": "You are not enrolled in this course"}, status=status.HTTP_403_FORBIDDEN)
+    return None
 
 
 class CourseListAPIView(APIView):
     serializer_class = CourseRegisterSerializer
+    pagination_class = CourseCursorPagination
+
+    filter_class = CourseFilter
 
     @staticmethod
-    def get_query_set(request):
-        courses = Course.objects.all().order_by('-created_at')
+    def get_query_set(request, fields=None, expand=()):
+        courses = Course.objects.with_stats(fields, expand)
         return courses
 
     def post(self, request):
@@ -24,14 +65,36 @@ class CourseListAPIView(APIView):
        return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+    def get_validators(self, request):
+        # Bumped with every course detail version, and for new courses and category changes; no query needed.
+        version = course_list_cache.get_version(CATALOG)
+        return make_etag(version, request.get_full_path()), version // 10 ** 9
+
     def get(self, request):
-        courses = self.get_query_set(request=request)
-        serializer = self.serializer_class(courses, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Validated before the conditional check so a bad filter is never answered with a 304.
+        filters = self.filter_class(request.query_params)
+        fields, expand = self.serializer_class.selection(request.query_params)
+        # The full path in the ETag already separates one filter combination from another.
+        etag, last_modified = self.get_validators(request)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            paginator = self.pagination_class()
+            courses = filters.filter_queryset(self.get_query_set(request=request, fields=fields, expand=expand))
+            courses = paginator.paginate_queryset(courses, request, view=self)
+            serializer = self.serializer_class(courses, many=True, fields=fields, expand=expand)
+            response = paginator.get_paginated_response(serializer.data)
+            if filters.include_facets:
+                # A grouped aggregate over the whole catalog: computed once per filter combination and version.
+                response.data['facets'] = course_list_cache.get_or_build(
+                    filters.facets_key(), filters.facets, version=course_list_cache.get_version(CATALOG),
+                )
+        return set_validators(response, etag, last_modified)
 
 
 
 class CourseDetailAPIView(APIView):
+    reviews_limit = 10
+
     def get_object(self, pk):
         try:
             return Course.objects.get(pk=pk)
@@ -43,27 +106,49 @@ class CourseDetailAPIView(APIView):
             return [IsAuthenticated()]
         return [AllowAny()]
 
-    @staticmethod
-    def get(request, pk):
+    def build_detail(self, pk, fields=None, expand=None):
         try:
-            course = Course.objects.get(pk=pk)
+            course = Course.objects.with_detail(self.reviews_limit, fields, expand or ()).get(pk=pk)
         except Course.DoesNotExist:
-            return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+            return None
 
-        if course.status == 'archived':
-            return Response({"detail": "Course not available"}, status=status.HTTP_404_NOT_FOUND)
+        data = CourseDetailSerializer(course, fields=fields, expand=expand).data
+        if isinstance(data.get('instructor'), dict):
+            data['instructor']['courses_count'] = course.instructor_courses_count
+        # Kept for the archived check in get() even when the fieldset leaves it out; removed there.
+        data.setdefault('status', course.status)
+        return data
+
+    def get(self, request, pk):
+        fields, expand = CourseDetailSerializer.selection(request.query_params)
+        is_enrolled = (
+            request.user.is_authenticated
+            and Enrollment.objects.filter(course_id=pk, student=request.user).exists()
+        )
+        version = course_detail_cache.get_version(pk)
+        etag = make_etag(pk, version, is_enrolled, fields, expand)
+        last_modified = version // 10 ** 9
+        vary = ('Cookie', 'Authorization')
 
-        serializer = CourseDetailSerializer(course)
-        data = serializer.data
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified, vary)
 
-        data['instructor']['courses_count'] = course.instructor.courses.count()
+        # Each fieldset is cached separately; all of them share the course's version, so one bump drops them all.
+        key = pk if fields is None else f"{pk}:{','.join(fields)}:{','.join(expand)}"
+        data = course_detail_cache.get_or_build(key, lambda: self.build_detail(pk, fields, expand), version=version)
+        if data is None:
+            return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if request.user.is_authenticated:
-            data['is_enrolled'] = course.enrollments.filter(user=request.user).exists()
-        else:
-            data['is_enrolled'] = False
+        if data['status'] == 'archived':
+            return Response({"detail": "Course not available"}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(data, status=status.HTTP_200_OK)
+        # The cached body is shared by every user; per-user fields are merged in afterwards.
+        data = dict(data)
+        if fields is not None and 'status' not in fields:
+            del data['status']
+        data['is_enrolled'] = is_enrolled
+        return set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified, vary)
 
     def put(self, request, pk):
         return self.update_course(request, pk, partial=False)
@@ -76,21 +161,11 @@ class CourseDetailAPIView(APIView):
         if not course:
             return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if not hasattr(request.user, 'instructor_profile') and not request.user.is_superuser:
-            return Response({"detail": "You are not an instructor"}, status=status.HTTP_403_FORBIDDEN)
-        if not request.user.is_superuser and course.instructor != request.user.instructor_profile:
-            return Response({"detail": "You are not the owner of this course"}, status=status.HTTP_403_FORBIDDEN)
-
-        data = request.data.copy()
-
-        if 'title' in data and data['title'] != course.title:
-            slug_base = slugify(data['title'])
-            slug = slug_base
-            while Course.objects.filter(slug=slug).exclude(pk=course.pk).exists():
-                slug = f"{slug_base}-{generate_id()}"
-            data['slug'] = slug
+        denied = ownership_error(request.user, course)
+        if denied:
+            return denied
 
-        serializer = CourseUpdateSerializer(course, data=data, partial=partial)
+        serializer = CourseUpdateSerializer(course, data=request.data, partial=partial)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -101,10 +176,338 @@ class CourseDetailAPIView(APIView):
         if not course:
             return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if not hasattr(request.user, 'instructor_profile') and not request.user.is_superuser:
-            return Response({"detail": "You are not an instructor"}, status=status.HTTP_403_FORBIDDEN)
-        if not request.user.is_superuser and course.instructor != request.user.instructor_profile:
-            return Response({"detail": "You are not the owner of this course"}, status=status.HTTP_403_FORBIDDEN)
+        denied = ownership_error(request.user, course)
+        if denied:
+            return denied
 
         course.delete()
         return Response({"detail": "Course deleted"}, status=status.HTTP_204_NO_CONTENT)
+
+
+class CourseSearchAPIView(APIView):
+    page_size = 20
+    max_page_size = 100
+    filter_params = ('level', 'language', 'category')
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', self.page_size)), 1), self.max_page_size)
+            category = request.query_params.get('category')
+            category = int(category) if category else None
+        except ValueError:
+            return Response({"detail": "Invalid page or category"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {name: request.query_params.get(name) for name in self.filter_params}
+        filters['category'] = category
+        # One extra id tells whether there is a next page.
+        ids = search_course_ids(query, filters, limit=page_size + 1, offset=(page - 1) * page_size)
+        has_next = len(ids) > page_size
+        courses = Course.objects.with_stats().in_bulk(ids[:page_size])
+        serializer = CourseRegisterSerializer([courses[pk] for pk in ids[:page_size] if pk in courses], many=True)
+        return Response({
+            'page': page,
+            'next': page + 1 if has_next else None,
+            'results': serializer.data,
+        })
+
+
+class CourseReviewListAPIView(APIView):
+    pagination_class = ReviewCursorPagination
+
+    def get(self, request, pk):
+        if not Course.objects.filter(pk=pk).exclude(status='archived').exists():
+            return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        paginator = self.pagination_class()
+        reviews = CourseReview.objects.filter(course_id=pk).select_related('student')
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        serializer = ReviewSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class CourseExportAPIView(APIView):
+    chunk_size = 500
+
+    def get(self, request):
+        # ``format`` is taken by DRF's renderer negotiation.
+        fmt = request.query_params.get('output', 'ndjson')
+        if fmt not in CONTENT_TYPES:
+            return Response({"detail": f"Unknown output {fmt!r}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(export_courses(fmt, self.chunk_size), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="courses.{fmt}"'
+        return response
+
+
+class CategoryTreeAPIView(APIView):
+    """The whole active category tree, built in one query and cached until a category changes."""
+
+    @staticmethod
+    def build_tree():
+        roots, nodes = [], {}
+        # Ordering by path puts every parent before its children.
+        categories = Category.objects.filter(is_active=True).order_by('path').values(
+            'id', 'name', 'slug', 'icon', 'parent_id', 'depth',
+        )
+        for category in categories:
+            parent_id = category.pop('parent_id')
+            node = nodes[category['id']] = {**category, 'children': []}
+            if parent_id is None:
+                roots.append(node)
+            elif parent_id in nodes:
+                nodes[parent_id]['children'].append(node)
+            # Children of an inactive category are hidden along with it.
+        return roots
+
+    def get(self, request):
+        version = category_tree_cache.get_version('tree')
+        etag = make_etag('category-tree', version)
+        last_modified = version // 10 ** 9
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = Response(category_tree_cache.get_or_build('tree', self.build_tree, version=version))
+        return set_validators(response, etag, last_modified)
+
+
+class CategoryDetailAPIView(APIView):
+    def get(self, request, pk):
+        try:
+            category = Category.objects.annotate(sub_count=Count('subcategories')).get(pk=pk, is_active=True)
+        except Category.DoesNotExist:
+            return Response({"detail": "Category not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(CategoryDetailSerializer(category).data)
+
+
+class HeartbeatAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = HeartbeatBatchSerializer(data=request.data, context={'user': request.user})
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        events = serializer.validated_data['events']
+        buffer = HeartbeatBuffer()
+        for event in events:
+            buffer.add(event['enrollment'], event['lesson'], event['seconds'], event['completed'])
+        progress = buffer.flush()
+        return Response({
+            'events': len(events),
+            'progress': [{'enrollment': pk, 'progress_percentage': value} for pk, value in progress.items()],
+        })
+
+
+class CourseBulkEnrollAPIView(APIView):
+    """Enroll a cohort (JSON ``user_ids`` or a CSV upload) in one of the caller's courses."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        course = Course.objects.filter(pk=pk).first()
+        if not course:
+            return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+        if course.status == 'archived':
+            return Response({"detail": "Course not available"}, status=status.HTTP_404_NOT_FOUND)
+
+        denied = ownership_error(request.user, course)
+        if denied:
+            return denied
+
+        serializer = BulkEnrollmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        result = bulk_enroll(course, serializer.validated_data['user_ids'])
+        return Response({
+            'course': course.pk,
+            'counts': {key: len(user_ids) for key, user_ids in result.items()},
+            **result,
+        })
+
+
+class CourseCloneAPIView(APIView):
+    """Copy one of the caller's courses, with its sections and lessons, as a new draft."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        course = Course.objects.filter(pk=pk).first()
+        if not course:
+            return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        denied = ownership_error(request.user, course)
+        if denied:
+            return denied
+
+        serializer = CourseCloneSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        copy = clone_course(course, title=serializer.validated_data.get('title'))
+        return Response({
+            'id': copy.pk, 'source': course.pk, 'title': copy.title, 'slug': copy.slug, 'status': copy.status,
+            'total_lessons': copy.stats.total_lessons,
+        }, status=status.HTTP_201_CREATED)
+
+
+class CurriculumAPIView(APIView):
+    """
+    A course's sections and lessons in order. The owner reorders them with ``PUT`` (the full layout) or
+    ``PATCH`` (a list of moves); see ``apps.courses.curriculum``.
+    """
+
+    def get_permissions(self):
+        if self.request.method in ('PUT', 'PATCH'):
+            return [IsAuthenticated()]
+        return [AllowAny()]
+
+    def get(self, request, pk):
+        course = Course.objects.filter(pk=pk).exclude(status='archived').first()
+        if not course:
+            return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'course': course.pk, 'sections': curriculum(course)})
+
+    def put(self, request, pk):
+        return self.reorder(request, pk)
+
+    def patch(self, request, pk):
+        return self.reorder(request, pk)
+
+    def reorder(self, request, pk):
+        course = Course.objects.filter(pk=pk).first()
+        if not course:
+            return Response({"detail": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
+        denied = ownership_error(request.user, course)
+        if denied:
+            return denied
+
+        serializer = CurriculumSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        updated = reorder(course, layout=serializer.validated_data.get('sections'),
+                          moves=serializer.validated_data.get('moves'))
+        return Response({'course': course.pk, 'updated': updated, 'sections': curriculum(course)})
+
+
+class LessonQuestionListAPIView(APIView):
+    """
+    A lesson's questions, newest first, each with the asker, its answer count and its first answers
+    (the instructor's first). Students of the course and its instructor ask new ones with ``POST``.
+    """
+    pagination_class = QuestionCursorPagination
+    answers_limit = 3
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [IsAuthenticated()]
+        return [AllowAny()]
+
+    @staticmethod
+    def get_lesson(pk):
+        return (Lesson.objects.select_related('section__course__instructor')
+                .exclude(section__course__status='archived').filter(pk=pk).first())
+
+    def get(self, request, pk):
+        if not Lesson.objects.filter(pk=pk).exclude(section__course__status='archived').exists():
+            return Response({"detail": "Lesson not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        paginator = self.pagination_class()
+        questions = Question.objects.filter(lesson_id=pk).with_answers(self.answers_limit)
+        page = paginator.paginate_queryset(questions, request, view=self)
+        serializer = QuestionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def post(self, request, pk):
+        lesson = self.get_lesson(pk)
+        if not lesson:
+            return Response({"detail": "Lesson not found"}, status=status.HTTP_404_NOT_FOUND)
+        denied = discussion_error(request.user, lesson.section.course)
+        if denied:
+            return denied
+
+        serializer = QuestionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        question = serializer.save(lesson=lesson, student=request.user)
+        question.answers_count, question.first_answers = 0, []
+        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+
+
+class QuestionAnswerListAPIView(APIView):
+    """A question's whole thread, newest first. Answers by the course's instructor are flagged as such."""
+    pagination_class = AnswerCursorPagination
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [IsAuthenticated()]
+        return [AllowAny()]
+
+    @staticmethod
+    def get_question(pk):
+        return (Question.objects.select_related('lesson__section__course__instructor')
+                .exclude(lesson__section__course__status='archived').filter(pk=pk).first())
+
+    def get(self, request, pk):
+        if not Question.objects.filter(pk=pk).exclude(lesson__section__course__status='archived').exists():
+            return Response({"detail": "Question not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        paginator = self.pagination_class()
+        answers = Answer.objects.filter(question_id=pk).select_related('user')
+        page = paginator.paginate_queryset(answers, request, view=self)
+        serializer = AnswerSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def post(self, request, pk):
+        question = self.get_question(pk)
+        if not question:
+            return Response({"detail": "Question not found"}, status=status.HTTP_404_NOT_FOUND)
+        course = question.lesson.section.course
+        denied = discussion_error(request.user, course)
+        if denied:
+            return denied
+
+        serializer = AnswerSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(question=question, user=request.user,
+                        is_instructor_answer=course.instructor.user_id == request.user.pk)
+        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+
+
+class UnansweredQuestionListAPIView(APIView):
+    """
+    Questions across all of the caller's courses that are still waiting for an instructor answer, newest first.
+    Reads only the open questions through the partial ``question_unanswered_idx``.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = QuestionCursorPagination
+
+    def get(self, request):
+        if not hasattr(request.user, 'instructor_profile'):
+            return Response({"detail": "You are not an instructor"}, status=status.HTTP_403_FORBIDDEN)
+
+        paginator = self.pagination_class()
+        questions = Question.objects.unanswered_for(request.user.instructor_profile)
+        page = paginator.paginate_queryset(questions, request, view=self)
+        serializer = UnansweredQuestionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class IsAdminOrMetricsScraper(IsAdminUser):
+    """Staff users, or a scraper sending ``Authorization: Bearer <METRICS_TOKEN>`` when a token is configured."""
+
+    def has_permission(self, request, view):
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if token and hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+            return True
+        return super().has_permission(request, view)
+
+
+class MetricsAPIView(APIView):
+    """Request histograms and cache counters of this process in the Prometheus text format."""
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    permission_classes = [IsAdminOrMetricsScraper]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type=self.content_type)
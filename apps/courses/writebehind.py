@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class WriteBehindQueue:
+    """
+    In-process buffer between async views and the ORM.
+
+    Views ``await put(items)`` and answer as soon as the items are queued. A background task, started on the
+    first ``put`` in the running event loop, hands them to ``flush(items)`` in batches of up to ``max_batch``
+    or after ``max_delay`` seconds, whichever comes first. ``flush`` runs on a dedicated single thread, so
+    there is exactly one writer per queue and it keeps its database connection between batches.
+
+    When ``max_pending`` items are already waiting, ``put`` blocks for up to ``put_timeout`` seconds and then
+    raises ``QueueFull``; callers turn that into a 503 so clients back off instead of growing the queue.
+    Items queued but not yet flushed are lost if the process dies, so only use this for data that can
+    tolerate it (watch time, view counters), never for payments or enrollments.
+    """
+
+    def __init__(self, name, flush, max_batch=500, max_delay=0.25, max_pending=20000, put_timeout=1.0):
+        self.name = name
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.flushed = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'writebehind-{name}')
+        self._loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._pending = []
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._task = loop.create_task(self._run(), name=f'writebehind-{self.name}')
+
+    @property
+    def pending(self):
+        return len(self._pending) if self._loop else 0
+
+    async def put(self, items):
+        self._ensure_started()
+        if self._stopping:
+            raise QueueFull(f'{self.name} is shutting down')
+        items = list(items)
+        async with self._space:
+            try:
+                await asyncio.wait_for(
+                    self._space.wait_for(lambda: len(self._pending) + len(items) <= self.max_pending),
+                    self.put_timeout,
+                )
+            except asyncio.TimeoutError:
+                raise QueueFull(f'{self.name} has {len(self._pending)} items waiting') from None
+            self._pending.extend(items)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def _run(self):
+        write = sync_to_async(self._write, thread_sensitive=False, executor=self._executor)
+        while True:
+            if len(self._pending) < self.max_batch and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            if not self._pending:
+                if self._stopping:
+                    return
+                continue
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            async with self._space:
+                self._space.notify_all()
+            await write(batch)
+
+    def _write(self, batch):
+        close_old_connections()
+        try:
+            self.flush(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception('Write-behind flush of %d %s items failed', len(batch), self.name)
+        else:
+            self.flushed += len(batch)
+
+    async def drain(self):
+        """Stop accepting items and wait until everything queued so far has been flushed."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+
+
+queues = {}
+
+
+def register(queue):
+    queues[queue.name] = queue
+    return queue
+
+
+async def drain_all():
+    for queue in queues.values():
+        await queue.drain()
@@ -13,4 +13,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from apps.courses.writebehind import drain_all  # noqa: E402  (needs the app registry loaded above)
+
+
+async def application(scope, receive, send):
+    """Django's ASGI app plus lifespan handling, so write-behind queues are drained on shutdown."""
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await drain_all()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
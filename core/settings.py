@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.courses.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,9 +83,46 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Writers take the lock at BEGIN, where busy_timeout applies; see core/sqlite.py.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Applied to every SQLite connection by core.sqlite.configure_connection.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are KiB: 64 MiB of page cache per connection.
+    'cache_size': -64 * 1024,
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The course caches keep their version keys here, so every process that serves or writes courses (web
+# workers, management commands) must share this backend: file-based on one host, or Redis/Memcached across
+# hosts. LocMemCache is per process and only fits a single-process development server; other processes'
+# writes then reach it only when its version keys expire.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('COURSES_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'e-learning-cache')),
+    }
+}
+
+COURSE_DETAIL_CACHE_TIMEOUT = 60 * 60
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+# Refresh instructor rollups after every enrollment/review commit instead of only in rollup_instructors.
+INSTRUCTOR_ROLLUPS_EAGER = False
+# Bearer token that lets a scraper read /api/metrics/ besides staff users; unset, only staff can.
+# Client addresses are not trusted for this: behind a local reverse proxy every request comes from loopback.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,6 +160,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded and generated files (certificates)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Public origin for links built outside a request, such as the stored certificate URLs.
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
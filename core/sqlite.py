@@ -0,0 +1,25 @@
+"""
+Production profile for SQLite.
+
+``configure_connection`` runs for every new connection and applies ``settings.SQLITE_PRAGMAS``:
+
+* ``journal_mode=WAL``: readers no longer block the writer or each other. It is stored in the database file.
+* ``synchronous=NORMAL``: in WAL mode a power loss can lose the last commits but never corrupts the file.
+* ``busy_timeout``: wait this many milliseconds for a lock instead of failing with "database is locked".
+* ``mmap_size`` and ``cache_size``: read through memory-mapped I/O and keep more pages cached per connection.
+
+``DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'`` goes with it. A deferred transaction
+that reads and then writes has to upgrade its lock halfway through. If another writer got there first, SQLite
+fails it at once without waiting out ``busy_timeout``, because waiting could deadlock. Immediate transactions
+take the write lock in ``BEGIN``, where waiting is safe.
+"""
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver; in-memory databases (the test suite) are left alone."""
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')